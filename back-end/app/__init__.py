@@ -1,3 +1,9 @@
+import time
+
+# Start of the package import (the first app.* module to load), for the
+# startup report in app.main (GET /health/startup)
+IMPORT_START = time.perf_counter()
+
 try:
 	from dotenv import load_dotenv
 	load_dotenv()
@@ -1,24 +1,215 @@
-from typing import List
+import asyncio
+from typing import AsyncIterable, Dict, Iterable, List, Optional, Tuple, Union
 from PIL import Image
-import base64
-import io
+from app.infrastructure.metrics import timed
+from app.models.schemas import ReadingOutcome
+from app.tools.image_encoding import encode_for_vision, encoding_stats
+from app.tools.ocr_pool import ocr_pool
 from app.tools.ocr_tool import OCRTool
-from app.services.groq_client import GroqService
+from app.tools.roi import crop_to_roi
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.hedging import hedged, hedged_sync
+from app.services.groq_client import PROMPT_VERSION, AsyncGroqService, GroqService
+from app.services.reading_cache import image_digest, make_key, reading_cache
+
 
 class HydrometerReadingAgent:
     def __init__(self, lang: str = "pt", detail: bool = False, groq_model: str = "meta-llama/llama-4-maverick-17b-128e-instruct"):
+        self.lang = lang
         self.ocr = OCRTool(lang=lang, detail=detail)
         self.groq = GroqService(model=groq_model)
+        self.agroq = AsyncGroqService(model=groq_model)
+
+    def _cache_key(self, digest: str) -> str:
+        return make_key(digest, self.groq.model, PROMPT_VERSION)
+
+    def read(self, img: Image.Image, source: Optional[bytes] = None) -> ReadingOutcome:
+        # source: original upload bytes of img, lets a compact JPEG skip re-encoding
+        key = self._cache_key(image_digest(img))
+        outcome = reading_cache.get(key)
+        if outcome is None:
+            outcome = self._read_uncached(img, source)
+            reading_cache.put(key, outcome, self.groq.model)
+            return outcome
+        return outcome.model_copy(update={"caminho": "cache"})
 
     def read_from_image(self, img: Image.Image) -> str:
-        # First try vision model directly on image
+        return self.read(img).valor
+
+    async def aread(self, img: Image.Image, source: Optional[bytes] = None) -> ReadingOutcome:
+        # Identical images share one cached/in-flight reading. Hashing is cheap
+        # and needs no OCR worker: a plain thread, so the image is neither
+        # pickled to another process nor queued behind the OCR work
+        key = self._cache_key(await asyncio.to_thread(image_digest, img))
+        computed = False
+
+        async def compute() -> ReadingOutcome:
+            nonlocal computed
+            computed = True
+            return await self._aread_uncached(img, source)
+
+        outcome = await reading_cache.get_or_compute(key, compute, self.groq.model)
+        # Cached and coalesced readings report "cache" instead of the original path
+        return outcome if computed else outcome.model_copy(update={"caminho": "cache"})
+
+    async def aread_from_image(self, img: Image.Image) -> str:
+        return (await self.aread(img)).valor
+
+    async def aread_consensus(
+        self,
+        pages: Union[Iterable[Image.Image], AsyncIterable[Image.Image]],
+        min_votes: int = 2,
+    ) -> Tuple[ReadingOutcome, int]:
+        """Read candidate pages concurrently and stop once ``min_votes`` pages agree.
+
+        Pages are consumed as they become available (e.g. while the PDF is
+        still being rendered). On agreement the remaining reads are cancelled
+        and the agreeing outcome is returned with its vote count; otherwise the
+        most voted value wins, ties going to the earliest page.
+        """
+        page_iter = _aiter(pages).__aiter__()
+        next_page: Optional[asyncio.Future] = asyncio.ensure_future(page_iter.__anext__())
+        reads: Dict[asyncio.Future, int] = {}
+        votes: Dict[str, int] = {}
+        first_seen: Dict[str, Tuple[int, ReadingOutcome]] = {}
+        errors: List[BaseException] = []
+        index = 0
+        try:
+            while next_page is not None or reads:
+                waiting = set(reads) | ({next_page} if next_page is not None else set())
+                done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task is next_page:
+                        try:
+                            img = task.result()
+                        except StopAsyncIteration:
+                            next_page = None
+                            continue
+                        except Exception as e:
+                            # Rendering failed: judge with the pages we already have
+                            errors.append(e)
+                            next_page = None
+                            continue
+                        reads[asyncio.ensure_future(self.aread(img))] = index
+                        index += 1
+                        next_page = asyncio.ensure_future(page_iter.__anext__())
+                        continue
+                    page_index = reads.pop(task)
+                    try:
+                        outcome = task.result()
+                    except Exception as e:
+                        errors.append(e)
+                        continue
+                    votes[outcome.valor] = votes.get(outcome.valor, 0) + 1
+                    first_seen.setdefault(outcome.valor, (page_index, outcome))
+                    if votes[outcome.valor] >= min_votes:
+                        return first_seen[outcome.valor][1], votes[outcome.valor]
+            if not votes:
+                raise errors[-1] if errors else RuntimeError("Nenhuma página para ler.")
+            best = max(votes, key=lambda v: (votes[v], -first_seen[v][0]))
+            return first_seen[best][1], votes[best]
+        finally:
+            pending = list(reads) + ([next_page] if next_page is not None else [])
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            aclose = getattr(page_iter, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    def _read_uncached(self, img: Image.Image, source: Optional[bytes] = None) -> ReadingOutcome:
+        # Only the digit window goes to the vision model and to EasyOCR
+        crop, box = crop_to_roi(img, self.lang)
+        if box is None:
+            return self._read_region(img, None, source)
         try:
-            buf = io.BytesIO()
-            img.save(buf, format="PNG")
-            image_b64 = base64.b64encode(buf.getvalue()).decode("ascii")
-            return self.groq.extract_digits_from_image_base64(image_b64)
+            return self._read_region(crop, box)
         except Exception:
-            # Fallback to OCR + text LLM parsing
-            lines: List[str] = self.ocr.extract_lines_from_image(img)
-            ocr_text = "\n".join(lines)
-            return self.groq.extract_digits(ocr_text)
+            # A wrong window (PDF page, scanned form) leaves no digits: read the whole image
+            return self._read_region(img, None, source)
+
+    def _read_region(self, crop: Image.Image, box: Optional[Tuple[int, int, int, int]],
+                     source: Optional[bytes] = None) -> ReadingOutcome:
+        roi: Optional[List[int]] = list(box) if box else None
+
+        def vision() -> str:
+            with timed("vision"):
+                encoded = encode_for_vision(crop, source)
+                encoding_stats.record(encoded)
+                return self.groq.extract_digits_from_image_base64(encoded.b64, encoded.mime)
+
+        local = False
+
+        def ocr_fallback() -> str:
+            # OCR + text LLM parsing (local parsing while Groq's circuit is open)
+            nonlocal local
+            with timed("ocr_fallback"):
+                lines: List[str] = self.ocr.extract_lines_from_image(crop)
+                try:
+                    return self.groq.extract_digits("\n".join(lines))
+                except CircuitOpenError:
+                    local = True
+                    return _local_digits(lines)
+
+        # Vision first; OCR joins the race when vision is slow or fails (and
+        # right away while the vision circuit is open)
+        value, winner = hedged_sync(vision, ocr_fallback)
+        return ReadingOutcome(valor=value, roi=roi, caminho=_path(winner, local))
+
+    async def _aread_uncached(self, img: Image.Image, source: Optional[bytes] = None) -> ReadingOutcome:
+        # Same strategy as _read_uncached, without blocking the event loop:
+        # ROI, encoding and OCR run on the OCR pool and Groq calls are awaited.
+        crop, box = await ocr_pool.run(crop_to_roi, img, self.lang)
+        if box is None:
+            return await self._aread_region(img, None, source)
+        try:
+            return await self._aread_region(crop, box)
+        except Exception:
+            return await self._aread_region(img, None, source)
+
+    async def _aread_region(self, crop: Image.Image, box: Optional[Tuple[int, int, int, int]],
+                            source: Optional[bytes] = None) -> ReadingOutcome:
+        roi: Optional[List[int]] = list(box) if box else None
+
+        async def vision() -> str:
+            with timed("vision"):
+                encoded = await ocr_pool.run(encode_for_vision, crop, source)
+                encoding_stats.record(encoded)
+                return await self.agroq.extract_digits_from_image_base64(encoded.b64, encoded.mime)
+
+        local = False
+
+        async def ocr_fallback() -> str:
+            nonlocal local
+            with timed("ocr_fallback"):
+                lines: List[str] = await self.ocr.aextract_lines_from_image(crop)
+                try:
+                    return await self.agroq.extract_digits("\n".join(lines))
+                except CircuitOpenError:
+                    local = True
+                    return _local_digits(lines)
+
+        value, winner = await hedged(vision, ocr_fallback)
+        return ReadingOutcome(valor=value, roi=roi, caminho=_path(winner, local))
+
+def _path(winner: str, local: bool) -> str:
+    # "local": the OCR digits were parsed without the text LLM (not cached)
+    return "local" if winner == "ocr" and local else winner
+
+
+def _local_digits(lines: List[str]) -> str:
+    """Digits of the OCR line with the most digits (the odometer row)."""
+    best = max(("".join(ch for ch in line if ch.isdigit()) for line in lines), key=len, default="")
+    if not best:
+        raise RuntimeError("Nenhum dígito encontrado pelo OCR.")
+    return best
+
+
+async def _aiter(pages: Union[Iterable[Image.Image], AsyncIterable[Image.Image]]):
+    if hasattr(pages, "__aiter__"):
+        async for page in pages:
+            yield page
+    else:
+        for page in pages:
+            yield page
@@ -9,16 +9,29 @@ engine = create_engine(
     settings.db_url,
     echo=False,
     future=True,
-    connect_args={"connect_timeout": 3},
+    # connect_timeout is a libpq option; other drivers (SQLite in tests) reject it
+    connect_args={"connect_timeout": 3} if settings.db_url.startswith("postgresql") else {},
 )
 
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
 
-def init_db():
+def init_db(strict: bool = False):
     try:
         import app.infrastructure.orm_models  # ensure models are imported
         Base.metadata.create_all(bind=engine)
     except Exception:
+        if strict:
+            raise
         # Allow app to start even if DB is down
-        pass
\ No newline at end of file
+        pass
+
+
+if __name__ == "__main__":
+    # Explicit schema step for DB_INIT=off: python -m app.infrastructure.db.
+    # Goes through the imported module: the ORM models register on its Base,
+    # not on this __main__ copy's.
+    from app.infrastructure import db
+
+    db.init_db(strict=True)
+    print(f"Schema criado/atualizado em {db.engine.url.render_as_string(hide_password=True)}")
\ No newline at end of file
@@ -0,0 +1,27 @@
+import functools
+import importlib
+import sys
+from types import ModuleType
+from typing import List, Optional
+
+# Optional dependencies that cost from tens of milliseconds (cv2, the PDF
+# renderers) to seconds (easyocr pulls in torch) to import
+HEAVY_MODULES = ("easyocr", "torch", "cv2", "pdf2image", "pypdfium2", "groq")
+
+
+@functools.lru_cache(maxsize=None)
+def optional_module(name: str) -> Optional[ModuleType]:
+    """Import ``name`` on first use; None when it is missing or fails to import.
+
+    Stands in for the module-level ``try: import x / except: x = None`` so
+    processes that never OCR a file or call Groq (CRUD-only workers) do not
+    load the ML stack.
+    """
+    try:
+        return importlib.import_module(name)
+    except Exception:
+        return None
+
+
+def loaded_heavy_modules() -> List[str]:
+    return [name for name in HEAVY_MODULES if name in sys.modules]
@@ -0,0 +1,179 @@
+import contextlib
+import functools
+import time
+from typing import Any, Callable, Iterator, Optional, Tuple, TypeVar
+
+from app.config.settings import settings
+from app.infrastructure import request_timing
+
+try:
+    import prometheus_client  # type: ignore
+    from prometheus_client import Counter, Gauge, Histogram  # type: ignore
+except Exception:
+    prometheus_client = None
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Stage latencies range from sub-millisecond decodes to multi-second Groq calls
+_STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+_DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class _NoopMetric:
+    """Stands in for a metric when prometheus_client is not installed."""
+
+    def labels(self, *args: Any, **kwargs: Any) -> "_NoopMetric":
+        return self
+
+    def observe(self, value: float) -> None:
+        pass
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+    def dec(self, amount: float = 1) -> None:
+        pass
+
+
+_NOOP = _NoopMetric()
+
+
+def _metric(kind: str, name: str, doc: str, labels: Tuple[str, ...], **kwargs: Any):
+    if prometheus_client is None or not settings.metrics_enabled:
+        return _NOOP
+    cls = {"counter": Counter, "gauge": Gauge, "histogram": Histogram}[kind]
+    return cls(name, doc, labels, **kwargs)
+
+
+STAGE_SECONDS = _metric(
+    "histogram", "hidrometro_stage_seconds",
+    "Time spent per reading pipeline stage, in the process that ran it", ("stage",), buckets=_STAGE_BUCKETS)
+OCR_POOL_TASK_SECONDS = _metric(
+    "histogram", "hidrometro_ocr_pool_task_seconds",
+    "Wall time of OCR pool tasks seen by the API process, queueing included", ("task",), buckets=_STAGE_BUCKETS)
+READINGS = _metric(
+    "counter", "hidrometro_readings_total",
+    "Readings by the path that produced the value (vision, ocr) or failed", ("path", "hedged"))
+GROQ_REQUESTS = _metric(
+    "counter", "groq_requests_total", "Groq calls by endpoint and HTTP status (or error kind)", ("endpoint", "status"))
+GROQ_SECONDS = _metric(
+    "histogram", "groq_request_seconds", "Groq call latency, scheduler wait excluded", ("endpoint",),
+    buckets=_STAGE_BUCKETS)
+IN_FLIGHT = _metric("gauge", "hidrometro_in_flight", "Work currently in progress", ("kind",))
+HTTP_SECONDS = _metric(
+    "histogram", "http_request_seconds", "HTTP request latency by route template", ("method", "route", "status"),
+    buckets=_STAGE_BUCKETS)
+DB_SECONDS = _metric(
+    "histogram", "db_query_seconds", "Time spent in database service functions", ("function",), buckets=_DB_BUCKETS)
+
+
+@contextlib.contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Observe the block's duration in ``hidrometro_stage_seconds{stage=...}``.
+
+    The duration also goes to the current request's Server-Timing.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+        request_timing.record(stage, elapsed)
+
+
+def timed_stage(stage: str) -> Callable[[F], F]:
+    """Decorator form of ``timed``."""
+
+    def decorate(fn: F) -> F:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with timed(stage):
+                return fn(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorate
+
+
+@contextlib.contextmanager
+def in_flight(kind: str) -> Iterator[None]:
+    gauge = IN_FLIGHT.labels(kind)
+    gauge.inc()
+    try:
+        yield
+    finally:
+        gauge.dec()
+
+
+def db_timed(fn: F) -> F:
+    """Observe a service function's time (its queries and session) in ``db_query_seconds``."""
+    histogram = DB_SECONDS.labels(fn.__name__)
+
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            histogram.observe(elapsed)
+            request_timing.record("db", elapsed)
+
+    return wrapper  # type: ignore[return-value]
+
+
+def groq_status(exc: Optional[BaseException]) -> str:
+    """Label for a Groq call outcome: the HTTP status, or the error kind."""
+    if exc is None:
+        return "200"
+    status_code = getattr(exc, "status_code", None)
+    if status_code is not None:
+        return str(status_code)
+    return exc.__class__.__name__
+
+
+def observe_groq(endpoint: str, seconds: float, exc: Optional[BaseException] = None) -> None:
+    GROQ_REQUESTS.labels(endpoint, groq_status(exc)).inc()
+    GROQ_SECONDS.labels(endpoint).observe(seconds)
+    request_timing.record("llm", seconds)
+
+
+def render() -> Optional[Tuple[bytes, str]]:
+    """Exposition text and content type, or None when metrics are unavailable."""
+    if prometheus_client is None or not settings.metrics_enabled:
+        return None
+    return prometheus_client.generate_latest(), prometheus_client.CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """ASGI middleware: request latency per route template, and requests in flight.
+
+    The route template (``/api/cadastro/pessoas/{matricula}``) keeps the label
+    set small; unmatched paths are grouped under ``unmatched``.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or prometheus_client is None or not settings.metrics_enabled:
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        start = time.perf_counter()
+
+        async def tracking_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        with in_flight("http"):
+            try:
+                await self.app(scope, receive, tracking_send)
+            finally:
+                route = scope.get("route")
+                template = getattr(route, "path", None) or "unmatched"
+                HTTP_SECONDS.labels(scope.get("method", ""), template, str(status)).observe(
+                    time.perf_counter() - start)
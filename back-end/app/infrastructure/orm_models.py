@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Enum as SAEnum, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum as SAEnum, ForeignKey, Index, LargeBinary, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.infrastructure.db import Base
 from app.models.schemas import TipoDocumento, Sexo, CategoriaLigacao, TipoImovel
@@ -37,4 +37,52 @@ class ImovelDB(Base):
     esgoto = Column(Boolean, nullable=False)
     consumo_misto = Column(Boolean, nullable=False)
 
-    pessoa = relationship("PessoaDB", back_populates="imoveis")
\ No newline at end of file
+    pessoa = relationship("PessoaDB", back_populates="imoveis")
+
+
+class LeituraCacheDB(Base):
+    __tablename__ = "leituras_cache"
+    # sha256(imagem + modelo + versão do prompt)
+    chave = Column(String(64), primary_key=True)
+    valor = Column(String, nullable=False)
+    roi = Column(String, nullable=True)  # "x,y,largura,altura"
+    modelo = Column(String, nullable=False)
+    criado_em = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
+class LeituraJobDB(Base):
+    __tablename__ = "leituras_jobs"
+    id = Column(String(36), primary_key=True)
+    lang = Column(String, nullable=False)
+    detail = Column(Boolean, nullable=False, default=False)
+    consenso = Column(Boolean, nullable=False, default=False)
+    total = Column(Integer, nullable=False)
+    criado_em = Column(DateTime(timezone=True), nullable=False, index=True)
+    finalizado_em = Column(DateTime(timezone=True), nullable=True)
+
+    itens = relationship("LeituraJobItemDB", back_populates="job", cascade="all, delete-orphan")
+
+
+class LeituraJobItemDB(Base):
+    __tablename__ = "leituras_job_itens"
+    # Fila: itens pendentes, ou em processamento com lease vencido
+    __table_args__ = (
+        Index("ix_leituras_job_itens_fila", "status", "lease_ate"),
+        UniqueConstraint("job_id", "posicao", name="uq_leituras_job_itens_posicao"),
+    )
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    job_id = Column(String(36), ForeignKey("leituras_jobs.id", ondelete="CASCADE"), nullable=False, index=True)
+    posicao = Column(Integer, nullable=False)
+    filename = Column(String, nullable=False)
+    conteudo = Column(LargeBinary, nullable=True)  # descartado quando o item termina
+    status = Column(String(12), nullable=False, default="pendente")
+    tentativas = Column(Integer, nullable=False, default=0)
+    worker = Column(String, nullable=True)
+    lease_ate = Column(DateTime(timezone=True), nullable=True)
+    valor = Column(String, nullable=True)
+    roi = Column(String, nullable=True)  # "x,y,largura,altura"
+    votos = Column(Integer, nullable=True)
+    erro = Column(String, nullable=True)
+    atualizado_em = Column(DateTime(timezone=True), nullable=True)
+
+    job = relationship("LeituraJobDB", back_populates="itens")
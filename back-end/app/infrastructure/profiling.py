@@ -0,0 +1,122 @@
+import asyncio
+import cProfile
+import hmac
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Dict
+
+from app.config.settings import settings
+
+try:
+    from pyinstrument import Profiler  # type: ignore
+except Exception:
+    Profiler = None
+
+PROFILE_HEADER = b"x-profile"
+# One profiled request at a time: neither profiler supports nested sessions
+_busy = threading.Lock()
+
+
+def wants_profile(headers: Dict[bytes, bytes]) -> bool:
+    """Profile when ``X-Profile`` carries ``PROFILE_TOKEN``, or for a ``PROFILE_SAMPLE_RATE`` sample."""
+    token = settings.profile_token
+    sent = headers.get(PROFILE_HEADER)
+    if token and sent is not None and hmac.compare_digest(sent, token.encode()):
+        return True
+    return settings.profile_sample_rate > 0 and random.random() < settings.profile_sample_rate
+
+
+class _PyinstrumentSession:
+    # Statistical profiler; async_mode follows the request across awaits
+    ext = "html"
+
+    def __init__(self):
+        self.profiler = Profiler(async_mode="enabled")
+
+    def start(self) -> None:
+        self.profiler.start()
+
+    def stop(self) -> None:
+        self.profiler.stop()
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.profiler.output_html())
+
+
+class _CProfileSession:
+    # Deterministic fallback: captures everything the event loop thread runs
+    # meanwhile, other requests included. Read with ``python -m pstats``.
+    ext = "prof"
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+
+    def start(self) -> None:
+        self.profiler.enable()
+
+    def stop(self) -> None:
+        self.profiler.disable()
+
+    def save(self, path: str) -> None:
+        self.profiler.dump_stats(path)
+
+
+def new_session():
+    return _PyinstrumentSession() if Profiler is not None else _CProfileSession()
+
+
+def profile_filename(scope: Dict[str, Any], ext: str) -> str:
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", scope.get("path", "")).strip("_")[:60] or "root"
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 10**9:09d}-{scope.get('method', '')}-{slug}.{ext}"
+
+
+def _save(session, path: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    session.save(path)
+
+
+class ProfilingMiddleware:
+    """ASGI middleware: opt-in profile of a single request.
+
+    The profile (pyinstrument HTML, or cProfile stats without pyinstrument)
+    is written to ``PROFILE_DIR`` and its file name returned in the
+    ``X-Profile-File`` response header. Requests arriving while another one
+    is being profiled are served unprofiled.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not wants_profile(dict(scope.get("headers") or [])):
+            await self.app(scope, receive, send)
+            return
+        if not _busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+        try:
+            session = new_session()
+            filename = profile_filename(scope, session.ext)
+
+            async def profile_send(message):
+                if message["type"] == "http.response.start":
+                    message = {**message, "headers": [*message.get("headers", []),
+                                                      (b"x-profile-file", filename.encode("latin-1"))]}
+                await send(message)
+
+            session.start()
+            try:
+                await self.app(scope, receive, profile_send)
+            finally:
+                session.stop()
+            try:
+                await asyncio.to_thread(_save, session, os.path.join(settings.profile_dir, filename))
+            except OSError:
+                # The response is already out; a missing profile must not turn it into an error
+                pass
+        finally:
+            _busy.release()
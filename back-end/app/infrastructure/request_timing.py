@@ -0,0 +1,68 @@
+import contextlib
+import contextvars
+import time
+from typing import Dict, Iterator, Optional, Tuple
+
+from app.config.settings import settings
+
+# Open timing scopes of the current request (outermost first). Asyncio tasks
+# and asyncio.to_thread inherit them, so stages timed anywhere below the
+# handler add up into the request's Server-Timing and the per-file scopes.
+_scopes: contextvars.ContextVar[Tuple[Dict[str, float], ...]] = contextvars.ContextVar("timing_scopes", default=())
+
+
+def record(stage: str, seconds: float) -> None:
+    """Add ``seconds`` to ``stage`` in every open scope (no-op outside a request)."""
+    for timings in _scopes.get():
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextlib.contextmanager
+def timing_scope() -> Iterator[Dict[str, float]]:
+    """Collect the stage times recorded inside the block (seconds per stage)."""
+    timings: Dict[str, float] = {}
+    token = _scopes.set(_scopes.get() + (timings,))
+    try:
+        yield timings
+    finally:
+        _scopes.reset(token)
+
+
+def as_ms(timings: Dict[str, float]) -> Dict[str, float]:
+    return {stage: round(seconds * 1000, 1) for stage, seconds in timings.items()}
+
+
+def server_timing(timings: Dict[str, float], total: Optional[float] = None) -> str:
+    """``Server-Timing`` value: ``upload;dur=1.2, decode;dur=3.4, total;dur=9.9`` (ms)."""
+    entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()]
+    if total is not None:
+        entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware: a ``Server-Timing`` header with the request's stage times.
+
+    Stages running concurrently (several files of one upload) are summed, so
+    a stage can exceed ``total``. Streamed responses carry what was measured
+    before their headers went out.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.server_timing_enabled:
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+
+        with timing_scope() as timings:
+            async def timing_send(message):
+                if message["type"] == "http.response.start":
+                    value = server_timing(timings, time.perf_counter() - start)
+                    message = {**message, "headers": [*message.get("headers", []),
+                                                      (b"server-timing", value.encode("latin-1"))]}
+                await send(message)
+
+            await self.app(scope, receive, timing_send)
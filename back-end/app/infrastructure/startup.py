@@ -0,0 +1,42 @@
+import contextlib
+import sys
+import time
+from typing import Any, Dict, Iterator, TextIO
+
+from app.infrastructure.lazy import loaded_heavy_modules
+
+
+class StartupReport:
+    """Time spent per startup phase (module import, schema, job workers)."""
+
+    def __init__(self):
+        self.phases_ms: Dict[str, float] = {}
+
+    def record(self, phase: str, seconds: float) -> None:
+        self.phases_ms[phase] = round(seconds * 1000, 1)
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "phases_ms": dict(self.phases_ms),
+            "total_ms": round(sum(self.phases_ms.values()), 1),
+            # Should stay empty until the first OCR/Groq call
+            "heavy_modules": loaded_heavy_modules(),
+        }
+
+    def print(self, stream: TextIO = sys.stderr) -> None:
+        report = self.as_dict()
+        phases = ", ".join(f"{name} {ms:.1f} ms" for name, ms in report["phases_ms"].items())
+        heavy = ", ".join(report["heavy_modules"]) or "none"
+        print(f"[startup] {phases} (total {report['total_ms']:.1f} ms); heavy modules loaded: {heavy}",
+              file=stream, flush=True)
+
+
+startup_report = StartupReport()
@@ -1,17 +1,74 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response
 
-from app.routers import ocr
-from app.routers import pessoas
-from app.routers import imoveis
+from app import IMPORT_START
+from app.config.settings import settings
 from app.infrastructure.db import init_db
+from app.infrastructure import metrics
+from app.infrastructure.profiling import ProfilingMiddleware
+from app.infrastructure.request_timing import ServerTimingMiddleware
+from app.infrastructure.startup import startup_report
+from app.services.uploads import BodySizeLimitMiddleware
+
+API_MODULES = {m.strip() for m in settings.api_modules.split(",") if m.strip()}
+
+
+async def _init_schema_in_background() -> None:
+    with startup_report.phase("init_db (background)"):
+        await asyncio.to_thread(init_db)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema creation waits for a DB connection (up to the 3 s timeout when it
+    # is down): by default it runs next to the first requests instead of
+    # holding up startup
+    if settings.db_init == "startup":
+        with startup_report.phase("init_db"):
+            await asyncio.to_thread(init_db)
+    elif settings.db_init == "background":
+        app.state.schema_task = asyncio.create_task(_init_schema_in_background())
+    if "ocr" in API_MODULES:
+        from app.services.reading_jobs import job_workers
+
+        with startup_report.phase("job_workers"):
+            await job_workers.start()
+    startup_report.print()
+    yield
+    if "ocr" in API_MODULES:
+        from app.services.groq_client import close_http_clients
+        from app.services.reading_jobs import job_workers
+        from app.tools.ocr_pool import ocr_pool
 
-app = FastAPI(title="OCR API", version="1.0.0")
+        # Items in progress go back to the queue before the pools close
+        await job_workers.stop()
+        ocr_pool.shutdown()
+        await close_http_clients()
 
-init_db()
 
-app.include_router(ocr.router, prefix="/api", tags=["ocr"])
-app.include_router(pessoas.router, prefix="/api")
-app.include_router(imoveis.router, prefix="/api")
+app = FastAPI(title="OCR API", version="1.0.0", lifespan=lifespan)
+app.add_middleware(BodySizeLimitMiddleware)
+app.add_middleware(ServerTimingMiddleware)
+# Outside the body limit, so rejected bodies (413) are counted too
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_middleware(ProfilingMiddleware)
+
+# The OCR router pulls in the imaging stack (numpy, PIL, the Groq client);
+# heavier dependencies (easyocr/torch, cv2, PDF renderers, the Groq SDK)
+# load on first use either way
+if "ocr" in API_MODULES:
+    from app.routers import ocr
+
+    app.include_router(ocr.router, prefix="/api", tags=["ocr"])
+if "cadastro" in API_MODULES:
+    from app.routers import imoveis, pessoas
+
+    app.include_router(pessoas.router, prefix="/api")
+    app.include_router(imoveis.router, prefix="/api")
 
 @app.get("/")
 async def root():
@@ -20,3 +77,18 @@ async def root():
 @app.get("/health")
 async def health():
     return {"status": "healthy"}
+
+@app.get("/health/startup")
+async def startup_timings():
+    return startup_report.as_dict()
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    rendered = metrics.render()
+    if rendered is None:
+        return JSONResponse(status_code=503,
+                            content={"detail": "Métricas indisponíveis (prometheus_client ausente ou METRICS_ENABLED=false)."})
+    content, media_type = rendered
+    return Response(content, media_type=media_type)
+
+startup_report.record("import", time.perf_counter() - IMPORT_START)
@@ -1,7 +1,8 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
 from typing import Optional, List
 from enum import Enum
+from datetime import datetime
 
 
 class TipoDocumento(str, Enum):
@@ -100,14 +101,71 @@ class Imovel(BaseModel):
 
 # Existing hydrometer schemas kept below
 
+class ReadingOutcome(BaseModel):
+    valor: str
+    # Recorte [x, y, largura, altura] da janela de dígitos usado na leitura
+    roi: Optional[List[int]] = None
+    # Caminho que produziu o valor: vision, ocr, local (OCR sem o LLM) ou cache
+    caminho: Optional[str] = None
+
+
 class HydrometerResult(BaseModel):
     filename: str
-    valor_da_leitura: str
+    valor_da_leitura: Optional[str] = None
+    roi: Optional[List[int]] = None
+    # Páginas que concordaram com o valor (modo consenso em PDFs)
+    votos: Optional[int] = None
+    erro: Optional[str] = None
+    caminho: Optional[str] = None
+    # Tempo por etapa deste arquivo, em ms (com tempos=true)
+    tempos_ms: Optional[Dict[str, float]] = None
 
 class HydrometerResponse(BaseModel):
     results: List[HydrometerResult]
 
 
+# Leitura de arquivo compactado (ZIP/TAR): um resultado por membro
+class ArchiveMemberResult(BaseModel):
+    index: int
+    path: str
+    valor_da_leitura: Optional[str] = None
+    roi: Optional[List[int]] = None
+    votos: Optional[int] = None
+    erro: Optional[str] = None
+    caminho: Optional[str] = None
+    tempo_ms: float = 0.0
+
+
+class ArchiveResponse(BaseModel):
+    results: List[ArchiveMemberResult]
+    total: int
+    erros: int
+
+
+# Jobs de leitura em lote
+class LeituraJob(BaseModel):
+    job_id: str
+    status: str  # pendente | processando | concluido
+    total: int
+    pendentes: int = 0
+    processando: int = 0
+    concluidos: int = 0
+    erros: int = 0
+    criado_em: datetime
+    finalizado_em: Optional[datetime] = None
+
+
+class LeituraJobItem(BaseModel):
+    posicao: int
+    filename: str
+    status: str  # pendente | processando | concluido | erro
+    tentativas: int = 0
+    valor_da_leitura: Optional[str] = None
+    roi: Optional[List[int]] = None
+    votos: Optional[int] = None
+    erro: Optional[str] = None
+
+
 # Paginação com metadados
 class PageMeta(BaseModel):
     total: int
@@ -123,3 +181,8 @@ class PessoasPage(BaseModel):
 class ImoveisPage(BaseModel):
     items: List[Imovel]
     meta: PageMeta
+
+
+class LeituraJobItensPage(BaseModel):
+    items: List[LeituraJobItem]
+    meta: PageMeta
@@ -1,98 +1,250 @@
-from typing import List
+import asyncio
+import io
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
 
-from fastapi import APIRouter, File, Form, UploadFile, HTTPException
+from fastapi import APIRouter, File, Form, Query, Request, Response, UploadFile, HTTPException
 from fastapi.responses import JSONResponse
 from fastapi import status
-from PIL import Image
-import io
+from starlette.background import BackgroundTask
 
 from app.agents.reading_agent import HydrometerReadingAgent
-from app.models.schemas import HydrometerResponse, HydrometerResult
+from app.models.schemas import (
+    ArchiveMemberResult,
+    ArchiveResponse,
+    HydrometerResponse,
+    HydrometerResult,
+    LeituraJob,
+    LeituraJobItensPage,
+    PageMeta,
+)
 from app.config.settings import settings
-from app.tools.ocr import _ensure_reader
+from app.infrastructure.request_timing import as_ms, timing_scope
+from app.services.circuit_breaker import resilience_stats
+from app.services.archives import ArchiveMember, aiter_archive
+from app.services.concurrency import error_message, gather_limited, map_unordered, merge_limited
+from app.services.groq_scheduler import groq_scheduler
+from app.services.hedging import hedge_stats
+from app.services import reading_jobs
+from app.services.hydrometer_service import pdf_errors, read_upload
+from app.services.reading_jobs import job_workers
+from app.services.streaming import stream_events, stream_format
+from app.services.uploads import Upload, ingest_all
+from app.services.reading_cache import reading_cache
+from app.tools.image_encoding import encoding_stats
+from app.tools.preprocess import step_timings
+from app.tools.ocr import VISION, decode_image, dpi_for, warmup_reader
+from app.tools.ocr_batcher import batcher_stats
+from app.tools.ocr_pool import ocr_pool
+from app.tools.reader_registry import reader_registry
 
 router = APIRouter()
 
 @router.post("/extract")
 async def extract_ocr(
+    request: Request,
     files: List[UploadFile] = File(..., description="Imagens ou PDFs"),
     lang: str = Form("pt"),
     detail: bool = Form(False),
+    stream: Optional[str] = Query(None, description="ndjson ou sse: um evento por página assim que lida"),
 ):
+    if len(files) > settings.max_files_per_request:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Máximo de {settings.max_files_per_request} arquivos por requisição")
     try:
-        _ensure_reader(lang)
+        await ocr_pool.run(warmup_reader, lang)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    agent = HydrometerReadingAgent(lang=lang, detail=detail)
+    uploads = await ingest_all(files)
+
+    async def read_pages(upload: Upload) -> AsyncIterator[str]:
+        content = upload.content
+        if upload.suffix == "pdf":
+            # Pages are rendered and read one at a time (the next one renders
+            # while the current is being read), so memory does not grow with
+            # the page count.
+            with pdf_errors():
+                async for page in ocr_pool.iter_pdf_pages(content, dpi_for(VISION)):
+                    yield await agent.aread_from_image(page)
+            return
+        img = await ocr_pool.run(decode_image, content)
+        yield (await agent.aread(img, source=content)).valor
+
+    fmt = stream_format(request, stream)
+    if fmt:
+        # One event per page as soon as it is read, in completion order
+        async def events(index: int, upload: Upload) -> AsyncIterator[Dict[str, Any]]:
+            filename = upload.filename
+            values: List[str] = []
+            try:
+                async for value in read_pages(upload):
+                    values.append(value)
+                    yield {"event": "page", "index": index, "filename": filename, "page": len(values), "valor": value}
+            except Exception as e:
+                yield {"event": "file", "index": index, "filename": filename, "pages": values, "erro": error_message(e)}
+                return
+            yield {"event": "file", "index": index, "filename": filename, "pages": values}
+
+        return stream_events(merge_limited(uploads, events, settings.max_concurrent_files), fmt)
+
+    async def process(upload: Upload) -> List[str]:
+        return [value async for value in read_pages(upload)]
+
+    outcomes = await gather_limited(uploads, process, settings.max_concurrent_files)
     results = []
-    for f in files:
-        filename = f.filename or "file"
-        content = await f.read()
-        suffix = (filename.split(".")[-1] or "").lower()
-        try:
-            if suffix == "pdf":
-                try:
-                    from pdf2image import convert_from_bytes
-                except Exception:
-                    raise HTTPException(status_code=500, detail="pdf2image/poppler not available to convert PDFs.")
-                pages = convert_from_bytes(content, dpi=300)
-                page_values = []
-                agent = HydrometerReadingAgent(lang=lang, detail=detail)
-                for p in pages:
-                    value = agent.read_from_image(p.convert("RGB"))
-                    page_values.append(value)
-                results.append({"filename": filename, "pages": page_values})
-            else:
-                img = Image.open(io.BytesIO(content)).convert("RGB")
-                agent = HydrometerReadingAgent(lang=lang, detail=detail)
-                value = agent.read_from_image(img)
-                results.append({"filename": filename, "pages": [value]})
-        finally:
-            await f.close()
+    for upload, outcome in zip(uploads, outcomes):
+        filename = upload.filename
+        if isinstance(outcome, BaseException):
+            results.append({"filename": filename, "pages": [], "erro": error_message(outcome)})
+        else:
+            results.append({"filename": filename, "pages": outcome})
 
     return JSONResponse(results)
 
 @router.post("/hydrometer/read", response_model=HydrometerResponse)
 async def read_hydrometer(
+    request: Request,
     files: List[UploadFile] = File(..., description="Imagens ou PDFs de hidrômetros"),
     lang: str = Form("pt"),
     detail: bool = Form(False),
+    consensus: bool = Form(False, description="Ler várias páginas do PDF e votar no valor"),
+    stream: Optional[str] = Query(None, description="ndjson ou sse: um evento por arquivo assim que lido"),
+    tempos: bool = Form(False, description="Incluir o tempo por etapa de cada arquivo (tempos_ms)"),
 ):
+    if len(files) > settings.max_files_per_request:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Máximo de {settings.max_files_per_request} arquivos por requisição")
     try:
-        _ensure_reader(lang)
+        await ocr_pool.run(warmup_reader, lang)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
     agent = HydrometerReadingAgent(lang=lang, detail=detail)
-    results = []
-    for f in files:
-        filename = f.filename or "file"
-        content = await f.read()
-        suffix = (filename.split(".")[-1] or "").lower()
-        if suffix not in settings.allowed_extensions:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Tipo de arquivo não permitido: {suffix}")
-        size_mb = max(len(content), 1) / (1024 * 1024)
-        if size_mb > settings.max_file_size_mb:
-            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=f"Arquivo excede {settings.max_file_size_mb} MB: {filename}")
-        try:
-            if suffix == "pdf":
-                try:
-                    from pdf2image import convert_from_bytes
-                except Exception:
-                    raise HTTPException(status_code=500, detail="pdf2image/poppler não disponível para PDFs.")
-                pages = convert_from_bytes(content, dpi=300)
-                if len(pages) == 0:
-                    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="PDF sem páginas.")
-                if len(pages) > settings.max_pdf_pages:
-                    pages = pages[:settings.max_pdf_pages]
-                # Choose the best page by IA consensus (first page for now)
-                # Could later run best-of over multiple pages.
-                value = agent.read_from_image(pages[0].convert("RGB"))
-            else:
-                img = Image.open(io.BytesIO(content)).convert("RGB")
-                value = agent.read_from_image(img)
-            results.append(HydrometerResult(filename=filename, valor_da_leitura=value))
-        finally:
-            await f.close()
+    uploads = await ingest_all(files)
+
+    async def process(upload: Upload) -> HydrometerResult:
+        filename = upload.filename
+        with timing_scope() as timings:
+            try:
+                outcome, votes = await read_upload(agent, upload.suffix, upload.content, consensus)
+                result = HydrometerResult(filename=filename, valor_da_leitura=outcome.valor,
+                                          roi=outcome.roi, votos=votes, caminho=outcome.caminho)
+            except Exception as e:
+                result = HydrometerResult(filename=filename, erro=error_message(e))
+        if tempos:
+            result.tempos_ms = as_ms(timings)
+        return result
+
+    fmt = stream_format(request, stream)
+    if fmt:
+        async def events(index: int, upload: Upload) -> AsyncIterator[Dict[str, Any]]:
+            result = await process(upload)
+            yield {"event": "result", "index": index, **result.model_dump()}
 
+        return stream_events(merge_limited(uploads, events, settings.max_concurrent_files), fmt)
+
+    # Files run concurrently (up to MAX_CONCURRENT_FILES); a failure is
+    # reported in that file's result instead of aborting the batch.
+    outcomes = await gather_limited(uploads, process, settings.max_concurrent_files)
+    results = [
+        HydrometerResult(filename=upload.filename, erro=error_message(outcome))
+        if isinstance(outcome, BaseException) else outcome
+        for upload, outcome in zip(uploads, outcomes)
+    ]
     return HydrometerResponse(results=results)
+
+
+@router.post("/hydrometer/archive", response_model=ArchiveResponse)
+async def read_hydrometer_archive(
+    request: Request,
+    archive: UploadFile = File(..., description="ZIP ou TAR com imagens/PDFs de hidrômetros"),
+    lang: str = Form("pt"),
+    detail: bool = Form(False),
+    consensus: bool = Form(False, description="Ler várias páginas do PDF e votar no valor"),
+    stream: Optional[str] = Query(None, description="ndjson ou sse: um evento por membro assim que lido"),
+):
+    if archive.size is not None and archive.size > settings.archive_max_mb * 1024 * 1024:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=f"Arquivo compactado excede {settings.archive_max_mb} MB")
+    try:
+        await ocr_pool.run(warmup_reader, lang)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    agent = HydrometerReadingAgent(lang=lang, detail=detail)
+
+    async def process(member: ArchiveMember) -> ArchiveMemberResult:
+        start = time.perf_counter()
+        if member.erro:
+            return ArchiveMemberResult(index=member.index, path=member.path, erro=member.erro)
+        try:
+            outcome, votes = await read_upload(agent, member.suffix, member.content, consensus)
+            result = ArchiveMemberResult(index=member.index, path=member.path, valor_da_leitura=outcome.valor,
+                                         roi=outcome.roi, votos=votes, caminho=outcome.caminho)
+        except Exception as e:
+            result = ArchiveMemberResult(index=member.index, path=member.path, erro=error_message(e))
+        result.tempo_ms = round((time.perf_counter() - start) * 1000, 1)
+        return result
+
+    # Members are read one at a time from the uploaded file (no extraction)
+    # and at most MAX_CONCURRENT_FILES are in the reading pipeline at once.
+    fmt = stream_format(request, stream)
+    if fmt:
+        # FastAPI closes form files when the handler returns, before a
+        # streamed body is sent: keep the spooled archive open until the end.
+        fileobj, archive.file = archive.file, io.BytesIO()
+
+        async def events() -> AsyncIterator[Dict[str, Any]]:
+            try:
+                async for result in map_unordered(aiter_archive(fileobj), process, settings.max_concurrent_files):
+                    yield {"event": "result", **result.model_dump()}
+            except Exception as e:
+                yield {"event": "error", "erro": error_message(e)}
+
+        return stream_events(events(), fmt, background=BackgroundTask(fileobj.close))
+
+    results = [r async for r in map_unordered(aiter_archive(archive.file), process, settings.max_concurrent_files)]
+    results.sort(key=lambda r: r.index)
+    return ArchiveResponse(results=results, total=len(results), erros=sum(1 for r in results if r.erro))
+
+@router.post("/hydrometer/jobs", response_model=LeituraJob, status_code=status.HTTP_202_ACCEPTED)
+async def criar_job_leitura(
+    files: List[UploadFile] = File(..., description="Imagens ou PDFs de hidrômetros"),
+    lang: str = Form("pt"),
+    detail: bool = Form(False),
+    consensus: bool = Form(False, description="Ler várias páginas do PDF e votar no valor"),
+):
+    if len(files) > settings.jobs_max_files:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Máximo de {settings.jobs_max_files} arquivos por job")
+    uploads = await ingest_all(files)
+    job = await asyncio.to_thread(
+        reading_jobs.criar_job, [(u.filename, u.content) for u in uploads], lang, detail, consensus
+    )
+    job_workers.notify()
+    return job
+
+@router.get("/hydrometer/jobs/{job_id}", response_model=LeituraJob)
+def obter_job_leitura(job_id: str):
+    return reading_jobs.obter_job(job_id)
+
+@router.get("/hydrometer/jobs/{job_id}/items", response_model=LeituraJobItensPage)
+def listar_itens_job(
+    job_id: str,
+    status_item: Optional[str] = Query(None, alias="status"),
+    page: str = Query("1"),
+    page_size: int = Query(50, ge=1, le=500),
+    response: Response = None,
+):
+    total, page_number, items = reading_jobs.listar_itens(job_id, status_item, page, page_size)
+    if isinstance(response, Response):
+        response.headers["X-Total-Count"] = str(total)
+        response.headers["X-Page"] = str(page_number)
+        response.headers["X-Page-Size"] = str(page_size)
+    return LeituraJobItensPage(items=items, meta=PageMeta(total=total, page=page_number, page_size=page_size))
+
+@router.get("/ocr/stats")
+async def ocr_stats():
+    return {"readers": reader_registry.stats(), "pool": ocr_pool.stats(), "cache": reading_cache.stats(),
+            "vision_payload": encoding_stats.stats(), "preprocess": step_timings.stats(),
+            "ocr_batches": batcher_stats(), "hedging": hedge_stats.stats(),
+            "groq": {**resilience_stats(), "scheduler": groq_scheduler.stats()},
+            "jobs": job_workers.stats()}
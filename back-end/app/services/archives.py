@@ -0,0 +1,132 @@
+import asyncio
+import posixpath
+import tarfile
+import zipfile
+import zlib
+from typing import IO, AsyncIterator, Iterator, NamedTuple, Optional
+
+from fastapi import HTTPException, status
+
+from app.config.settings import settings
+from app.services.uploads import matches_magic
+
+# Failures that spoil one member (bad CRC, truncated or garbled data) and
+# not the rest of the archive
+_MEMBER_ERRORS = (zipfile.BadZipFile, tarfile.TarError, zlib.error, EOFError, OSError)
+
+
+class ArchiveMember(NamedTuple):
+    index: int
+    path: str
+    suffix: str
+    content: Optional[bytes]
+    erro: Optional[str] = None
+
+
+def _suffix(path: str) -> str:
+    return posixpath.splitext(path)[1].lstrip(".").lower()
+
+
+def _wanted(path: str) -> bool:
+    # Skip folders' metadata (macOS resource forks, hidden files)
+    name = posixpath.basename(path)
+    return bool(name) and not name.startswith(".") and not path.startswith("__MACOSX/")
+
+
+class _Budget:
+    """Per-member and total uncompressed size limits (zip-bomb guard)."""
+
+    def __init__(self):
+        self.member_limit = settings.max_file_size_mb * 1024 * 1024
+        self.total_limit = settings.archive_max_total_mb * 1024 * 1024
+        self.total = 0
+        self.members = 0
+
+    def admit(self) -> None:
+        self.members += 1
+        if self.members > settings.archive_max_members:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                detail=f"Arquivo compactado com mais de {settings.archive_max_members} membros")
+
+    def read(self, stream: IO[bytes]) -> Optional[bytes]:
+        """Member bytes, or None when it exceeds the per-member limit."""
+        data = stream.read(self.member_limit + 1)
+        if len(data) > self.member_limit:
+            return None
+        self.total += len(data)
+        if self.total > self.total_limit:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                detail=f"Conteúdo descompactado excede {settings.archive_max_total_mb} MB")
+        return data
+
+
+def _member(index: int, path: str, declared_size: int, budget: _Budget, open_member) -> ArchiveMember:
+    suffix = _suffix(path)
+    if declared_size > budget.member_limit:
+        return ArchiveMember(index, path, suffix, None, f"Arquivo excede {settings.max_file_size_mb} MB")
+    try:
+        with open_member() as stream:
+            content = budget.read(stream)
+    except RuntimeError:
+        # zipfile's "password required" for encrypted members
+        return ArchiveMember(index, path, suffix, None, "Arquivo protegido por senha")
+    except _MEMBER_ERRORS as e:
+        return ArchiveMember(index, path, suffix, None, f"Arquivo corrompido: {e}")
+    if content is None:
+        return ArchiveMember(index, path, suffix, None, f"Arquivo excede {settings.max_file_size_mb} MB")
+    if not matches_magic(suffix, content[:1024]):
+        return ArchiveMember(index, path, suffix, None, f"Conteúdo não corresponde ao tipo {suffix}")
+    return ArchiveMember(index, path, suffix, content)
+
+
+def iter_archive(fileobj: IO[bytes]) -> Iterator[ArchiveMember]:
+    """Walk the images/PDFs of a ZIP or TAR (optionally compressed) one member at a time.
+
+    Members are read straight from the uploaded file into memory, one at a
+    time, never extracted to disk. Members with other extensions are skipped.
+    """
+    budget = _Budget()
+    allowed = settings.allowed_extensions
+    index = 0
+    fileobj.seek(0)
+    if zipfile.is_zipfile(fileobj):
+        fileobj.seek(0)
+        with zipfile.ZipFile(fileobj) as zf:
+            for info in zf.infolist():
+                if info.is_dir() or not _wanted(info.filename):
+                    continue
+                if _suffix(info.filename) not in allowed:
+                    continue
+                budget.admit()
+                yield _member(index, info.filename, info.file_size, budget, lambda: zf.open(info))
+                index += 1
+        return
+    fileobj.seek(0)
+    try:
+        # Stream mode: members are read sequentially, no seeking back
+        tf = tarfile.open(fileobj=fileobj, mode="r|*")
+    except tarfile.TarError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Envie um arquivo .zip ou .tar")
+    with tf:
+        for info in tf:
+            if not info.isfile() or not _wanted(info.name):
+                continue
+            if _suffix(info.name) not in allowed:
+                continue
+            budget.admit()
+            yield _member(index, info.name, info.size, budget, lambda: tf.extractfile(info))
+            index += 1
+
+
+async def aiter_archive(fileobj: IO[bytes]) -> AsyncIterator[ArchiveMember]:
+    """``iter_archive`` with each (blocking) member read done in a thread."""
+    members = iter_archive(fileobj)
+    done = object()
+    try:
+        while True:
+            member = await asyncio.to_thread(next, members, done)
+            if member is done:
+                return
+            yield member
+    finally:
+        members.close()
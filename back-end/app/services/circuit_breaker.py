@@ -0,0 +1,152 @@
+import random
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from app.config.settings import settings
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an upstream whose circuit is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+
+    Opens after ``failure_threshold`` consecutive failed calls; after
+    ``reset_timeout_s`` a single probe call is let through (half-open) and its
+    outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, name: str, failure_threshold: Optional[int] = None,
+                 reset_timeout_s: Optional[float] = None):
+        self.name = name
+        self.failure_threshold = failure_threshold or settings.groq_breaker_failures
+        self.reset_timeout_s = settings.groq_breaker_reset_s if reset_timeout_s is None else reset_timeout_s
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._rejected = 0
+        self._opens = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout_s:
+            self._state = HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self._rejected += 1
+            return False
+
+    def check(self) -> None:
+        if not self.allow():
+            raise CircuitOpenError(f"Circuito aberto para {self.name}; chamada não realizada.")
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self._opens += 1
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def release(self) -> None:
+        """Give back a half-open probe slot without an outcome (call cancelled)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "consecutive_failures": self._failures,
+                "opens": self._opens,
+                "rejected": self._rejected,
+            }
+
+
+class RetryBudget:
+    """Per-process cap on retries as a fraction of calls.
+
+    Every call deposits ``ratio`` tokens (up to ``max_tokens``) and every
+    retry spends one, so retries stay near ``ratio`` of the traffic even when
+    the upstream fails everything.
+    """
+
+    def __init__(self, ratio: Optional[float] = None, max_tokens: Optional[float] = None):
+        self.ratio = settings.groq_retry_budget_ratio if ratio is None else ratio
+        self.max_tokens = settings.groq_retry_budget_max if max_tokens is None else max_tokens
+        self._lock = threading.Lock()
+        self._tokens = self.max_tokens
+        self._retries = 0
+        self._exhausted = 0
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._tokens = min(self._tokens + self.ratio, self.max_tokens)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self._retries += 1
+                return True
+            self._exhausted += 1
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"tokens": round(self._tokens, 2), "retries": self._retries, "exhausted": self._exhausted}
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff in seconds for retry ``attempt`` (0-based)."""
+    cap = settings.groq_backoff_max_ms / 1000
+    base = settings.groq_backoff_base_ms / 1000
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+_breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+retry_budget = RetryBudget()
+
+
+def get_breaker(model: str, endpoint: str) -> CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get((model, endpoint))
+        if breaker is None:
+            breaker = _breakers[(model, endpoint)] = CircuitBreaker(f"{model} ({endpoint})")
+        return breaker
+
+
+def resilience_stats() -> Dict[str, Any]:
+    with _breakers_lock:
+        breakers = {b.name: b.stats() for b in _breakers.values()}
+    return {"breakers": breakers, "retry_budget": retry_budget.stats()}
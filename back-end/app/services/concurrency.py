@@ -0,0 +1,114 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, List, Sequence, TypeVar, Union
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+async def gather_limited(
+    items: Sequence[T],
+    fn: Callable[[T], Awaitable[R]],
+    limit: int,
+) -> List[Union[R, Exception]]:
+    """Run ``fn`` over ``items`` with at most ``limit`` calls in flight.
+
+    Results keep the order of ``items``; an exception raised for one item is
+    returned in its slot instead of cancelling the others.
+    """
+    semaphore = asyncio.Semaphore(max(limit, 1))
+
+    async def run(item: T) -> R:
+        async with semaphore:
+            return await fn(item)
+
+    return await asyncio.gather(*(run(item) for item in items), return_exceptions=True)
+
+
+def error_message(exc: BaseException) -> str:
+    detail = getattr(exc, "detail", None)
+    return str(detail) if detail else (str(exc) or exc.__class__.__name__)
+
+
+async def merge_limited(
+    items: Sequence[T],
+    fn: Callable[[int, T], AsyncIterator[R]],
+    limit: int,
+) -> AsyncIterator[R]:
+    """Yield the events of ``fn(index, item)`` for all items as they are produced.
+
+    At most ``limit`` items run at once; events come out in completion order,
+    so callers attach ``index`` to them. ``fn`` is expected to turn its own
+    failures into events. Closing the iterator cancels the remaining work.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(limit, 1) * 4)
+    semaphore = asyncio.Semaphore(max(limit, 1))
+    done = object()
+
+    async def run(index: int, item: T) -> None:
+        cancelled = False
+        try:
+            async with semaphore:
+                async for event in fn(index, item):
+                    await queue.put(event)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            # Cancelled means the consumer closed early: nobody drains the
+            # queue any more, so waiting for room would never return
+            if not cancelled:
+                await queue.put(done)
+
+    tasks = [asyncio.ensure_future(run(i, item)) for i, item in enumerate(items)]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            event = await queue.get()
+            if event is done:
+                remaining -= 1
+                continue
+            yield event
+    finally:
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def map_unordered(
+    source: AsyncIterator[T],
+    fn: Callable[[T], Awaitable[R]],
+    limit: int,
+) -> AsyncIterator[R]:
+    """Yield ``fn(item)`` for items of ``source`` as they complete, ``limit`` at a time.
+
+    The next item is pulled from ``source`` only when a slot frees up, so a
+    long source (e.g. archive members) is never buffered whole. ``fn`` is
+    expected to turn its own failures into results.
+    """
+    limit = max(limit, 1)
+    iterator = source.__aiter__()
+    pending: set = set()
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < limit:
+                try:
+                    item = await iterator.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                pending.add(asyncio.ensure_future(fn(item)))
+            if not pending:
+                return
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
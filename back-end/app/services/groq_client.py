@@ -1,11 +1,20 @@
+import asyncio
 import os
-from typing import Optional
+import time
+import weakref
+from typing import Any, Dict, List, Optional
 from app.config.settings import settings
+from app.infrastructure.lazy import optional_module
+from app.infrastructure.metrics import GROQ_REQUESTS, in_flight, observe_groq
+from app.services.circuit_breaker import CircuitOpenError, backoff_delay, get_breaker, retry_budget
+from app.services.groq_scheduler import estimate_tokens, groq_scheduler
 
 try:
-    from groq import Groq  # type: ignore
+    import h2  # type: ignore  # noqa: F401  (habilita HTTP/2 no httpx)
+    _HTTP2_AVAILABLE = True
 except Exception:
-    Groq = None  # fallback path
+    _HTTP2_AVAILABLE = False
+import httpx
 import requests
 
 SYSTEM_PROMPT = (
@@ -14,120 +23,390 @@ SYSTEM_PROMPT = (
     "Sua tarefa é identificar com precisão os dígitos da leitura. "
     "Responda apenas com os dígitos exatos da leitura, sem espaços, letras ou símbolos."
 )
+# Bump whenever SYSTEM_PROMPT or the user prompts change: it is part of the
+# reading cache key, so stale answers are not served for a new prompt.
+PROMPT_VERSION = "1"
 
-class GroqService:
+# Connection pools shared by every GroqService/AsyncGroqService in the process,
+# so calls reuse keep-alive connections instead of a new TCP+TLS handshake each.
+_http_session: Optional[requests.Session] = None
+_sync_http_client: Optional[httpx.Client] = None
+# One async client per event loop: its connection pool belongs to the loop
+# that opened it (TestClient, CLI/benchmark asyncio.run, job workers)
+_async_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary())
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.groq_max_connections,
+        max_keepalive_connections=settings.groq_max_connections,
+        keepalive_expiry=60,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(settings.groq_timeout_s, connect=5.0)
+
+
+def get_http_session() -> requests.Session:
+    global _http_session
+    if _http_session is None:
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=settings.groq_max_connections
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _http_session = session
+    return _http_session
+
+
+def get_sync_http_client() -> httpx.Client:
+    global _sync_http_client
+    if _sync_http_client is None or _sync_http_client.is_closed:
+        _sync_http_client = httpx.Client(http2=_HTTP2_AVAILABLE, timeout=_timeout(), limits=_limits())
+    return _sync_http_client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    # The client's sockets keep its loop alive: drop the ones of finished loops
+    for other in [other for other in _async_http_clients if other.is_closed()]:
+        del _async_http_clients[other]
+    client = _async_http_clients.get(loop)
+    if client is None or client.is_closed:
+        client = _async_http_clients[loop] = httpx.AsyncClient(
+            http2=_HTTP2_AVAILABLE, timeout=_timeout(), limits=_limits())
+    return client
+
+
+async def close_http_clients() -> None:
+    global _http_session, _sync_http_client
+    current = asyncio.get_running_loop()
+    for loop, client in list(_async_http_clients.items()):
+        if loop is current:
+            await client.aclose()
+        elif loop.is_running():
+            # A client can only be closed on its own loop
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(client.aclose(), loop))
+        # A closed loop already took its connections down with it
+    _async_http_clients.clear()
+    if _sync_http_client is not None:
+        _sync_http_client.close()
+        _sync_http_client = None
+    if _http_session is not None:
+        _http_session.close()
+        _http_session = None
+
+
+class GroqAPIError(RuntimeError):
+    """Non-2xx answer from the Groq HTTP API."""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _sdk_base_url() -> str:
+    # GROQ_BASE_URL is the OpenAI-compatible root (.../openai/v1) used by the
+    # raw HTTP path; the SDK appends /openai/v1/chat/completions itself
+    base = settings.groq_base_url.rstrip("/")
+    return base[: -len("/openai/v1")] if base.endswith("/openai/v1") else base
+
+
+def _groq_sdk():
+    # Official SDK, imported when the first service is built instead of with
+    # this module; None selects the raw HTTP fallback
+    return optional_module("groq")
+
+
+def _transport_errors() -> tuple:
+    sdk_error = getattr(_groq_sdk(), "APIConnectionError", None)
+    return tuple(cls for cls in (httpx.TransportError, requests.RequestException, sdk_error) if cls is not None)
+
+
+def _is_upstream_error(exc: BaseException) -> bool:
+    # Groq answered with an error status or could not be reached
+    return getattr(exc, "status_code", None) is not None or isinstance(exc, _transport_errors())
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    status_code = getattr(exc, "status_code", None)
+    if status_code is not None:
+        return status_code == 429 or status_code >= 500
+    return isinstance(exc, _transport_errors())
+
+
+def _text_messages(ocr_text: str) -> List[Dict[str, Any]]:
+    user_prompt = (
+        "Extraia apenas os dígitos da leitura do hidrômetro a partir do texto OCR abaixo.\n\n" +
+        ocr_text + "\n\nResponda somente os dígitos, sem espaços ou comentários."
+    )
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt},
+    ]
+
+
+def _vision_messages(image_b64: str, mime: str = "image/png") -> List[Dict[str, Any]]:
+    # Use Groq multimodal (vision) with OpenAI-compatible API schema
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": "Identifique apenas os dígitos da leitura."},
+                {
+                    "type": "image_url",
+                    "image_url": {"url": f"data:{mime};base64,{image_b64}"}
+                }
+            ]
+        }
+    ]
+
+
+def _content_from_json(data: Dict[str, Any]) -> str:
+    return data.get("choices", [{}])[0].get("message", {}).get("content", "").strip()
+
+
+def _only_digits(content: str, error: str) -> str:
+    digits = "".join(ch for ch in content if ch.isdigit())
+    if not digits:
+        raise RuntimeError(error)
+    return digits
+
+
+class _GroqBase:
     def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
         key = api_key or settings.groq_api_key or os.getenv("GROQ_API_KEY")
         if not key:
             raise RuntimeError("GROQ_API_KEY não configurada.")
         self.api_key = key
         self.model = model or settings.groq_model or "meta-llama/llama-4-maverick-17b-128e-instruct"
+        self.url = settings.groq_base_url.rstrip("/") + "/chat/completions"
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+
+    def _body(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {"model": self.model, "messages": messages, "temperature": 0}
+
+    def _should_retry(self, exc: BaseException, attempt: int) -> bool:
+        return _is_retryable(exc) and attempt < settings.groq_max_retries and retry_budget.withdraw()
+
+    @staticmethod
+    def _record(breaker, exc: Optional[BaseException]) -> None:
+        # Only unavailability (5xx/transport) counts against the circuit; a 429
+        # is throttling, handled by the scheduler, and any other answer shows
+        # the endpoint is up.
+        if exc is not None and _is_retryable(exc) and getattr(exc, "status_code", None) != 429:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+
+class GroqService(_GroqBase):
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
+        super().__init__(api_key, model)
         self.client = None
         # Try initializing official SDK; fallback to raw HTTP if TypeError proxies issue occurs
-        if Groq is not None:
+        sdk = _groq_sdk()
+        if sdk is not None:
             try:
-                self.client = Groq(api_key=key)
+                # Retries are handled here (budget + breaker), not by the SDK
+                self.client = sdk.Groq(api_key=self.api_key, base_url=_sdk_base_url(),
+                                   http_client=get_sync_http_client(), max_retries=0)
             except TypeError:
                 # Known issue: httpx version mismatch removing 'proxies' arg
                 self.client = None
 
-    def _raw_chat(self, prompt: str) -> str:
-        url = "https://api.groq.com/openai/v1/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
-        body = {
-            "model": self.model,
-            "messages": [
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": prompt},
-            ],
-            "temperature": 0,
-        }
-        resp = requests.post(url, headers=headers, json=body, timeout=30)
+    def _raw_completion(self, messages: List[Dict[str, Any]], label: str) -> str:
+        resp = get_http_session().post(self.url, headers=self._headers(), json=self._body(messages),
+                                       timeout=settings.groq_timeout_s)
+        groq_scheduler.observe(resp.headers, resp.status_code)
         if resp.status_code >= 300:
-            raise RuntimeError(f"Erro na chamada Groq API: {resp.status_code} {resp.text}")
-        data = resp.json()
-        content = data.get("choices", [{}])[0].get("message", {}).get("content", "").strip()
-        return content
+            raise GroqAPIError(f"Erro na chamada Groq API{label}: {resp.status_code} {resp.text}", resp.status_code)
+        return _content_from_json(resp.json())
 
-    def extract_digits(self, ocr_text: str) -> str:
-        user_prompt = (
-            "Extraia apenas os dígitos da leitura do hidrômetro a partir do texto OCR abaixo.\n\n" +
-            ocr_text + "\n\nResponda somente os dígitos, sem espaços ou comentários."
+    def _raw_chat(self, prompt: str) -> str:
+        return self._raw_completion(
+            [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": prompt}], ""
         )
+
+    def _call(self, messages: List[Dict[str, Any]], label: str, endpoint: str = "chat") -> str:
+        groq_scheduler.acquire_sync(estimate_tokens(messages))
+        start = time.perf_counter()
+        with in_flight("groq"):
+            try:
+                content = self._send(messages, label)
+            except Exception as e:
+                observe_groq(endpoint, time.perf_counter() - start, e)
+                raise
+        observe_groq(endpoint, time.perf_counter() - start)
+        return content
+
+    def _send(self, messages: List[Dict[str, Any]], label: str) -> str:
         if self.client is not None:
             try:
-                chat = self.client.chat.completions.create(
+                # Raw response: the rate-limit headers feed the scheduler
+                raw = self.client.chat.completions.with_raw_response.create(
                     model=self.model,
-                    messages=[
-                        {"role": "system", "content": SYSTEM_PROMPT},
-                        {"role": "user", "content": user_prompt},
-                    ],
+                    messages=messages,
                     temperature=0,
                 )
-                content = chat.choices[0].message.content.strip()
+                groq_scheduler.observe(raw.headers)
+                return raw.parse().choices[0].message.content.strip()
             except Exception as e:
-                # Fallback to raw HTTP; if model is decommissioned, let caller set GROQ_MODEL
-                content = self._raw_chat(user_prompt)
-        else:
-            content = self._raw_chat(user_prompt)
-        digits = "".join(ch for ch in content if ch.isdigit())
-        if not digits:
-            raise RuntimeError("Nenhum dígito encontrado pela IA.")
-        return digits
-
-    def extract_digits_from_image_base64(self, image_b64: str) -> str:
-        # Use Groq multimodal (vision) with OpenAI-compatible API schema
-        messages = [
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": "Identifique apenas os dígitos da leitura."},
-                    {
-                        "type": "image_url",
-                        "image_url": {"url": f"data:image/png;base64,{image_b64}"}
-                    }
-                ]
-            }
-        ]
-        if self.client is not None:
+                if _is_upstream_error(e):
+                    groq_scheduler.observe_error(e)
+                    raise
+                # SDK unusable in this environment: fall back to raw HTTP
+        return self._raw_completion(messages, label)
+
+    def _complete(self, messages: List[Dict[str, Any]], label: str = "", endpoint: str = "chat") -> str:
+        breaker = get_breaker(self.model, endpoint)
+        try:
+            breaker.check()
+        except CircuitOpenError:
+            GROQ_REQUESTS.labels(endpoint, "circuit_open").inc()
+            raise
+        retry_budget.deposit()
+        attempt = 0
+        while True:
             try:
-                chat = self.client.chat.completions.create(
+                content = self._call(messages, label, endpoint)
+            except Exception as e:
+                if self._should_retry(e, attempt):
+                    time.sleep(backoff_delay(attempt))
+                    attempt += 1
+                    continue
+                self._record(breaker, e)
+                raise
+            self._record(breaker, None)
+            return content
+
+    def extract_digits(self, ocr_text: str) -> str:
+        content = self._complete(_text_messages(ocr_text))
+        return _only_digits(content, "Nenhum dígito encontrado pela IA.")
+
+    def extract_digits_from_image_base64(self, image_b64: str, mime: str = "image/png") -> str:
+        content = self._complete(_vision_messages(image_b64, mime), " (vision)", "vision")
+        return _only_digits(content, "Nenhum dígito encontrado pela IA (vision).")
+
+
+class AsyncGroqService(_GroqBase):
+    """Non-blocking variant of GroqService for use inside async routes.
+
+    Shares one pooled ``httpx.AsyncClient`` per event loop (HTTP/2 when ``h2``
+    is installed) and keeps the SDK -> raw HTTP fallback of the sync service.
+    A service may be built outside any loop and used from several.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
+        super().__init__(api_key, model)
+        self._sdk = _groq_sdk()
+        # SDK clients per event loop, each wrapping that loop's HTTP client
+        self._sdk_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = (
+            weakref.WeakKeyDictionary())
+        # Set through ``client = ...``: one client for every loop (None: raw HTTP only)
+        self._pinned: Optional[tuple] = None
+
+    @property
+    def client(self) -> Any:
+        """SDK client for the running loop; None selects the raw HTTP path."""
+        if self._pinned is not None:
+            return self._pinned[0]
+        if self._sdk is None:
+            return None
+        http_client = get_async_http_client()
+        loop = asyncio.get_running_loop()
+        client = self._sdk_clients.get(loop)
+        if client is None or getattr(client, "_client", None) is not http_client:
+            try:
+                client = self._sdk.AsyncGroq(api_key=self.api_key, base_url=_sdk_base_url(),
+                                             http_client=http_client, max_retries=0)
+            except TypeError:
+                self._sdk = None
+                return None
+            self._sdk_clients[loop] = client
+        return client
+
+    @client.setter
+    def client(self, value: Any) -> None:
+        self._pinned = (value,)
+
+    async def _raw_completion(self, messages: List[Dict[str, Any]], label: str) -> str:
+        resp = await get_async_http_client().post(self.url, headers=self._headers(), json=self._body(messages))
+        groq_scheduler.observe(resp.headers, resp.status_code)
+        if resp.status_code >= 300:
+            raise GroqAPIError(f"Erro na chamada Groq API{label}: {resp.status_code} {resp.text}", resp.status_code)
+        return _content_from_json(resp.json())
+
+    async def _call(self, messages: List[Dict[str, Any]], label: str, endpoint: str = "chat") -> str:
+        await groq_scheduler.acquire(estimate_tokens(messages))
+        start = time.perf_counter()
+        with in_flight("groq"):
+            try:
+                content = await self._send(messages, label)
+            except Exception as e:
+                observe_groq(endpoint, time.perf_counter() - start, e)
+                raise
+        observe_groq(endpoint, time.perf_counter() - start)
+        return content
+
+    async def _send(self, messages: List[Dict[str, Any]], label: str) -> str:
+        client = self.client
+        if client is not None:
+            try:
+                raw = await client.chat.completions.with_raw_response.create(
                     model=self.model,
                     messages=messages,
                     temperature=0,
                 )
-                content = chat.choices[0].message.content.strip()
-            except Exception:
-                # Raw HTTP fallback for multimodal
-                url = "https://api.groq.com/openai/v1/chat/completions"
-                headers = {
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json",
-                }
-                body = {"model": self.model, "messages": messages, "temperature": 0}
-                resp = requests.post(url, headers=headers, json=body, timeout=30)
-                if resp.status_code >= 300:
-                    raise RuntimeError(f"Erro na chamada Groq API (vision): {resp.status_code} {resp.text}")
-                data = resp.json()
-                content = data.get("choices", [{}])[0].get("message", {}).get("content", "").strip()
-        else:
-            # Raw HTTP fallback for multimodal
-            url = "https://api.groq.com/openai/v1/chat/completions"
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json",
-            }
-            body = {"model": self.model, "messages": messages, "temperature": 0}
-            resp = requests.post(url, headers=headers, json=body, timeout=30)
-            if resp.status_code >= 300:
-                raise RuntimeError(f"Erro na chamada Groq API (vision): {resp.status_code} {resp.text}")
-            data = resp.json()
-            content = data.get("choices", [{}])[0].get("message", {}).get("content", "").strip()
-        digits = "".join(ch for ch in content if ch.isdigit())
-        if not digits:
-            raise RuntimeError("Nenhum dígito encontrado pela IA (vision).")
-        return digits
+                groq_scheduler.observe(raw.headers)
+                # AsyncAPIResponse.parse() is a coroutine
+                completion = await raw.parse()
+                return completion.choices[0].message.content.strip()
+            except Exception as e:
+                if _is_upstream_error(e):
+                    groq_scheduler.observe_error(e)
+                    raise
+        return await self._raw_completion(messages, label)
+
+    async def _complete(self, messages: List[Dict[str, Any]], label: str = "", endpoint: str = "chat") -> str:
+        breaker = get_breaker(self.model, endpoint)
+        try:
+            breaker.check()
+        except CircuitOpenError:
+            GROQ_REQUESTS.labels(endpoint, "circuit_open").inc()
+            raise
+        retry_budget.deposit()
+        attempt = 0
+        while True:
+            try:
+                content = await self._call(messages, label, endpoint)
+            except asyncio.CancelledError:
+                # e.g. the losing side of a hedged read
+                breaker.release()
+                raise
+            except Exception as e:
+                if self._should_retry(e, attempt):
+                    await asyncio.sleep(backoff_delay(attempt))
+                    attempt += 1
+                    continue
+                self._record(breaker, e)
+                raise
+            self._record(breaker, None)
+            return content
+
+    async def extract_digits(self, ocr_text: str) -> str:
+        content = await self._complete(_text_messages(ocr_text))
+        return _only_digits(content, "Nenhum dígito encontrado pela IA.")
+
+    async def extract_digits_from_image_base64(self, image_b64: str, mime: str = "image/png") -> str:
+        content = await self._complete(_vision_messages(image_b64, mime), " (vision)", "vision")
+        return _only_digits(content, "Nenhum dígito encontrado pela IA (vision).")
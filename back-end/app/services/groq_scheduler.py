@@ -0,0 +1,267 @@
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import math
+import re
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Mapping, Optional
+
+from app.config.settings import settings
+
+INTERACTIVE = 0
+BATCH = 1
+_PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("groq_priority", default=INTERACTIVE)
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNIT_SECONDS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+@contextlib.contextmanager
+def groq_priority(priority: int) -> Iterator[None]:
+    """Run the Groq calls made inside the block (and tasks it spawns) at ``priority``."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds from Groq's reset headers ("7.66s", "2m59.56s", "120ms") or a plain number."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION.findall(value)
+    if not parts:
+        return None
+    return sum(float(n) * _UNIT_SECONDS[unit] for n, unit in parts)
+
+
+def _header_int(headers: Mapping[str, str], name: str) -> Optional[int]:
+    try:
+        return int(float(headers[name]))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def estimate_tokens(messages: List[Dict[str, Any]]) -> int:
+    """Rough prompt size in tokens: ~4 characters per token plus a flat cost per image."""
+    chars = 0
+    images = 0
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            chars += len(content)
+            continue
+        for part in content or []:
+            if part.get("type") == "image_url":
+                images += 1
+            else:
+                chars += len(part.get("text", ""))
+    return chars // 4 + images * settings.groq_image_tokens + settings.groq_completion_tokens
+
+
+class TokenBucket:
+    """Refills ``capacity`` units per minute; not thread-safe (the scheduler locks)."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self._updated = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.capacity / 60)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        if not self.enabled:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) * 60 / self.capacity
+
+    def take(self, amount: float) -> None:
+        if self.enabled:
+            self.level -= min(amount, self.capacity)
+
+    def clamp(self, remaining: float, now: float) -> None:
+        # The server's count also includes other processes sharing the key
+        if self.enabled:
+            self._refill(now)
+            self.level = min(self.level, float(remaining))
+
+    def resize(self, per_minute: float) -> None:
+        if per_minute > 0 and per_minute != self.capacity:
+            self.level = min(self.level, float(per_minute))
+            self.capacity = float(per_minute)
+
+
+class _WaitStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "avg_wait_ms": round(self.total / self.count * 1000, 1) if self.count else 0.0,
+            "max_wait_ms": round(self.max * 1000, 1),
+        }
+
+
+class GroqScheduler:
+    """Token-bucket admission for Groq calls, shared by the sync and async services.
+
+    Calls wait for both the requests-per-minute and tokens-per-minute buckets
+    (``GROQ_RPM``/``GROQ_TPM``; 0 disables one) and are admitted in priority
+    order (interactive reads ahead of batch jobs, FIFO within a priority).
+    The buckets follow the ``x-ratelimit-*`` response headers, and a 429
+    pauses admissions for ``Retry-After`` seconds.
+    """
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        self._lock = threading.Lock()
+        self._requests = TokenBucket(settings.groq_rpm if rpm is None else rpm)
+        self._tokens = TokenBucket(settings.groq_tpm if tpm is None else tpm)
+        self._blocked_until = 0.0
+        self._queue: List[tuple] = []
+        self._seq = itertools.count()
+        self._waits: Dict[int, _WaitStats] = {}
+        self._rate_limited = 0
+
+    def _enqueue(self, priority: int) -> tuple:
+        entry = (priority, next(self._seq))
+        with self._lock:
+            heapq.heappush(self._queue, entry)
+        return entry
+
+    def _leave(self, entry: tuple) -> None:
+        with self._lock:
+            if entry in self._queue:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+
+    def _try_admit(self, entry: tuple, cost: int) -> float:
+        """0 when ``entry`` was admitted, otherwise seconds worth waiting before retrying."""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(self._blocked_until - now,
+                       self._requests.wait_time(1, now),
+                       self._tokens.wait_time(cost, now))
+            if self._queue[0] != entry:
+                # Not our turn: recheck once the head could have gone
+                return max(wait, settings.groq_scheduler_poll_ms / 1000)
+            if wait > 0:
+                return wait
+            heapq.heappop(self._queue)
+            self._requests.take(1)
+            self._tokens.take(cost)
+            return 0.0
+
+    def _record_wait(self, priority: int, seconds: float) -> None:
+        with self._lock:
+            self._waits.setdefault(priority, _WaitStats()).record(seconds)
+
+    async def acquire(self, cost: int, priority: Optional[int] = None) -> float:
+        """Wait for a slot for a call of about ``cost`` tokens; returns the seconds waited."""
+        priority = _priority.get() if priority is None else priority
+        start = time.monotonic()
+        entry = self._enqueue(priority)
+        try:
+            while True:
+                wait = self._try_admit(entry, cost)
+                if wait == 0:
+                    break
+                await asyncio.sleep(wait)
+        finally:
+            self._leave(entry)
+        waited = time.monotonic() - start
+        self._record_wait(priority, waited)
+        return waited
+
+    def acquire_sync(self, cost: int, priority: Optional[int] = None) -> float:
+        priority = _priority.get() if priority is None else priority
+        start = time.monotonic()
+        entry = self._enqueue(priority)
+        try:
+            while True:
+                wait = self._try_admit(entry, cost)
+                if wait == 0:
+                    break
+                time.sleep(wait)
+        finally:
+            self._leave(entry)
+        waited = time.monotonic() - start
+        self._record_wait(priority, waited)
+        return waited
+
+    def observe(self, headers: Optional[Mapping[str, str]], status_code: Optional[int] = None) -> None:
+        """Update quota state from a Groq response (or error response)."""
+        headers = headers or {}
+        with self._lock:
+            now = time.monotonic()
+            limit_tokens = _header_int(headers, "x-ratelimit-limit-tokens")
+            if limit_tokens:
+                self._tokens.resize(limit_tokens)
+            remaining_tokens = _header_int(headers, "x-ratelimit-remaining-tokens")
+            if remaining_tokens is not None:
+                self._tokens.clamp(remaining_tokens, now)
+            remaining_requests = _header_int(headers, "x-ratelimit-remaining-requests")
+            if remaining_requests == 0:
+                reset = parse_duration(headers.get("x-ratelimit-reset-requests"))
+                if reset:
+                    self._blocked_until = max(self._blocked_until, now + reset)
+            if status_code == 429:
+                self._rate_limited += 1
+                retry_after = (parse_duration(headers.get("retry-after"))
+                               or parse_duration(headers.get("x-ratelimit-reset-tokens"))
+                               or 1.0)
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+
+    def observe_error(self, exc: BaseException) -> None:
+        response = getattr(exc, "response", None)
+        status_code = getattr(exc, "status_code", None)
+        if response is not None or status_code is not None:
+            self.observe(getattr(response, "headers", None), status_code)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            depth: Dict[str, int] = {name: 0 for name in _PRIORITY_NAMES.values()}
+            for priority, _ in self._queue:
+                name = _PRIORITY_NAMES.get(priority, str(priority))
+                depth[name] = depth.get(name, 0) + 1
+            self._requests.wait_time(0, now)
+            self._tokens.wait_time(0, now)
+            return {
+                "queue_depth": depth,
+                "waits": {_PRIORITY_NAMES.get(p, str(p)): w.as_dict() for p, w in self._waits.items()},
+                "rate_limited": self._rate_limited,
+                "blocked_for_s": round(max(self._blocked_until - now, 0.0), 2),
+                "requests_available": math.floor(self._requests.level) if self._requests.enabled else None,
+                "tokens_available": math.floor(self._tokens.level) if self._tokens.enabled else None,
+            }
+
+
+groq_scheduler = GroqScheduler()
@@ -0,0 +1,183 @@
+import asyncio
+import concurrent.futures
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+from app.config.settings import settings
+from app.infrastructure.metrics import READINGS
+
+T = TypeVar("T")
+
+PRIMARY = "vision"
+FALLBACK = "ocr"
+
+
+class LatencyTracker:
+    """Rolling window of successful primary-path latencies (seconds)."""
+
+    def __init__(self, window: Optional[int] = None):
+        self._lock = threading.Lock()
+        self._samples: Deque[float] = deque(maxlen=window or settings.hedge_window)
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> float:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return 0.0
+        return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait for the primary before starting the fallback.
+
+        ``HEDGE_PERCENTILE`` of the recent primary latencies, clamped to
+        ``HEDGE_MIN_DELAY_MS``; ``HEDGE_DELAY_MS`` until ``HEDGE_MIN_SAMPLES``
+        samples have been seen. With ``HEDGE_ENABLED=false`` the fallback only
+        starts after the primary fails.
+        """
+        if not settings.hedge_enabled:
+            return math.inf
+        with self._lock:
+            count = len(self._samples)
+        if count < settings.hedge_min_samples:
+            return settings.hedge_delay_ms / 1000
+        return max(self.percentile(settings.hedge_percentile), settings.hedge_min_delay_ms / 1000)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+
+class HedgeStats:
+    """Which path produced each reading, and how often the fallback was started."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wins: Dict[str, int] = {PRIMARY: 0, FALLBACK: 0}
+        self._hedged = 0
+        self._failures = 0
+
+    def record(self, winner: str, hedged: bool) -> None:
+        with self._lock:
+            self._wins[winner] = self._wins.get(winner, 0) + 1
+            if hedged:
+                self._hedged += 1
+        READINGS.labels(winner, str(hedged).lower()).inc()
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+        # Both paths were tried by the time a reading fails
+        READINGS.labels("failed", "true").inc()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = {"wins": dict(self._wins), "hedged": self._hedged, "failures": self._failures}
+        out["delay_ms"] = round(vision_latency.hedge_delay() * 1000, 1)
+        out["samples"] = len(vision_latency)
+        return out
+
+
+vision_latency = LatencyTracker()
+hedge_stats = HedgeStats()
+
+
+def _remaining(delay: float, start: float, hedge_started: bool) -> Optional[float]:
+    if hedge_started or math.isinf(delay):
+        return None
+    return max(delay - (time.perf_counter() - start), 0)
+
+
+async def hedged(
+    primary: Callable[[], Awaitable[T]],
+    fallback: Callable[[], Awaitable[T]],
+    delay: Optional[float] = None,
+) -> Tuple[T, str]:
+    """Run ``primary``; if it has not answered after ``delay`` seconds, race ``fallback``.
+
+    A primary failure starts the fallback right away. The first successful
+    result wins and the other path is cancelled. Returns ``(result, winner)``;
+    raises the primary's error when both paths fail.
+    """
+    delay = vision_latency.hedge_delay() if delay is None else delay
+    start = time.perf_counter()
+    tasks: Dict[asyncio.Future, str] = {asyncio.ensure_future(primary()): PRIMARY}
+    errors: Dict[str, BaseException] = {}
+    hedge_started = False
+    try:
+        while True:
+            timeout = _remaining(delay, start, hedge_started)
+            done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                path = tasks.pop(task)
+                try:
+                    result = task.result()
+                except Exception as e:
+                    errors[path] = e
+                    continue
+                if path == PRIMARY:
+                    vision_latency.record(time.perf_counter() - start)
+                hedge_stats.record(path, hedge_started)
+                return result, path
+            if not hedge_started and (not done or PRIMARY in errors):
+                # Primary is slow (or already failed): start the fallback path
+                tasks[asyncio.ensure_future(fallback())] = FALLBACK
+                hedge_started = True
+            elif not tasks:
+                hedge_stats.record_failure()
+                raise errors.get(PRIMARY) or errors[FALLBACK]
+    finally:
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def hedged_sync(
+    primary: Callable[[], T],
+    fallback: Callable[[], T],
+    delay: Optional[float] = None,
+) -> Tuple[T, str]:
+    """Thread-based ``hedged`` for synchronous callers.
+
+    A running thread cannot be interrupted, so the losing path is abandoned
+    (its result discarded) rather than cancelled.
+    """
+    delay = vision_latency.hedge_delay() if delay is None else delay
+    start = time.perf_counter()
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="hedge")
+    futures: Dict[concurrent.futures.Future, str] = {executor.submit(primary): PRIMARY}
+    errors: Dict[str, BaseException] = {}
+    hedge_started = False
+    try:
+        while True:
+            timeout = _remaining(delay, start, hedge_started)
+            done, _ = concurrent.futures.wait(futures, timeout=timeout,
+                                              return_when=concurrent.futures.FIRST_COMPLETED)
+            for fut in done:
+                path = futures.pop(fut)
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    errors[path] = e
+                    continue
+                if path == PRIMARY:
+                    vision_latency.record(time.perf_counter() - start)
+                hedge_stats.record(path, hedge_started)
+                return result, path
+            if not hedge_started and (not done or PRIMARY in errors):
+                futures[executor.submit(fallback)] = FALLBACK
+                hedge_started = True
+            elif not futures:
+                hedge_stats.record_failure()
+                raise errors.get(PRIMARY) or errors[FALLBACK]
+    finally:
+        for fut in futures:
+            fut.cancel()
+        executor.shutdown(wait=False)
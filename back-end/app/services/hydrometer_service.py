@@ -0,0 +1,57 @@
+import contextlib
+from typing import Iterator, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from app.agents.reading_agent import HydrometerReadingAgent
+from app.config.settings import settings
+from app.infrastructure.metrics import timed
+from app.models.schemas import ReadingOutcome
+from app.tools.ocr import VISION, InvalidPdfError, PdfRendererUnavailable, decode_image, dpi_for, render_pdf
+from app.tools.ocr_pool import ocr_pool
+
+
+@contextlib.contextmanager
+def pdf_errors() -> Iterator[None]:
+    """500 only when no PDF renderer is installed; a PDF it cannot parse is the client's 400."""
+    try:
+        yield
+    except PdfRendererUnavailable:
+        raise HTTPException(status_code=500, detail="pdf2image/poppler não disponível para PDFs.")
+    except InvalidPdfError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"PDF inválido: {e}")
+
+
+async def read_upload(
+    agent: HydrometerReadingAgent,
+    suffix: str,
+    content: bytes,
+    consensus: bool = False,
+) -> Tuple[ReadingOutcome, Optional[int]]:
+    """Read one uploaded image or PDF; returns the outcome and, in consensus mode, its votes."""
+    with timed("read"):
+        return await _read_upload(agent, suffix, content, consensus)
+
+
+async def _read_upload(
+    agent: HydrometerReadingAgent,
+    suffix: str,
+    content: bytes,
+    consensus: bool,
+) -> Tuple[ReadingOutcome, Optional[int]]:
+    if suffix == "pdf":
+        if consensus:
+            # Pages 1..MAX_PDF_PAGES are read concurrently as they render;
+            # reading stops as soon as CONSENSUS_MIN_VOTES pages agree.
+            pages = ocr_pool.iter_pdf_pages(content, dpi_for(VISION), last_page=settings.max_pdf_pages)
+            with pdf_errors():
+                outcome, votes = await agent.aread_consensus(pages, settings.consensus_min_votes)
+            return outcome, votes
+        # Without consensus only page 1 is rasterized.
+        with pdf_errors():
+            pages = await ocr_pool.run(render_pdf, content, 1, 1, dpi_for(VISION))
+        if len(pages) == 0:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="PDF sem páginas.")
+        return await agent.aread(pages[0]), None
+    img = await ocr_pool.run(decode_image, content)
+    return await agent.aread(img, source=content), None
@@ -1,12 +1,15 @@
 from typing import Optional
 from fastapi import HTTPException
+from sqlalchemy.orm import Query, Session
 
 from app.infrastructure.db import SessionLocal
+from app.infrastructure.metrics import db_timed
 from app.infrastructure.orm_models import ImovelDB, PessoaDB
 from app.models.schemas import ImovelCreate, Imovel
-from app.services.pagination import resolve_page, resolve_order
+from app.services.pagination import paginate, resolve_order
 
 
+@db_timed
 def criar_imovel(payload: ImovelCreate) -> Imovel:
     with SessionLocal() as db:
         pessoa = db.get(PessoaDB, payload.id_pessoa)
@@ -32,6 +35,39 @@ def criar_imovel(payload: ImovelCreate) -> Imovel:
         )
 
 
+def consulta_imoveis(
+    db: Session,
+    cidade: Optional[str] = None,
+    categoria: Optional[str] = None,
+    ativo: Optional[bool] = None,
+    cep: Optional[str] = None,
+    sort_by: str = "cidade",
+    order: str = "asc",
+) -> Query:
+    """Filtered and ordered query behind ``listar_imoveis`` (also used by the load/plan harness)."""
+    q = db.query(ImovelDB)
+    if cidade:
+        q = q.filter(ImovelDB.cidade.ilike(f"%{cidade}%"))
+    if categoria:
+        q = q.filter(ImovelDB.categoria == categoria)
+    if cep:
+        q = q.filter(ImovelDB.cep == cep)
+    if ativo is not None:
+        q = q.join(PessoaDB).filter(PessoaDB.ativo == ativo)
+
+    sort_map = {
+        "cidade": ImovelDB.cidade,
+        "categoria": ImovelDB.categoria,
+        "cep": ImovelDB.cep,
+        "bairro": ImovelDB.bairro,
+        "uf": ImovelDB.uf,
+    }
+    sort_col = sort_map.get(sort_by, ImovelDB.cidade)
+    order_norm = resolve_order(order)
+    return q.order_by(sort_col.desc() if order_norm == "desc" else sort_col.asc())
+
+
+@db_timed
 def listar_imoveis(
     cidade: Optional[str],
     categoria: Optional[str],
@@ -43,30 +79,8 @@ def listar_imoveis(
     order: str,
 ):
     with SessionLocal() as db:
-        q = db.query(ImovelDB)
-        if cidade:
-            q = q.filter(ImovelDB.cidade.ilike(f"%{cidade}%"))
-        if categoria:
-            q = q.filter(ImovelDB.categoria == categoria)
-        if cep:
-            q = q.filter(ImovelDB.cep == cep)
-        if ativo is not None:
-            q = q.join(PessoaDB).filter(PessoaDB.ativo == ativo)
-
-        sort_map = {
-            "cidade": ImovelDB.cidade,
-            "categoria": ImovelDB.categoria,
-            "cep": ImovelDB.cep,
-            "bairro": ImovelDB.bairro,
-            "uf": ImovelDB.uf,
-        }
-        sort_col = sort_map.get(sort_by, ImovelDB.cidade)
-        order_norm = resolve_order(order)
-        q = q.order_by(sort_col.desc() if order_norm == "desc" else sort_col.asc())
-
-        total = q.count()
-        page_number = resolve_page(page, total, page_size)
-        rows = q.offset((page_number - 1) * page_size).limit(page_size).all()
+        q = consulta_imoveis(db, cidade, categoria, ativo, cep, sort_by, order)
+        total, page_number, rows = paginate(q, page, page_size)
         items = [
             Imovel(
                 matricula=r.matricula,
@@ -86,6 +100,7 @@ def listar_imoveis(
         return total, page_number, items
 
 
+@db_timed
 def obter_imovel(matricula: int) -> Imovel:
     with SessionLocal() as db:
         r = db.get(ImovelDB, matricula)
@@ -107,6 +122,7 @@ def obter_imovel(matricula: int) -> Imovel:
         )
 
 
+@db_timed
 def atualizar_imovel(matricula: int, payload: ImovelCreate) -> Imovel:
     with SessionLocal() as db:
         r = db.get(ImovelDB, matricula)
@@ -135,6 +151,7 @@ def atualizar_imovel(matricula: int, payload: ImovelCreate) -> Imovel:
         )
 
 
+@db_timed
 def remover_imovel(matricula: int) -> None:
     with SessionLocal() as db:
         r = db.get(ImovelDB, matricula)
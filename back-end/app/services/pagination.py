@@ -1,3 +1,8 @@
+from typing import Any, List, Tuple
+
+from sqlalchemy.orm import Query
+
+
 def resolve_page(page: str | int, total: int, page_size: int) -> int:
     try:
         page_str = str(page).strip().lower() if page is not None else "1"
@@ -24,4 +29,12 @@ def resolve_order(order: str | None) -> str:
     if o in ("desc", "decrescente"):
         return "desc"
     # default asc, accepts "asc" and "crescente"
-    return "asc"
\ No newline at end of file
+    return "asc"
+
+
+def paginate(q: Query, page: str | int, page_size: int) -> Tuple[int, int, List[Any]]:
+    """Count ``q``, resolve ``page`` against the total and fetch that page: (total, page, rows)."""
+    total = q.count()
+    page_number = resolve_page(page, total, page_size)
+    rows = q.offset((page_number - 1) * page_size).limit(page_size).all()
+    return total, page_number, rows
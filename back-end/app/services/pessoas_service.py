@@ -1,12 +1,15 @@
 from typing import Optional, List
 from fastapi import HTTPException
+from sqlalchemy.orm import Query, Session
 
 from app.infrastructure.db import SessionLocal
+from app.infrastructure.metrics import db_timed
 from app.infrastructure.orm_models import PessoaDB
 from app.models.schemas import PessoaCreate, Pessoa
-from app.services.pagination import resolve_page, resolve_order
+from app.services.pagination import paginate, resolve_order
 
 
+@db_timed
 def criar_pessoa(payload: PessoaCreate) -> Pessoa:
     with SessionLocal() as db:
         existing = db.query(PessoaDB).filter(PessoaDB.documento == payload.documento).first()
@@ -29,6 +32,48 @@ def criar_pessoa(payload: PessoaCreate) -> Pessoa:
         )
 
 
+def consulta_pessoas(
+    db: Session,
+    tipo_doc: Optional[str] = None,
+    documento: Optional[str] = None,
+    nome: Optional[str] = None,
+    sobre_nome: Optional[str] = None,
+    sexo: Optional[str] = None,
+    ativo: Optional[bool] = None,
+    nascimento: Optional[str] = None,
+    sort_by: str = "nome",
+    order: str = "asc",
+) -> Query:
+    """Filtered and ordered query behind ``listar_pessoas`` (also used by the load/plan harness)."""
+    q = db.query(PessoaDB)
+    if tipo_doc:
+        q = q.filter(PessoaDB.tipo_doc == tipo_doc)
+    if documento:
+        q = q.filter(PessoaDB.documento.contains(documento))
+    if nome:
+        q = q.filter(PessoaDB.nome.ilike(f"%{nome}%"))
+    if sobre_nome:
+        q = q.filter(PessoaDB.sobre_nome.ilike(f"%{sobre_nome}%"))
+    if sexo:
+        q = q.filter(PessoaDB.sexo == sexo)
+    if ativo is not None:
+        q = q.filter(PessoaDB.ativo == ativo)
+    if nascimento:
+        q = q.filter(PessoaDB.nascimento == nascimento)
+    sort_map = {
+        "nome": PessoaDB.nome,
+        "sobre_nome": PessoaDB.sobre_nome,
+        "documento": PessoaDB.documento,
+        "sexo": PessoaDB.sexo,
+        "ativo": PessoaDB.ativo,
+        "nascimento": PessoaDB.nascimento,
+    }
+    sort_col = sort_map.get(sort_by, PessoaDB.nome)
+    order_norm = resolve_order(order)
+    return q.order_by(sort_col.desc() if order_norm == "desc" else sort_col.asc())
+
+
+@db_timed
 def listar_pessoas(
     tipo_doc: Optional[str],
     documento: Optional[str],
@@ -43,36 +88,8 @@ def listar_pessoas(
     order: str,
 ):
     with SessionLocal() as db:
-        q = db.query(PessoaDB)
-        if tipo_doc:
-            q = q.filter(PessoaDB.tipo_doc == tipo_doc)
-        if documento:
-            q = q.filter(PessoaDB.documento.contains(documento))
-        if nome:
-            q = q.filter(PessoaDB.nome.ilike(f"%{nome}%"))
-        if sobre_nome:
-            q = q.filter(PessoaDB.sobre_nome.ilike(f"%{sobre_nome}%"))
-        if sexo:
-            q = q.filter(PessoaDB.sexo == sexo)
-        if ativo is not None:
-            q = q.filter(PessoaDB.ativo == ativo)
-        if nascimento:
-            q = q.filter(PessoaDB.nascimento == nascimento)
-        sort_map = {
-            "nome": PessoaDB.nome,
-            "sobre_nome": PessoaDB.sobre_nome,
-            "documento": PessoaDB.documento,
-            "sexo": PessoaDB.sexo,
-            "ativo": PessoaDB.ativo,
-            "nascimento": PessoaDB.nascimento,
-        }
-        sort_col = sort_map.get(sort_by, PessoaDB.nome)
-        order_norm = resolve_order(order)
-        q = q.order_by(sort_col.desc() if order_norm == "desc" else sort_col.asc())
-
-        total = q.count()
-        page_number = resolve_page(page, total, page_size)
-        rows = q.offset((page_number - 1) * page_size).limit(page_size).all()
+        q = consulta_pessoas(db, tipo_doc, documento, nome, sobre_nome, sexo, ativo, nascimento, sort_by, order)
+        total, page_number, rows = paginate(q, page, page_size)
         items = [
             Pessoa(
                 matricula=r.matricula,
@@ -89,6 +106,7 @@ def listar_pessoas(
         return total, page_number, items
 
 
+@db_timed
 def obter_pessoa(matricula: int) -> Pessoa:
     with SessionLocal() as db:
         r = db.get(PessoaDB, matricula)
@@ -107,6 +125,7 @@ def obter_pessoa(matricula: int) -> Pessoa:
         )
 
 
+@db_timed
 def atualizar_pessoa(matricula: int, payload: PessoaCreate) -> Pessoa:
     with SessionLocal() as db:
         r = db.get(PessoaDB, matricula)
@@ -133,6 +152,7 @@ def atualizar_pessoa(matricula: int, payload: PessoaCreate) -> Pessoa:
         )
 
 
+@db_timed
 def remover_pessoa(matricula: int) -> None:
     with SessionLocal() as db:
         r = db.get(PessoaDB, matricula)
@@ -0,0 +1,206 @@
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from PIL import Image
+
+from app.config.settings import settings
+from app.infrastructure.db import SessionLocal
+from app.infrastructure.metrics import db_timed
+from app.infrastructure.orm_models import LeituraCacheDB
+from app.models.schemas import ReadingOutcome
+
+# Stopgap readings (digits parsed locally while Groq's circuit is open) are
+# served but not stored, so the LLM reads the image again once it is back
+_UNCACHED_PATHS = frozenset({"local"})
+
+
+def cacheable(value: ReadingOutcome) -> bool:
+    return value.caminho not in _UNCACHED_PATHS
+
+
+def image_digest(img: Image.Image) -> str:
+    # Hash of the decoded pixels, so the same photo hits the cache whether it
+    # arrives as a PNG, a JPEG re-upload or a rasterized PDF page.
+    h = hashlib.sha256()
+    h.update(f"{img.mode}:{img.size[0]}x{img.size[1]}:".encode("ascii"))
+    h.update(img.tobytes())
+    return h.hexdigest()
+
+
+def make_key(digest: str, model: str, prompt_version: str) -> str:
+    return hashlib.sha256(f"{digest}|{model}|{prompt_version}".encode("utf-8")).hexdigest()
+
+
+class ReadingCache:
+    """Two-tier cache of meter readings with single-flight de-duplication.
+
+    The first tier is an in-memory LRU with TTL; the optional second tier is
+    the ``leituras_cache`` table. Concurrent lookups of a key that is being
+    computed await the same in-flight call instead of starting another one.
+    Failures and stopgap readings are never cached.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_s: Optional[float] = None,
+                 persist: Optional[bool] = None):
+        self.max_entries = settings.reading_cache_size if max_entries is None else max_entries
+        self.ttl_s = settings.reading_cache_ttl_s if ttl_s is None else ttl_s
+        self.persist = settings.reading_cache_db if persist is None else persist
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple[ReadingOutcome, float]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._memory_hits = 0
+        self._db_hits = 0
+        self._misses = 0
+        self._coalesced = 0
+
+    def _memory_get(self, key: str) -> Optional[ReadingOutcome]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if self.ttl_s > 0 and expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self._memory_hits += 1
+            return value
+
+    def _memory_put(self, key: str, value: ReadingOutcome) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_s)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @db_timed
+    def _db_get(self, key: str) -> Optional[ReadingOutcome]:
+        try:
+            with SessionLocal() as db:
+                row = db.get(LeituraCacheDB, key)
+                if row is None:
+                    return None
+                if self.ttl_s > 0:
+                    criado_em = row.criado_em
+                    if criado_em.tzinfo is None:
+                        criado_em = criado_em.replace(tzinfo=timezone.utc)
+                    if criado_em < datetime.now(timezone.utc) - timedelta(seconds=self.ttl_s):
+                        return None
+                roi = [int(v) for v in row.roi.split(",")] if row.roi else None
+                return ReadingOutcome(valor=row.valor, roi=roi)
+        except Exception:
+            # Persistent tier is best-effort: a DB outage only costs a miss
+            return None
+
+    @db_timed
+    def _db_put(self, key: str, value: ReadingOutcome, model: str) -> None:
+        roi = ",".join(str(v) for v in value.roi) if value.roi else None
+        try:
+            with SessionLocal() as db:
+                db.merge(LeituraCacheDB(chave=key, valor=value.valor, roi=roi, modelo=model,
+                                        criado_em=datetime.now(timezone.utc)))
+                db.commit()
+        except Exception:
+            pass
+
+    def _db_lookup(self, key: str) -> Optional[ReadingOutcome]:
+        value = self._db_get(key)
+        if value is not None:
+            with self._lock:
+                self._db_hits += 1
+            self._memory_put(key, value)
+        return value
+
+    def _count_miss(self) -> None:
+        with self._lock:
+            self._misses += 1
+
+    def get(self, key: str) -> Optional[ReadingOutcome]:
+        value = self._memory_get(key)
+        if value is None and self.persist:
+            value = self._db_lookup(key)
+        if value is None:
+            self._count_miss()
+        return value
+
+    def put(self, key: str, value: ReadingOutcome, model: str = "") -> None:
+        if not cacheable(value):
+            return
+        self._memory_put(key, value)
+        if self.persist:
+            self._db_put(key, value, model)
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[ReadingOutcome]],
+                             model: str = "") -> ReadingOutcome:
+        while True:
+            fut = self._inflight.get(key)
+            if fut is not None:
+                self._coalesced += 1
+                try:
+                    return await asyncio.shield(fut)
+                except asyncio.CancelledError:
+                    if fut.cancelled():
+                        # The leader was cancelled; retry (maybe as the new leader)
+                        continue
+                    raise
+            value = self._memory_get(key)
+            if value is None and self.persist:
+                value = await asyncio.to_thread(self._db_lookup, key)
+            if value is not None:
+                return value
+            if key in self._inflight:
+                continue
+            self._count_miss()
+            break
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            self._inflight.pop(key, None)
+            fut.cancel()
+            raise
+        except BaseException as e:
+            self._inflight.pop(key, None)
+            fut.set_exception(e)
+            fut.exception()  # mark as retrieved when nobody else is waiting
+            raise
+        # Publish to memory before releasing the in-flight slot so no caller
+        # can slip in between and recompute the same key.
+        stored = cacheable(value)
+        if stored:
+            self._memory_put(key, value)
+        self._inflight.pop(key, None)
+        fut.set_result(value)
+        if stored and self.persist:
+            await asyncio.to_thread(self._db_put, key, value, model)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "persist": self.persist,
+                "memory_hits": self._memory_hits,
+                "db_hits": self._db_hits,
+                "misses": self._misses,
+                "coalesced": self._coalesced,
+                "in_flight": len(self._inflight),
+            }
+
+
+reading_cache = ReadingCache()
@@ -0,0 +1,373 @@
+import asyncio
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, func, or_, update
+
+from app.agents.reading_agent import HydrometerReadingAgent
+from app.config.settings import settings
+from app.infrastructure.db import SessionLocal
+from app.infrastructure.metrics import db_timed
+from app.infrastructure.orm_models import LeituraJobDB, LeituraJobItemDB
+from app.models.schemas import LeituraJob, LeituraJobItem, ReadingOutcome
+from app.services.concurrency import error_message
+from app.services.groq_scheduler import BATCH, groq_priority
+from app.services.hydrometer_service import read_upload
+from app.services.pagination import resolve_page
+from app.tools.ocr import warmup_reader
+from app.tools.ocr_pool import ocr_pool
+
+PENDENTE = "pendente"
+PROCESSANDO = "processando"
+CONCLUIDO = "concluido"
+ERRO = "erro"
+_CLAIM_RETRIES = 5
+
+
+class ClaimedItem(NamedTuple):
+    id: int
+    job_id: str
+    filename: str
+    content: bytes
+    lang: str
+    detail: bool
+    consensus: bool
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _suffix(filename: str) -> str:
+    return (filename.split(".")[-1] or "").lower()
+
+
+@db_timed
+def criar_job(uploads: Sequence[Tuple[str, bytes]], lang: str, detail: bool, consensus: bool) -> LeituraJob:
+    """Persist a job and its items; workers pick the items up from the table."""
+    job_id = str(uuid.uuid4())
+    criado_em = _now()
+    with SessionLocal() as db:
+        db.add(LeituraJobDB(id=job_id, lang=lang, detail=detail, consenso=consensus,
+                            total=len(uploads), criado_em=criado_em))
+        db.add_all(
+            LeituraJobItemDB(job_id=job_id, posicao=i, filename=filename, conteudo=content,
+                             status=PENDENTE, tentativas=0)
+            for i, (filename, content) in enumerate(uploads)
+        )
+        db.commit()
+    return LeituraJob(job_id=job_id, status=PENDENTE, total=len(uploads), pendentes=len(uploads),
+                      criado_em=criado_em)
+
+
+@db_timed
+def obter_job(job_id: str) -> LeituraJob:
+    with SessionLocal() as db:
+        job = db.get(LeituraJobDB, job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job não encontrado")
+        counts = dict(
+            db.query(LeituraJobItemDB.status, func.count(LeituraJobItemDB.id))
+            .filter(LeituraJobItemDB.job_id == job_id)
+            .group_by(LeituraJobItemDB.status)
+            .all()
+        )
+        pendentes = counts.get(PENDENTE, 0)
+        processando = counts.get(PROCESSANDO, 0)
+        if pendentes + processando == 0:
+            status = CONCLUIDO
+        elif pendentes == job.total:
+            status = PENDENTE
+        else:
+            status = PROCESSANDO
+        return LeituraJob(
+            job_id=job.id,
+            status=status,
+            total=job.total,
+            pendentes=pendentes,
+            processando=processando,
+            concluidos=counts.get(CONCLUIDO, 0),
+            erros=counts.get(ERRO, 0),
+            criado_em=job.criado_em,
+            finalizado_em=job.finalizado_em,
+        )
+
+
+@db_timed
+def listar_itens(job_id: str, status: Optional[str], page: str, page_size: int):
+    with SessionLocal() as db:
+        if not db.get(LeituraJobDB, job_id):
+            raise HTTPException(status_code=404, detail="Job não encontrado")
+        q = db.query(LeituraJobItemDB).filter(LeituraJobItemDB.job_id == job_id)
+        if status:
+            q = q.filter(LeituraJobItemDB.status == status)
+        total = q.count()
+        page_number = resolve_page(page, total, page_size)
+        rows = (
+            q.order_by(LeituraJobItemDB.posicao.asc())
+            .offset((page_number - 1) * page_size)
+            .limit(page_size)
+            .all()
+        )
+        items = [
+            LeituraJobItem(
+                posicao=r.posicao,
+                filename=r.filename,
+                status=r.status,
+                tentativas=r.tentativas,
+                valor_da_leitura=r.valor,
+                roi=[int(v) for v in r.roi.split(",")] if r.roi else None,
+                votos=r.votos,
+                erro=r.erro,
+            )
+            for r in rows
+        ]
+        return total, page_number, items
+
+
+@db_timed
+def claim_next_item(worker_id: str) -> Optional[ClaimedItem]:
+    """Lease the next pending item (or one whose lease expired) to ``worker_id``.
+
+    ``FOR UPDATE SKIP LOCKED`` lets many workers, in one or several
+    processes, claim from the same table without blocking on each other. An
+    item whose worker died is picked up again once its lease expires, up to
+    ``JOBS_MAX_ATTEMPTS`` claims.
+    """
+    now = _now()
+    expired = and_(LeituraJobItemDB.status == PROCESSANDO, LeituraJobItemDB.lease_ate < now)
+    with SessionLocal() as db:
+        exhausted = and_(expired, LeituraJobItemDB.tentativas >= settings.jobs_max_attempts)
+        job_ids = [job_id for (job_id,) in db.query(LeituraJobItemDB.job_id).filter(exhausted).distinct()]
+        if job_ids:
+            db.execute(
+                update(LeituraJobItemDB)
+                .where(exhausted)
+                .values(status=ERRO, erro="Processamento interrompido repetidamente.", conteudo=None,
+                        lease_ate=None, atualizado_em=now)
+            )
+            db.commit()
+            # The abandoned item may have been the last open one of its job
+            _close_finished_jobs(db, job_ids, now)
+        claimable = or_(LeituraJobItemDB.status == PENDENTE, expired)
+        for _ in range(_CLAIM_RETRIES):
+            row = (
+                db.query(LeituraJobItemDB)
+                .filter(claimable)
+                .order_by(LeituraJobItemDB.id.asc())
+                .limit(1)
+                .with_for_update(skip_locked=True)
+                .first()
+            )
+            if row is None:
+                db.commit()
+                return None
+            # Conditional update: safe even where FOR UPDATE is not supported
+            claimed = db.execute(
+                update(LeituraJobItemDB)
+                .where(LeituraJobItemDB.id == row.id, claimable)
+                .values(status=PROCESSANDO, worker=worker_id, tentativas=LeituraJobItemDB.tentativas + 1,
+                        lease_ate=now + timedelta(seconds=settings.jobs_lease_s), atualizado_em=now)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if claimed:
+                job = row.job
+                item = ClaimedItem(row.id, row.job_id, row.filename, row.conteudo or b"",
+                                   job.lang, job.detail, job.consenso)
+                db.commit()
+                return item
+            db.rollback()
+        # Lost every race to other workers; the caller polls again
+        return None
+
+
+@db_timed
+def _finish_item(item_id: int, worker_id: str, **values: Any) -> None:
+    now = _now()
+    with SessionLocal() as db:
+        # Only the worker holding the lease may record the outcome
+        result = db.execute(
+            update(LeituraJobItemDB)
+            .where(LeituraJobItemDB.id == item_id, LeituraJobItemDB.worker == worker_id,
+                   LeituraJobItemDB.status == PROCESSANDO)
+            .values(conteudo=None, lease_ate=None, atualizado_em=now, **values)
+        )
+        db.commit()
+        if result.rowcount == 0:
+            return
+        _close_finished_jobs(db, [db.get(LeituraJobItemDB, item_id).job_id], now)
+
+
+def _close_finished_jobs(db, job_ids: Sequence[str], now: datetime) -> None:
+    """Stamp ``finalizado_em`` on the jobs in ``job_ids`` that have no open item left."""
+    for job_id in job_ids:
+        remaining = (
+            db.query(func.count(LeituraJobItemDB.id))
+            .filter(LeituraJobItemDB.job_id == job_id,
+                    LeituraJobItemDB.status.in_((PENDENTE, PROCESSANDO)))
+            .scalar()
+        )
+        if remaining == 0:
+            db.execute(
+                update(LeituraJobDB)
+                .where(LeituraJobDB.id == job_id, LeituraJobDB.finalizado_em.is_(None))
+                .values(finalizado_em=now)
+            )
+    db.commit()
+
+
+@db_timed
+def renew_lease(item_id: int, worker_id: str) -> bool:
+    """Push the lease of an item ``worker_id`` still holds ``JOBS_LEASE_S`` ahead; False once it is lost."""
+    now = _now()
+    with SessionLocal() as db:
+        result = db.execute(
+            update(LeituraJobItemDB)
+            .where(LeituraJobItemDB.id == item_id, LeituraJobItemDB.worker == worker_id,
+                   LeituraJobItemDB.status == PROCESSANDO)
+            .values(lease_ate=now + timedelta(seconds=settings.jobs_lease_s), atualizado_em=now)
+        )
+        db.commit()
+        return result.rowcount > 0
+
+
+def complete_item(item_id: int, worker_id: str, outcome: ReadingOutcome, votes: Optional[int]) -> None:
+    roi = ",".join(str(v) for v in outcome.roi) if outcome.roi else None
+    _finish_item(item_id, worker_id, status=CONCLUIDO, valor=outcome.valor, roi=roi, votos=votes, erro=None)
+
+
+def fail_item(item_id: int, worker_id: str, erro: str) -> None:
+    _finish_item(item_id, worker_id, status=ERRO, erro=erro)
+
+
+def release_item(item_id: int, worker_id: str) -> None:
+    """Hand an unfinished item back to the queue (graceful shutdown)."""
+    with SessionLocal() as db:
+        db.execute(
+            update(LeituraJobItemDB)
+            .where(LeituraJobItemDB.id == item_id, LeituraJobItemDB.worker == worker_id,
+                   LeituraJobItemDB.status == PROCESSANDO)
+            .values(status=PENDENTE, worker=None, lease_ate=None,
+                    tentativas=LeituraJobItemDB.tentativas - 1)
+        )
+        db.commit()
+
+
+class JobWorkerPool:
+    """Background workers that drain ``leituras_job_itens``.
+
+    Runs ``JOBS_WORKERS`` asyncio tasks in the API process. Each one claims an
+    item, reads it with ``HydrometerReadingAgent`` at batch priority (behind
+    interactive reads in the Groq scheduler) and stores the outcome. Workers
+    poll every ``JOBS_POLL_S`` and are woken up right away by ``notify()``.
+    """
+
+    def __init__(self, workers: Optional[int] = None, poll_s: Optional[float] = None):
+        self.workers = settings.jobs_workers if workers is None else workers
+        self.poll_s = settings.jobs_poll_s if poll_s is None else poll_s
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._agents: Dict[Tuple[str, bool], HydrometerReadingAgent] = {}
+        self._busy = 0
+        self._done = 0
+        self._failed = 0
+
+    async def start(self) -> None:
+        if self._tasks or self.workers <= 0:
+            return
+        self._wakeup = asyncio.Event()
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._tasks = [asyncio.create_task(self._worker(f"{prefix}:{n}")) for n in range(self.workers)]
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def notify(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _agent(self, lang: str, detail: bool) -> HydrometerReadingAgent:
+        agent = self._agents.get((lang, detail))
+        if agent is None:
+            await ocr_pool.run(warmup_reader, lang)
+            agent = self._agents[(lang, detail)] = HydrometerReadingAgent(lang=lang, detail=detail)
+        return agent
+
+    async def _idle(self) -> None:
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), self.poll_s)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _worker(self, worker_id: str) -> None:
+        with groq_priority(BATCH):
+            while True:
+                try:
+                    item = await asyncio.to_thread(claim_next_item, worker_id)
+                except Exception:
+                    # Database unavailable: try again later
+                    item = None
+                if item is None:
+                    await self._idle()
+                    continue
+                try:
+                    await self._run_item(item, worker_id)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    # Outcome not stored (DB error): the lease expires and the
+                    # item is claimed again
+                    pass
+
+    async def _heartbeat(self, item_id: int, worker_id: str) -> None:
+        # Batch reads can wait behind interactive traffic in the Groq
+        # scheduler for longer than the lease: keep it alive while the item
+        # is in progress so it is not claimed (and read) a second time
+        interval = max(settings.jobs_lease_s / 3, 0.01)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not await asyncio.to_thread(renew_lease, item_id, worker_id):
+                    return
+            except Exception:
+                # Database hiccup: retry on the next beat, the lease still has time
+                pass
+
+    async def _run_item(self, item: ClaimedItem, worker_id: str) -> None:
+        self._busy += 1
+        heartbeat = asyncio.create_task(self._heartbeat(item.id, worker_id))
+        try:
+            agent = await self._agent(item.lang, item.detail)
+            outcome, votes = await read_upload(agent, _suffix(item.filename), item.content, item.consensus)
+        except asyncio.CancelledError:
+            await asyncio.to_thread(release_item, item.id, worker_id)
+            raise
+        except Exception as e:
+            self._failed += 1
+            await asyncio.to_thread(fail_item, item.id, worker_id, error_message(e))
+        else:
+            self._done += 1
+            await asyncio.to_thread(complete_item, item.id, worker_id, outcome, votes)
+        finally:
+            heartbeat.cancel()
+            self._busy -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._tasks),
+            "busy": self._busy,
+            "completed": self._done,
+            "failed": self._failed,
+        }
+
+
+job_workers = JobWorkerPool()
@@ -0,0 +1,57 @@
+import json
+from typing import Any, AsyncIterator, Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+NDJSON = "ndjson"
+SSE = "sse"
+
+_MEDIA_TYPES = {NDJSON: "application/x-ndjson", SSE: "text/event-stream"}
+_ACCEPT = {
+    "application/x-ndjson": NDJSON,
+    "application/ndjson": NDJSON,
+    "application/jsonl": NDJSON,
+    "text/event-stream": SSE,
+}
+
+
+def stream_format(request: Request, stream: Optional[str]) -> Optional[str]:
+    """Streaming format asked for by ``?stream=`` (ndjson, sse, true) or the Accept header."""
+    if stream:
+        value = stream.strip().lower()
+        if value in (NDJSON, SSE):
+            return value
+        if value in ("1", "true", "yes"):
+            return NDJSON
+        return None
+    for part in request.headers.get("accept", "").split(","):
+        fmt = _ACCEPT.get(part.split(";")[0].strip().lower())
+        if fmt:
+            return fmt
+    return None
+
+
+async def _encode(events: AsyncIterator[Dict[str, Any]], fmt: str) -> AsyncIterator[bytes]:
+    count = 0
+    async for event in events:
+        count += 1
+        if fmt == SSE:
+            name = event.get("event", "message")
+            yield f"id: {count}\nevent: {name}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8")
+        else:
+            yield (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+    end = {"event": "end", "events": count}
+    if fmt == SSE:
+        yield f"event: end\ndata: {json.dumps(end)}\n\n".encode("utf-8")
+    else:
+        yield (json.dumps(end) + "\n").encode("utf-8")
+
+
+def stream_events(events: AsyncIterator[Dict[str, Any]], fmt: str,
+                  background: Optional[BackgroundTask] = None) -> StreamingResponse:
+    """One NDJSON line or SSE event per item of ``events``, flushed as it is produced."""
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(_encode(events, fmt), media_type=_MEDIA_TYPES[fmt], headers=headers,
+                             background=background)
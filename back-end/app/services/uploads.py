@@ -0,0 +1,182 @@
+import hashlib
+import json
+from typing import Iterable, List, NamedTuple, Optional
+
+from fastapi import HTTPException, UploadFile, status
+
+from app.config.settings import settings
+from app.infrastructure.metrics import timed
+
+# File signatures per extension; PDFs may carry a few junk bytes before the header
+_MAGIC = {
+    "png": (b"\x89PNG\r\n\x1a\n",),
+    "jpg": (b"\xff\xd8\xff",),
+    "jpeg": (b"\xff\xd8\xff",),
+}
+_PDF_MAGIC = b"%PDF-"
+_PDF_HEADER_WINDOW = 1024
+
+
+class Upload(NamedTuple):
+    filename: str
+    suffix: str
+    content: bytes
+    size: int
+    sha256: str
+
+
+def _suffix(filename: str) -> str:
+    return (filename.split(".")[-1] or "").lower()
+
+
+def matches_magic(suffix: str, head: bytes) -> bool:
+    if suffix == "pdf":
+        return _PDF_MAGIC in head[:_PDF_HEADER_WINDOW]
+    signatures = _MAGIC.get(suffix)
+    return signatures is None or any(head.startswith(sig) for sig in signatures)
+
+
+def _too_large(filename: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                         detail=f"Arquivo excede {settings.max_file_size_mb} MB: {filename}")
+
+
+async def ingest(upload: UploadFile, allowed: Optional[Iterable[str]] = None) -> Upload:
+    """Validate and read one upload in ``UPLOAD_CHUNK_KB`` chunks.
+
+    Rejects (400/413) on the extension, the declared size, the magic bytes of
+    the first chunk, or as soon as the bytes read cross ``MAX_FILE_SIZE_MB``
+    so an oversize or mislabelled file is never read in full. The sha256 is
+    computed while reading.
+    """
+    filename = upload.filename or "file"
+    suffix = _suffix(filename)
+    allowed = tuple(settings.allowed_extensions if allowed is None else allowed)
+    if suffix not in allowed:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Tipo de arquivo não permitido: {suffix}")
+    limit = settings.max_file_size_mb * 1024 * 1024
+    if upload.size is not None and upload.size > limit:
+        raise _too_large(filename)
+
+    chunk_size = max(settings.upload_chunk_kb, 1) * 1024
+    digest = hashlib.sha256()
+    chunks: List[bytes] = []
+    size = 0
+    with timed("upload"):
+        while True:
+            chunk = await upload.read(chunk_size)
+            if not chunk:
+                break
+            if not chunks and not matches_magic(suffix, chunk):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                    detail=f"Conteúdo não corresponde ao tipo {suffix}: {filename}")
+            size += len(chunk)
+            if size > limit:
+                raise _too_large(filename)
+            digest.update(chunk)
+            chunks.append(chunk)
+    content = chunks[0] if len(chunks) == 1 else b"".join(chunks)
+    return Upload(filename, suffix, content, size, digest.hexdigest())
+
+
+async def ingest_all(files: List[UploadFile], allowed: Optional[Iterable[str]] = None) -> List[Upload]:
+    """Ingest every upload in order, closing all of them afterwards."""
+    uploads = []
+    try:
+        for f in files:
+            uploads.append(await ingest(f, allowed))
+    finally:
+        for f in files:
+            await f.close()
+    return uploads
+
+
+_MB = 1024 * 1024
+# Routes that take a whole batch in one body (an archive, a job's files)
+BULK_UPLOAD_PATHS = ("/api/hydrometer/archive", "/api/hydrometer/jobs")
+# Multipart boundaries, part headers and form fields on top of the files
+_FORM_OVERHEAD = _MB
+
+
+def request_limit(path: str) -> int:
+    """Largest request body accepted on ``path``, in bytes (0: no limit).
+
+    ``MAX_REQUEST_MB`` only covers the bulk routes; the others accept at most
+    ``MAX_FILES_PER_REQUEST`` files of ``MAX_FILE_SIZE_MB`` each.
+    """
+    if path.startswith(BULK_UPLOAD_PATHS):
+        return settings.max_request_mb * _MB
+    return settings.max_files_per_request * settings.max_file_size_mb * _MB + _FORM_OVERHEAD
+
+
+class _BodyTooLarge(HTTPException):
+    # An HTTPException so FastAPI's form parsing lets it through as a 413
+    def __init__(self, max_bytes: int):
+        super().__init__(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                         detail=f"Requisição excede {max_bytes / _MB:g} MB")
+
+
+class BodySizeLimitMiddleware:
+    """Reject request bodies over the route's limit before they are spooled.
+
+    Starlette spools multipart uploads to memory/temp files before a route
+    runs, so per-file checks in the route come too late for huge requests.
+    This ASGI middleware answers 413 on an oversize ``Content-Length`` right
+    away, and stops chunked bodies as soon as the running count crosses the
+    limit. The limit comes from :func:`request_limit` unless ``max_bytes``
+    fixes one for every route.
+    """
+
+    def __init__(self, app, max_bytes: Optional[int] = None):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        max_bytes = request_limit(scope.get("path", "")) if self.max_bytes is None else self.max_bytes
+        if max_bytes <= 0:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        try:
+            declared = int(headers.get(b"content-length", b"-1"))
+        except ValueError:
+            declared = -1
+        if declared > max_bytes:
+            await self._reject(send, max_bytes)
+            return
+
+        received = 0
+        started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    raise _BodyTooLarge(max_bytes)
+            return message
+
+        async def tracking_send(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except _BodyTooLarge:
+            if not started:
+                await self._reject(send, max_bytes)
+
+    async def _reject(self, send, max_bytes: int) -> None:
+        body = json.dumps({"detail": _BodyTooLarge(max_bytes).detail}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
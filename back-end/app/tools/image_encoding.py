@@ -0,0 +1,92 @@
+import base64
+import io
+import threading
+from typing import Any, Dict, NamedTuple, Optional
+
+from PIL import Image
+
+from app.config.settings import settings
+from app.infrastructure.metrics import timed_stage
+
+JPEG_MAGIC = b"\xff\xd8\xff"
+_MIME = {"jpeg": "image/jpeg", "webp": "image/webp", "png": "image/png"}
+
+
+class EncodedImage(NamedTuple):
+    b64: str
+    mime: str
+    nbytes: int
+    width: int
+    height: int
+    reencoded: bool
+
+
+def _target_size(width: int, height: int, max_side: int):
+    scale = min(1.0, max_side / float(max(width, height)))
+    return max(int(width * scale), 1), max(int(height * scale), 1)
+
+
+@timed_stage("encode")
+def encode_for_vision(img: Image.Image, source: Optional[bytes] = None) -> EncodedImage:
+    """Encode ``img`` for the vision model at the resolution it actually uses.
+
+    ``source`` is the original upload when ``img`` is its untouched decode:
+    a compact JPEG that already fits ``VISION_MAX_SIDE`` is sent as-is.
+    Otherwise the image is downsized and re-encoded as JPEG or WebP
+    (``VISION_FORMAT``) at ``VISION_QUALITY``.
+    """
+    max_side = settings.vision_max_side
+    width, height = img.size
+    if (
+        source is not None
+        and source.startswith(JPEG_MAGIC)
+        and max(width, height) <= max_side
+        and len(source) <= settings.vision_passthrough_kb * 1024
+    ):
+        return EncodedImage(base64.b64encode(source).decode("ascii"), "image/jpeg", len(source), width, height, False)
+
+    size = _target_size(width, height, max_side)
+    if size != (width, height):
+        img = img.resize(size, Image.LANCZOS, reducing_gap=2.0)
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    fmt = settings.vision_format if settings.vision_format in _MIME else "jpeg"
+    buf = io.BytesIO()
+    if fmt == "png":
+        img.save(buf, format="PNG", optimize=False)
+    else:
+        img.save(buf, format=fmt.upper(), quality=settings.vision_quality)
+    data = buf.getvalue()
+    return EncodedImage(base64.b64encode(data).decode("ascii"), _MIME[fmt], len(data), size[0], size[1], True)
+
+
+class EncodingStats:
+    """Bytes sent to the vision model, recorded in the process that calls Groq."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._bytes = 0
+        self._passthrough = 0
+        self._last_bytes = 0
+
+    def record(self, encoded: EncodedImage) -> None:
+        with self._lock:
+            self._calls += 1
+            self._bytes += encoded.nbytes
+            self._last_bytes = encoded.nbytes
+            if not encoded.reencoded:
+                self._passthrough += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self._calls,
+                "bytes_total": self._bytes,
+                "bytes_avg": round(self._bytes / self._calls) if self._calls else 0,
+                "bytes_last": self._last_bytes,
+                "passthrough": self._passthrough,
+            }
+
+
+encoding_stats = EncodingStats()
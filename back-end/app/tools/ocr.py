@@ -1,83 +1,364 @@
 import argparse
+import base64
+import contextlib
+import io
 import os
-from typing import List, Optional
+import queue
+import threading
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar, Union
 
 import numpy as np
 from PIL import Image
 
-try:
-    import cv2  # type: ignore
-except Exception:
-    cv2 = None
+from app.config.settings import settings
+from app.infrastructure.lazy import optional_module
+from app.infrastructure.metrics import timed, timed_stage
+from app.tools.preprocess import default_pipeline
+from app.tools.reader_registry import reader_registry
 
-try:
-    from pdf2image import convert_from_path, convert_from_bytes  # type: ignore
-except Exception:
-    convert_from_path = None
-    convert_from_bytes = None
+# pdfium is not thread-safe; serialize calls within a process
+_PDFIUM_LOCK = threading.Lock()
 
-try:
-    import easyocr  # type: ignore
-except Exception:
-    easyocr = None
+
+class PdfRendererUnavailable(RuntimeError):
+    """Neither pypdfium2 nor pdf2image/poppler is installed (a server problem)."""
+
+
+class InvalidPdfError(ValueError):
+    """The renderer could not parse the document (corrupt or not a PDF)."""
+
+
+def _pdf_parse_errors() -> tuple:
+    errors = []
+    pdfium = optional_module("pypdfium2")
+    if pdfium is not None:
+        errors.append(pdfium.PdfiumError)
+    exceptions = optional_module("pdf2image.exceptions")
+    if exceptions is not None:
+        errors += [exceptions.PDFPageCountError, exceptions.PDFSyntaxError]
+    return tuple(errors)
+
+
+@contextlib.contextmanager
+def _parsing_pdf() -> Iterator[None]:
+    # pdfium's PdfiumError is a RuntimeError: keep it apart from a missing renderer
+    try:
+        yield
+    except _pdf_parse_errors() as e:
+        raise InvalidPdfError(str(e) or e.__class__.__name__) from e
 
 
 def _ensure_reader(lang: str = "pt"):
-    if easyocr is None:
-        raise RuntimeError("EasyOCR is not installed. Install dependencies first.")
-    return easyocr.Reader([lang], gpu=False)
+    return reader_registry.get([lang], gpu=settings.ocr_gpu)
 
 
-def _load_images(path: str) -> List[Image.Image]:
+def warmup_reader(lang: str = "pt") -> None:
+    # Picklable variant of _ensure_reader for the OCR pool (returns nothing)
+    _ensure_reader(lang)
+
+
+@timed_stage("decode")
+def decode_image(content: bytes) -> Image.Image:
+    return Image.open(io.BytesIO(content)).convert("RGB")
+
+
+PdfSource = Union[str, bytes, BinaryIO]
+T = TypeVar("T")
+
+# DPI per use: the vision model downsamples large images anyway, while
+# EasyOCR benefits from the extra resolution on small dial digits.
+VISION = "vision"
+OCR = "ocr"
+
+
+def dpi_for(purpose: str) -> int:
+    return settings.pdf_vision_dpi if purpose == VISION else settings.pdf_ocr_dpi
+
+
+def pdf_page_count(source: PdfSource) -> int:
+    pdfium = optional_module("pypdfium2")
+    if pdfium is not None:
+        with _PDFIUM_LOCK, _parsing_pdf():
+            doc = pdfium.PdfDocument(source)
+            try:
+                return len(doc)
+            finally:
+                doc.close()
+    try:
+        from pdf2image import pdfinfo_from_bytes, pdfinfo_from_path  # type: ignore
+        from pdf2image.exceptions import PDFInfoNotInstalledError  # type: ignore
+    except Exception:
+        raise PdfRendererUnavailable("pdf2image/poppler not available to convert PDFs.")
+    try:
+        with _parsing_pdf():
+            if isinstance(source, str):
+                info = pdfinfo_from_path(source)
+            else:
+                info = pdfinfo_from_bytes(source if isinstance(source, bytes) else source.read())
+    except PDFInfoNotInstalledError:
+        raise PdfRendererUnavailable("pdf2image/poppler not available to convert PDFs.")
+    return int(info.get("Pages", 0))
+
+
+def iter_pdf_pages(
+    source: PdfSource,
+    first_page: int = 1,
+    last_page: Optional[int] = None,
+    dpi: Optional[int] = None,
+) -> Iterator[Image.Image]:
+    """Yield pages ``first_page..last_page`` (1-based, inclusive) one at a time as RGB.
+
+    Uses pypdfium2 (in-memory, no temp files) when installed, otherwise
+    pdf2image/poppler restricted to the same page range and rendered with
+    ``PDF_RENDER_THREADS`` threads. Only the page being yielded is held.
+    """
+    dpi = dpi or settings.pdf_ocr_dpi
+    first_page = max(first_page, 1)
+    pdfium = optional_module("pypdfium2")
+    if pdfium is not None:
+        with _PDFIUM_LOCK, _parsing_pdf():
+            doc = pdfium.PdfDocument(source)
+            total = len(doc)
+        try:
+            last = total if last_page is None else min(last_page, total)
+            for index in range(first_page - 1, last):
+                with _PDFIUM_LOCK, _parsing_pdf():
+                    page = doc[index]
+                    try:
+                        img = page.render(scale=dpi / 72).to_pil().convert("RGB")
+                    finally:
+                        page.close()
+                yield img
+        finally:
+            with _PDFIUM_LOCK:
+                doc.close()
+        return
+    pdf2image = optional_module("pdf2image")
+    if pdf2image is None:
+        raise PdfRendererUnavailable("pdf2image/poppler not available to convert PDFs.")
+    if not isinstance(source, (str, bytes)):
+        source = source.read()
+    total = pdf_page_count(source)
+    last = total if last_page is None else min(last_page, total)
+    for number in range(first_page, last + 1):
+        kwargs = {"dpi": dpi, "first_page": number, "last_page": number}
+        with _parsing_pdf():
+            if isinstance(source, str):
+                pages = pdf2image.convert_from_path(source, **kwargs)
+            else:
+                pages = pdf2image.convert_from_bytes(source, **kwargs)
+        for p in pages:
+            yield p.convert("RGB")
+
+
+@timed_stage("rasterize")
+def render_pdf(
+    source: PdfSource,
+    first_page: int = 1,
+    last_page: Optional[int] = None,
+    dpi: Optional[int] = None,
+) -> List[Image.Image]:
+    """Rasterize only pages ``first_page..last_page`` (1-based, inclusive) as RGB."""
+    dpi = dpi or settings.pdf_ocr_dpi
+    pdf2image = optional_module("pdf2image")
+    if optional_module("pypdfium2") is None and pdf2image is not None:
+        # Whole range in one poppler call so PDF_RENDER_THREADS can split it
+        kwargs = {"dpi": dpi, "first_page": first_page, "last_page": last_page,
+                  "thread_count": settings.pdf_render_threads}
+        try:
+            with _parsing_pdf():
+                if isinstance(source, str):
+                    pages = pdf2image.convert_from_path(source, **kwargs)
+                else:
+                    pages = pdf2image.convert_from_bytes(source if isinstance(source, bytes) else source.read(), **kwargs)
+        except pdf2image.exceptions.PDFInfoNotInstalledError:
+            raise PdfRendererUnavailable("pdf2image/poppler not available to convert PDFs.")
+        return [p.convert("RGB") for p in pages]
+    return list(iter_pdf_pages(source, first_page, last_page, dpi))
+
+
+def prefetch(iterable: Iterable[T], lookahead: int = 1) -> Iterator[T]:
+    """Iterate ``iterable`` in a background thread, keeping at most ``lookahead`` items ready.
+
+    Lets the producer (e.g. rendering page N+1) overlap with the consumer
+    (recognizing page N) while bounding how many items are alive at once.
+    """
+    if lookahead <= 0:
+        yield from iterable
+        return
+    items: "queue.Queue[Tuple[bool, Any]]" = queue.Queue(maxsize=lookahead)
+    stop = threading.Event()
+    done = object()
+
+    def put(item: Tuple[bool, Any]) -> bool:
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in iterable:
+                if not put((True, item)):
+                    return
+            put((True, done))
+        except BaseException as e:
+            put((False, e))
+
+    worker = threading.Thread(target=produce, name="ocr-prefetch", daemon=True)
+    worker.start()
+    try:
+        while True:
+            ok, item = items.get()
+            if not ok:
+                raise item
+            if item is done:
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+def encode_png_b64(img: Image.Image) -> str:
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return base64.b64encode(buf.getvalue()).decode("ascii")
+
+
+def _iter_images(path: str) -> Iterator[Image.Image]:
     if not os.path.exists(path):
         raise FileNotFoundError(f"Input file not found: {path}")
     suffix = os.path.splitext(path)[1].lower()
     if suffix in {".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp"}:
-        return [Image.open(path).convert("RGB")]
+        yield Image.open(path).convert("RGB")
     elif suffix == ".pdf":
-        if convert_from_path is None:
-            raise RuntimeError("pdf2image/poppler not available to convert PDFs.")
-        pages = convert_from_path(path, dpi=300)
-        if not pages:
+        found = False
+        for page in iter_pdf_pages(path, dpi=dpi_for(OCR)):
+            found = True
+            yield page
+        if not found:
             raise RuntimeError("No pages found in PDF.")
-        return [p.convert("RGB") for p in pages]
     else:
         raise ValueError(f"Unsupported file type: {suffix}")
 
 
+def _load_images(path: str) -> List[Image.Image]:
+    return list(_iter_images(path))
+
+
+@timed_stage("preprocess")
 def _preprocess(img: Image.Image) -> np.ndarray:
-    arr = np.array(img)
-    if cv2 is None:
+    # Single-channel output: EasyOCR takes grayscale directly, so there is no
+    # round-trip back to RGB (see app/tools/preprocess.py for the steps).
+    return default_pipeline().run(img)[0]
+
+
+def _format_lines(results, detail: bool) -> List[str]:
+    if detail:
+        return [f"{text} (conf={conf:.3f})" for (_, text, conf) in results]
+    return [text for (_, text, _) in results]
+
+
+def _pad_to(arr: np.ndarray, height: int, width: int) -> np.ndarray:
+    h, w = arr.shape[:2]
+    if (h, w) == (height, width):
         return arr
-    gray = cv2.cvtColor(arr, cv2.COLOR_RGB2GRAY)
-    thr = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                                cv2.THRESH_BINARY, 31, 10)
-    return cv2.cvtColor(thr, cv2.COLOR_GRAY2RGB)
-
-
-def run_ocr(path: str, lang: str = "pt", detail: bool = False) -> List[List[str]]:
-    reader = _ensure_reader(lang)
-    images = _load_images(path)
-    pages_text: List[List[str]] = []
-    for img in images:
-        pre = _preprocess(img)
-        results = reader.readtext(pre)
-        if detail:
-            lines = [f"{text} (conf={conf:.3f})" for (_, text, conf) in results]
-        else:
-            lines = [text for (_, text, _) in results]
-        pages_text.append(lines)
-    return pages_text
+    # White border: matches the thresholded page background
+    padded = np.full((height, width) + arr.shape[2:], 255, dtype=arr.dtype)
+    padded[:h, :w] = arr
+    return padded
+
+
+# Batch buckets: heights and widths rounded up to this many pixels
+_BUCKET_GRID = 32
+
+
+def _recognize_batch(reader, arrays: Sequence[np.ndarray], batch_size: int) -> List[list]:
+    """Run EasyOCR's batched entry point over arrays of possibly different sizes.
+
+    readtext_batched needs equally sized inputs, so arrays are bucketed by
+    height and width rounded up to ``_BUCKET_GRID`` (at most batch_size per
+    bucket) and padded to the bucket's largest height/width instead of being
+    distorted. A wide strip and a tall crop of the same area never share a
+    bucket, so padding stays under one grid step per side.
+    """
+    buckets: Dict[Tuple[int, int], List[int]] = {}
+    for i, arr in enumerate(arrays):
+        key = (-(-arr.shape[0] // _BUCKET_GRID), -(-arr.shape[1] // _BUCKET_GRID))
+        buckets.setdefault(key, []).append(i)
+    results: List[list] = [[] for _ in arrays]
+    for indices in buckets.values():
+        for start in range(0, len(indices), batch_size):
+            bucket = indices[start:start + batch_size]
+            height = max(arrays[i].shape[0] for i in bucket)
+            width = max(arrays[i].shape[1] for i in bucket)
+            batch = [_pad_to(arrays[i], height, width) for i in bucket]
+            for i, found in zip(bucket, reader.readtext_batched(batch, batch_size=batch_size)):
+                results[i] = found
+    return results
+
+
+def run_ocr_batch(images: Sequence[Image.Image], lang: str = "pt", detail: bool = False,
+                  batch_size: Optional[int] = None) -> List[List[str]]:
+    """OCR several images (pages, uploads, ROI crops) in batched detection/recognition calls."""
+    batch_size = batch_size or settings.ocr_batch_size
+    arrays = [_preprocess(img) for img in images]
+    if not arrays:
+        return []
+    with reader_registry.acquire([lang], gpu=settings.ocr_gpu) as reader, timed("ocr"):
+        found = _recognize_batch(reader, arrays, batch_size)
+    return [_format_lines(r, detail) for r in found]
+
+
+def iter_ocr_pages(path: str, lang: str = "pt", detail: bool = False,
+                   lookahead: Optional[int] = None, batch_size: int = 1) -> Iterator[List[str]]:
+    """Render, preprocess and OCR one page (or ``batch_size`` pages) at a time.
+
+    Rendering/preprocessing of the next ``lookahead`` pages runs in a
+    background thread while the current page is recognized, so memory stays
+    flat regardless of the page count.
+    """
+    lookahead = settings.pdf_lookahead if lookahead is None else lookahead
+    # Validate before spawning the prefetch thread so errors surface here
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Input file not found: {path}")
+    prepared = prefetch((_preprocess(img) for img in _iter_images(path)), max(lookahead, batch_size))
+    with reader_registry.acquire([lang], gpu=settings.ocr_gpu) as reader:
+        if batch_size <= 1:
+            for pre in prepared:
+                # Timed around recognition only, never across the yield
+                with timed("ocr"):
+                    found = reader.readtext(pre)
+                yield _format_lines(found, detail)
+            return
+        batch: List[np.ndarray] = []
+        for pre in prepared:
+            batch.append(pre)
+            if len(batch) == batch_size:
+                with timed("ocr"):
+                    results = _recognize_batch(reader, batch, batch_size)
+                for found in results:
+                    yield _format_lines(found, detail)
+                batch = []
+        if batch:
+            with timed("ocr"):
+                results = _recognize_batch(reader, batch, batch_size)
+            for found in results:
+                yield _format_lines(found, detail)
+
+
+def run_ocr(path: str, lang: str = "pt", detail: bool = False, batch_size: int = 1) -> List[List[str]]:
+    return list(iter_ocr_pages(path, lang=lang, detail=detail, batch_size=batch_size))
 
 
 def run_ocr_image(img: Image.Image, lang: str = "pt", detail: bool = False) -> List[str]:
-    reader = _ensure_reader(lang)
     pre = _preprocess(img)
-    results = reader.readtext(pre)
-    if detail:
-        return [f"{text} (conf={conf:.3f})" for (_, text, conf) in results]
-    else:
-        return [text for (_, text, _) in results]
+    with reader_registry.acquire([lang], gpu=settings.ocr_gpu) as reader, timed("ocr"):
+        results = reader.readtext(pre)
+    return _format_lines(results, detail)
 
 
 def save_text(pages: List[List[str]], output: Optional[str], per_page: bool) -> None:
@@ -106,14 +387,32 @@ def save_text(pages: List[List[str]], output: Optional[str], per_page: bool) ->
 
 def main():
     parser = argparse.ArgumentParser(description="Simple OCR pipeline using EasyOCR")
-    parser.add_argument("input", help="Path to image or PDF file")
-    parser.add_argument("-o", "--output", help="Path to save extracted text")
+    parser.add_argument("input", help="Path to image or PDF file, or a directory/glob (quote it) for batch mode")
+    parser.add_argument("-o", "--output", help="Path to save extracted text (JSONL results in batch mode)")
     parser.add_argument("-l", "--lang", default="pt", help="OCR language (default: pt)")
     parser.add_argument("-d", "--detail", action="store_true", help="Include confidence values")
     parser.add_argument("--per-page", action="store_true", help="When outputting PDFs, save one file per page")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="Recognize this many pages per batched EasyOCR call (default: 1)")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="Batch mode: worker processes, each with its own model (default: CPU count; 0 = in-process)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Batch mode: skip files already recorded in the output JSONL")
+    parser.add_argument("--progress-every", type=float, default=5.0,
+                        help="Batch mode: seconds between throughput reports (default: 5)")
     args = parser.parse_args()
 
-    pages = run_ocr(args.input, lang=args.lang, detail=args.detail)
+    # Imported here: ocr_directory (and ocr_pool) build on this module
+    from app.tools.ocr_directory import is_batch_input, run_directory
+
+    if is_batch_input(args.input):
+        if not args.output:
+            parser.error("batch mode needs -o/--output for the JSONL results")
+        run_directory(args.input, args.output, lang=args.lang, detail=args.detail, batch_size=args.batch_size,
+                      workers=args.workers, resume=args.resume, progress_every_s=args.progress_every)
+        return
+
+    pages = run_ocr(args.input, lang=args.lang, detail=args.detail, batch_size=args.batch_size)
     save_text(pages, args.output, args.per_page)
 
 
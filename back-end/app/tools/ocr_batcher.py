@@ -0,0 +1,109 @@
+import asyncio
+import contextvars
+import time
+import weakref
+from typing import Dict, List, Optional, Set, Tuple
+
+from PIL import Image
+
+from app.config.settings import settings
+from app.infrastructure import request_timing
+from app.tools.ocr import run_ocr_batch
+from app.tools.ocr_pool import ocr_pool
+
+
+class OCRBatcher:
+    """Groups concurrent OCR requests into batched EasyOCR calls.
+
+    Requests arriving within ``window_ms`` of each other (across files and
+    requests in this process) are recognized together with ``run_ocr_batch``
+    on the OCR pool; a full batch is flushed immediately.
+    """
+
+    def __init__(self, lang: str = "pt", detail: bool = False,
+                 max_batch: Optional[int] = None, window_ms: Optional[int] = None,
+                 counts: Optional[Dict[str, int]] = None):
+        self.lang = lang
+        self.detail = detail
+        self.max_batch = max_batch or settings.ocr_batch_size
+        self.window_ms = settings.ocr_batch_window_ms if window_ms is None else window_ms
+        self._pending: List[Tuple[Image.Image, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        # Batch/item counters, shared by the batchers of one (lang, detail)
+        self._counts = {"batches": 0, "items": 0} if counts is None else counts
+
+    async def submit(self, img: Image.Image) -> List[str]:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._pending.append((img, fut))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_ms / 1000, self._flush)
+        start = time.perf_counter()
+        try:
+            return await fut
+        finally:
+            # Each caller is charged its own wait; the batch task belongs to no request
+            request_timing.record("ocr", time.perf_counter() - start)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        batch = [(img, fut) for img, fut in batch if not fut.cancelled()]
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(batch), context=contextvars.Context())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[Image.Image, asyncio.Future]]) -> None:
+        self._counts["batches"] += 1
+        self._counts["items"] += len(batch)
+        try:
+            results = await ocr_pool.run(run_ocr_batch, [img for img, _ in batch], self.lang, self.detail, self.max_batch)
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for (_, fut), lines in zip(batch, results):
+            if not fut.done():
+                fut.set_result(lines)
+
+    def stats(self) -> Dict[str, float]:
+        batches, items = self._counts["batches"], self._counts["items"]
+        return {
+            "batches": batches,
+            "items": items,
+            "avg_batch": round(items / batches, 2) if batches else 0.0,
+        }
+
+
+# Per event loop: a batcher's futures and flush timer belong to the loop that
+# created them, so another loop (TestClient, CLI, job workers) gets its own
+_batchers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, bool], OCRBatcher]]" = (
+    weakref.WeakKeyDictionary())
+# Process-wide counters per (lang, detail), kept after a loop goes away
+_counts: Dict[Tuple[str, bool], Dict[str, int]] = {}
+
+
+def get_batcher(lang: str = "pt", detail: bool = False) -> OCRBatcher:
+    loop_batchers = _batchers.setdefault(asyncio.get_running_loop(), {})
+    batcher = loop_batchers.get((lang, detail))
+    if batcher is None:
+        counts = _counts.setdefault((lang, detail), {"batches": 0, "items": 0})
+        batcher = loop_batchers[(lang, detail)] = OCRBatcher(lang, detail, counts=counts)
+    return batcher
+
+
+def batcher_stats() -> Dict[str, Dict[str, float]]:
+    return {
+        f"{lang}{':detail' if detail else ''}": {
+            **counts,
+            "avg_batch": round(counts["items"] / counts["batches"], 2) if counts["batches"] else 0.0,
+        }
+        for (lang, detail), counts in _counts.items()
+    }
@@ -0,0 +1,168 @@
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Any, Dict, IO, Iterable, List, Optional, Set, TextIO
+
+from app.config.settings import settings
+from app.tools.ocr import run_ocr
+from app.tools.ocr_pool import _init_worker
+
+SUPPORTED_SUFFIXES = {".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp", ".pdf"}
+_GLOB_CHARS = set("*?[")
+
+
+def is_batch_input(path: str) -> bool:
+    """A directory or a glob pattern (as opposed to a single file)."""
+    return os.path.isdir(path) or any(c in path for c in _GLOB_CHARS)
+
+
+def expand_inputs(path: str) -> List[str]:
+    """Supported files under a directory (recursively) or matching a glob, sorted."""
+    if os.path.isdir(path):
+        found = []
+        for root, dirs, files in os.walk(path):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            found.extend(os.path.join(root, name) for name in files if not name.startswith("."))
+    else:
+        found = glob.glob(path, recursive=True)
+    return sorted(
+        os.path.normpath(p) for p in found
+        if os.path.isfile(p) and os.path.splitext(p)[1].lower() in SUPPORTED_SUFFIXES
+    )
+
+
+def ocr_file(path: str, lang: str, detail: bool, batch_size: int) -> Dict[str, Any]:
+    """OCR one file into a JSONL record; runs in the worker processes."""
+    start = time.perf_counter()
+    try:
+        pages = run_ocr(path, lang=lang, detail=detail, batch_size=batch_size)
+    except Exception as e:
+        return {"path": path, "erro": str(e) or e.__class__.__name__,
+                "tempo_ms": round((time.perf_counter() - start) * 1000, 1)}
+    return {"path": path, "pages": pages, "n_pages": len(pages),
+            "tempo_ms": round((time.perf_counter() - start) * 1000, 1)}
+
+
+def load_checkpoint(output: str) -> Set[str]:
+    """Paths already recorded in ``output``; a torn last line (interrupted write) is dropped."""
+    done: Set[str] = set()
+    if not os.path.exists(output):
+        return done
+    with open(output, "rb+") as f:
+        valid = 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                done.add(json.loads(line)["path"])
+            except (ValueError, KeyError):
+                break
+            valid += len(line)
+        f.truncate(valid)
+    return done
+
+
+class Throughput:
+    """Files/s and pages/s since the start of the run."""
+
+    def __init__(self, total: int, stream: TextIO = sys.stderr, every_s: float = 5.0):
+        self.total = total
+        self.stream = stream
+        self.every_s = every_s
+        self.files = 0
+        self.pages = 0
+        self.errors = 0
+        self._start = time.monotonic()
+        self._last = self._start
+
+    def record(self, result: Dict[str, Any]) -> None:
+        self.files += 1
+        self.pages += result.get("n_pages", 0)
+        if "erro" in result:
+            self.errors += 1
+        now = time.monotonic()
+        if now - self._last >= self.every_s:
+            self._last = now
+            self.report()
+
+    def report(self, final: bool = False) -> None:
+        elapsed = max(time.monotonic() - self._start, 1e-9)
+        prefix = "done" if final else "progress"
+        print(f"[{prefix}] {self.files}/{self.total} files, {self.pages} pages, {self.errors} errors, "
+              f"{self.files / elapsed:.2f} files/s, {self.pages / elapsed:.2f} pages/s", file=self.stream, flush=True)
+
+
+def _write(out: IO[str], result: Dict[str, Any]) -> None:
+    out.write(json.dumps(result, ensure_ascii=False) + "\n")
+    # Flushed per file: the output doubles as the checkpoint for --resume
+    out.flush()
+
+
+def run_directory(
+    source: str,
+    output: str,
+    lang: str = "pt",
+    detail: bool = False,
+    batch_size: int = 1,
+    workers: Optional[int] = None,
+    resume: bool = False,
+    progress_every_s: float = 5.0,
+) -> Throughput:
+    """OCR every file of a directory/glob into ``output`` (one JSON object per line).
+
+    Files are spread over ``workers`` processes that load the EasyOCR model
+    once at startup; ``workers=0`` runs in this process. At most two files
+    per worker are in flight, and each result is appended as soon as it
+    finishes. With ``resume`` the files already in ``output`` are skipped.
+    """
+    paths = expand_inputs(source)
+    done = load_checkpoint(output) if resume else set()
+    todo = [p for p in paths if p not in done]
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    progress = Throughput(len(todo), every_s=progress_every_s)
+    if done:
+        print(f"[resume] {len(done)} files already in {output}, {len(todo)} to go", file=sys.stderr, flush=True)
+
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "a" if resume else "w", encoding="utf-8") as out:
+        if workers <= 0:
+            for path in todo:
+                result = ocr_file(path, lang, detail, batch_size)
+                _write(out, result)
+                progress.record(result)
+        else:
+            _run_pool(todo, out, progress, workers, lang, detail, batch_size)
+    progress.report(final=True)
+    return progress
+
+
+def _run_pool(paths: Iterable[str], out: IO[str], progress: Throughput, workers: int,
+              lang: str, detail: bool, batch_size: int) -> None:
+    # spawn: torch/OpenCV thread pools do not survive fork reliably
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=([lang], settings.ocr_gpu),
+    )
+    pending: Set[Future] = set()
+    remaining = iter(paths)
+    try:
+        while True:
+            for path in remaining:
+                pending.add(executor.submit(ocr_file, path, lang, detail, batch_size))
+                if len(pending) >= 2 * workers:
+                    break
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                result = fut.result()
+                _write(out, result)
+                progress.record(result)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
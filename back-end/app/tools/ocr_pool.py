@@ -0,0 +1,171 @@
+import asyncio
+import time
+import multiprocessing
+import threading
+import weakref
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Optional, Sequence
+
+from PIL import Image
+
+from app.config.settings import settings
+from app.infrastructure import request_timing
+from app.infrastructure.metrics import OCR_POOL_TASK_SECONDS, in_flight
+from app.tools.ocr import pdf_page_count, render_pdf
+
+
+# Server-Timing stage of the pool tasks; in process mode the stages are
+# timed in the workers, out of reach of the request's timing scopes
+_TASK_STAGES = {
+    "decode_image": "decode",
+    "render_pdf": "rasterize",
+    "crop_to_roi": "roi",
+    "encode_for_vision": "encode",
+    "run_ocr_image": "ocr",
+    "run_ocr_batch": "ocr",
+}
+
+
+def _init_worker(langs: Sequence[str], gpu: bool) -> None:
+    # Runs once per worker process: load the EasyOCR models up front so every
+    # task submitted afterwards reuses them through the process-wide registry.
+    from app.tools.reader_registry import reader_registry
+
+    for lang in langs:
+        try:
+            reader_registry.get([lang], gpu=gpu)
+        except Exception:
+            # Worker still serves decode/encode tasks when EasyOCR is missing
+            pass
+
+
+class OCRPool:
+    """Executes CPU-bound OCR/imaging stages off the event loop.
+
+    With ``workers > 0`` tasks run in a process pool whose workers keep their
+    EasyOCR models loaded; with ``workers == 0`` they run in the default
+    thread pool. At most ``workers + queue_size`` tasks are accepted at once;
+    further callers wait for a slot, which bounds memory under bursts.
+    Submitted callables and their arguments must be picklable (module-level
+    functions in ``app.tools.ocr``).
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        preload_langs: Optional[Sequence[str]] = None,
+    ):
+        self.workers = settings.ocr_workers if workers is None else workers
+        self.queue_size = settings.ocr_queue_size if queue_size is None else queue_size
+        if preload_langs is None:
+            preload_langs = [lang.strip() for lang in settings.ocr_preload_langs.split(",") if lang.strip()]
+        self.preload_langs = list(preload_langs)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        # One semaphore per event loop: asyncio primitives bind to the loop
+        # they first wait on (TestClient, CLI runs and workers each have theirs)
+        self._slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary())
+        self._in_flight = 0
+        self._waiting = 0
+        self._completed = 0
+
+    @property
+    def is_process_pool(self) -> bool:
+        return self.workers > 0
+
+    def _ensure_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                # spawn: torch/OpenCV thread pools do not survive fork reliably
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.preload_langs, settings.ocr_gpu),
+                )
+            return self._executor
+
+    def _ensure_slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        slots = self._slots.get(loop)
+        if slots is None:
+            slots = self._slots[loop] = asyncio.Semaphore(max(self.workers, 1) + max(self.queue_size, 0))
+        return slots
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        start = time.perf_counter()
+        with in_flight("ocr_pool"):
+            try:
+                return await self._run(fn, *args)
+            finally:
+                name = getattr(fn, "__name__", "task")
+                elapsed = time.perf_counter() - start
+                OCR_POOL_TASK_SECONDS.labels(name).observe(elapsed)
+                if self.is_process_pool and name in _TASK_STAGES:
+                    request_timing.record(_TASK_STAGES[name], elapsed)
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        slots = self._ensure_slots()
+        self._waiting += 1
+        try:
+            await slots.acquire()
+        finally:
+            self._waiting -= 1
+        self._in_flight += 1
+        try:
+            if self.is_process_pool:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._ensure_executor(), partial(fn, *args))
+            return await asyncio.to_thread(fn, *args)
+        finally:
+            self._in_flight -= 1
+            self._completed += 1
+            slots.release()
+
+    async def iter_pdf_pages(self, content: bytes, dpi: Optional[int] = None,
+                             lookahead: Optional[int] = None, first_page: int = 1,
+                             last_page: Optional[int] = None) -> AsyncIterator[Image.Image]:
+        """Render a PDF page by page on the pool, ``lookahead`` pages ahead of the consumer."""
+        lookahead = settings.pdf_lookahead if lookahead is None else lookahead
+        total = await self.run(pdf_page_count, content)
+        if last_page is not None:
+            total = min(total, last_page)
+        pending: Deque[asyncio.Future] = deque()
+        next_page = max(first_page, 1)
+        try:
+            while True:
+                while next_page <= total and len(pending) <= lookahead:
+                    pending.append(asyncio.ensure_future(self.run(render_pdf, content, next_page, next_page, dpi)))
+                    next_page += 1
+                if not pending:
+                    return
+                pages = await pending.popleft()
+                for page in pages:
+                    yield page
+                del pages
+        finally:
+            for fut in pending:
+                fut.cancel()
+
+    def shutdown(self) -> None:
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": "process" if self.is_process_pool else "thread",
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "completed": self._completed,
+        }
+
+
+ocr_pool = OCRPool()
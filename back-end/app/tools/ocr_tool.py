@@ -1,6 +1,9 @@
-from typing import List
+from typing import List, Sequence
 from PIL import Image
-from app.tools.ocr import run_ocr_image
+from app.config.settings import settings
+from app.tools.ocr import run_ocr_batch, run_ocr_image
+from app.tools.ocr_batcher import get_batcher
+from app.tools.ocr_pool import ocr_pool
 
 class OCRTool:
     def __init__(self, lang: str = "pt", detail: bool = False):
@@ -9,3 +12,12 @@ class OCRTool:
 
     def extract_lines_from_image(self, img: Image.Image) -> List[str]:
         return run_ocr_image(img, lang=self.lang, detail=self.detail)
+
+    def extract_lines_batch(self, images: Sequence[Image.Image]) -> List[List[str]]:
+        return run_ocr_batch(images, lang=self.lang, detail=self.detail)
+
+    async def aextract_lines_from_image(self, img: Image.Image) -> List[str]:
+        if settings.ocr_batch_window_ms > 0:
+            # Coalesced with concurrent fallbacks into one batched EasyOCR call
+            return await get_batcher(self.lang, self.detail).submit(img)
+        return await ocr_pool.run(run_ocr_image, img, self.lang, self.detail)
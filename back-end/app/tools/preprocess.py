@@ -0,0 +1,156 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from app.config.settings import settings
+from app.infrastructure.lazy import optional_module
+
+# A step receives a single-channel uint8 buffer and returns one; steps that can
+# work in place (threshold, CLAHE) write into the buffer they received.
+Step = Callable[[np.ndarray], np.ndarray]
+
+
+def to_gray(img: Union[Image.Image, np.ndarray]) -> np.ndarray:
+    """Single writable 8-bit gray buffer, with one copy at most."""
+    if isinstance(img, Image.Image):
+        # PIL converts straight to L; np.array then owns (and may mutate) the data
+        return np.array(img if img.mode == "L" else img.convert("L"))
+    if img.ndim == 2:
+        return img if img.flags.writeable else img.copy()
+    cv2 = optional_module("cv2")
+    if cv2 is not None:
+        return cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+    return np.asarray(Image.fromarray(img).convert("L")).copy()
+
+
+def _grayscale(gray: np.ndarray) -> np.ndarray:
+    # Conversion happens in to_gray; kept as a named step so specs read naturally
+    return gray
+
+
+def _resize(gray: np.ndarray) -> np.ndarray:
+    cv2 = optional_module("cv2")
+    max_side = settings.ocr_preprocess_max_side
+    h, w = gray.shape
+    if max_side <= 0 or max(h, w) <= max_side:
+        return gray
+    scale = max_side / float(max(h, w))
+    return cv2.resize(gray, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+
+
+def _clahe(gray: np.ndarray) -> np.ndarray:
+    cv2 = optional_module("cv2")
+    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+    return clahe.apply(gray, dst=gray)
+
+
+def _threshold(gray: np.ndarray) -> np.ndarray:
+    cv2 = optional_module("cv2")
+    return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                 cv2.THRESH_BINARY, 31, 10, dst=gray)
+
+
+def _deskew(gray: np.ndarray) -> np.ndarray:
+    cv2 = optional_module("cv2")
+    # Angle of the minimum-area rectangle around dark (ink) pixels. Otsu
+    # separates ink from paper on a side buffer, so the step works before
+    # "threshold" too (a binarized buffer comes through unchanged).
+    _, ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    coords = cv2.findNonZero(ink)
+    if coords is None or len(coords) < 50:
+        return gray
+    # The rectangle angle is only defined modulo 90 and its range changed
+    # across OpenCV releases: fold it into [-45, 45)
+    angle = (cv2.minAreaRect(coords)[-1] + 45) % 90 - 45
+    if abs(angle) < 0.5 or abs(angle) > 20:
+        return gray
+    h, w = gray.shape
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    return cv2.warpAffine(gray, matrix, (w, h), flags=cv2.INTER_LINEAR,
+                          borderMode=cv2.BORDER_REPLICATE)
+
+
+STEPS: Dict[str, Step] = {
+    "grayscale": _grayscale,
+    "resize": _resize,
+    "clahe": _clahe,
+    "threshold": _threshold,
+    "deskew": _deskew,
+}
+# Steps that need OpenCV; skipped (pass-through) when it is not installed
+_CV2_STEPS = {"resize", "clahe", "threshold", "deskew"}
+
+
+def register_step(name: str, step: Step) -> None:
+    STEPS[name] = step
+
+
+class StepTimings:
+    """Cumulative time per preprocessing step in this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals: Dict[str, List[float]] = {}
+
+    def record(self, timings: Dict[str, float]) -> None:
+        with self._lock:
+            for name, ms in timings.items():
+                total = self._totals.setdefault(name, [0, 0.0])
+                total[0] += 1
+                total[1] += ms
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                name: {"count": int(count), "avg_ms": round(total / count, 3) if count else 0.0}
+                for name, (count, total) in self._totals.items()
+            }
+
+
+step_timings = StepTimings()
+
+
+class PreprocessPipeline:
+    """Ordered preprocessing steps over a single-channel buffer.
+
+    ``spec`` is a comma-separated list of step names (``OCR_PREPROCESS``),
+    e.g. ``"grayscale,clahe,threshold"``. The input is converted to gray once
+    and the gray buffer is handed to the recognizer as-is.
+    """
+
+    def __init__(self, spec: Optional[Union[str, Sequence[str]]] = None):
+        if spec is None:
+            spec = settings.ocr_preprocess_steps
+        names = [n.strip() for n in spec.split(",")] if isinstance(spec, str) else list(spec)
+        unknown = [n for n in names if n and n not in STEPS]
+        if unknown:
+            raise ValueError(f"Unknown preprocessing step(s): {', '.join(unknown)}")
+        has_cv2 = optional_module("cv2") is not None
+        self.steps = [n for n in names if n and (has_cv2 or n not in _CV2_STEPS)]
+
+    def run(self, img: Union[Image.Image, np.ndarray]) -> Tuple[np.ndarray, Dict[str, float]]:
+        timings: Dict[str, float] = {}
+        start = time.perf_counter()
+        gray = to_gray(img)
+        timings["grayscale"] = (time.perf_counter() - start) * 1000
+        for name in self.steps:
+            if name == "grayscale":
+                continue
+            start = time.perf_counter()
+            gray = STEPS[name](gray)
+            timings[name] = (time.perf_counter() - start) * 1000
+        step_timings.record(timings)
+        return gray, timings
+
+
+_default_pipeline: Optional[PreprocessPipeline] = None
+
+
+def default_pipeline() -> PreprocessPipeline:
+    global _default_pipeline
+    if _default_pipeline is None:
+        _default_pipeline = PreprocessPipeline()
+    return _default_pipeline
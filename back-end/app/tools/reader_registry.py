@@ -0,0 +1,179 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.config.settings import settings
+from app.infrastructure.lazy import optional_module
+from app.infrastructure.metrics import STAGE_SECONDS
+
+# Used when the reader does not expose torch modules we can measure
+DEFAULT_READER_MB = 200.0
+
+ReaderKey = Tuple[Tuple[str, ...], Tuple[Tuple[str, Any], ...]]
+
+
+def _easyocr_factory(langs: List[str], **options: Any):
+    # Imported on the first reader load: easyocr pulls in torch
+    easyocr = optional_module("easyocr")
+    if easyocr is None:
+        raise RuntimeError("EasyOCR is not installed. Install dependencies first.")
+    return easyocr.Reader(langs, **options)
+
+
+def _estimate_reader_mb(reader: Any) -> float:
+    total = 0
+    for attr in ("detector", "recognizer"):
+        model = getattr(reader, attr, None)
+        parameters = getattr(model, "parameters", None)
+        if parameters is None:
+            continue
+        try:
+            total += sum(p.numel() * p.element_size() for p in parameters())
+        except Exception:
+            continue
+    if not total:
+        return DEFAULT_READER_MB
+    return total / (1024 * 1024)
+
+
+class _Entry:
+    def __init__(self, reader: Any, size_mb: float, load_seconds: float):
+        self.reader = reader
+        self.size_mb = size_mb
+        self.load_seconds = load_seconds
+        self.in_use = 0
+        self.hits = 0
+        self.last_used = time.monotonic()
+
+
+class ReaderRegistry:
+    """Process-wide cache of EasyOCR readers keyed by (languages, options).
+
+    Each reader is loaded once; concurrent callers asking for the same key wait
+    for the first load instead of loading it again. When the estimated memory
+    of the cached readers exceeds ``max_memory_mb``, the least recently used
+    readers that are not leased are evicted.
+    """
+
+    def __init__(
+        self,
+        factory: Optional[Callable[..., Any]] = None,
+        max_memory_mb: Optional[float] = None,
+        size_estimator: Optional[Callable[[Any], float]] = None,
+    ):
+        self._factory = factory or _easyocr_factory
+        self._size_estimator = size_estimator or _estimate_reader_mb
+        self.max_memory_mb = settings.ocr_reader_cache_mb if max_memory_mb is None else max_memory_mb
+        self._lock = threading.Lock()
+        self._loading: Dict[ReaderKey, threading.Lock] = {}
+        self._entries: "OrderedDict[ReaderKey, _Entry]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._load_seconds_total = 0.0
+
+    @staticmethod
+    def make_key(langs: Sequence[str], **options: Any) -> ReaderKey:
+        return tuple(sorted(set(langs))), tuple(sorted(options.items()))
+
+    def _lookup_locked(self, key: ReaderKey, lease: bool) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        self._hits += 1
+        entry.hits += 1
+        entry.last_used = time.monotonic()
+        if lease:
+            entry.in_use += 1
+        return entry
+
+    def _get_entry(self, langs: Sequence[str], lease: bool, options: Dict[str, Any]) -> _Entry:
+        key = self.make_key(langs, **options)
+        with self._lock:
+            entry = self._lookup_locked(key, lease)
+            if entry is not None:
+                return entry
+            load_lock = self._loading.setdefault(key, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                entry = self._lookup_locked(key, lease)
+                if entry is not None:
+                    return entry
+                self._misses += 1
+            start = time.perf_counter()
+            reader = self._factory(list(key[0]), **options)
+            elapsed = time.perf_counter() - start
+            STAGE_SECONDS.labels("ocr_model_load").observe(elapsed)
+            entry = _Entry(reader, self._size_estimator(reader), elapsed)
+            with self._lock:
+                if lease:
+                    entry.in_use += 1
+                self._entries[key] = entry
+                self._loading.pop(key, None)
+                self._load_seconds_total += elapsed
+                self._evict_locked()
+            return entry
+
+    def _evict_locked(self) -> None:
+        if self.max_memory_mb <= 0:
+            return
+        total = sum(e.size_mb for e in self._entries.values())
+        for key in list(self._entries.keys()):
+            if total <= self.max_memory_mb:
+                break
+            entry = self._entries[key]
+            if entry.in_use > 0 or key == next(reversed(self._entries)):
+                # Never evict leased readers nor the one that was just used
+                continue
+            del self._entries[key]
+            total -= entry.size_mb
+            self._evictions += 1
+
+    def get(self, langs: Sequence[str], **options: Any) -> Any:
+        """Return a cached reader, loading it on first use."""
+        return self._get_entry(langs, lease=False, options=options).reader
+
+    @contextmanager
+    def acquire(self, langs: Sequence[str], **options: Any) -> Iterator[Any]:
+        """Lease a reader for the duration of the block; leased readers are never evicted."""
+        entry = self._get_entry(langs, lease=True, options=options)
+        try:
+            yield entry.reader
+        finally:
+            with self._lock:
+                entry.in_use -= 1
+                self._evict_locked()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            readers = [
+                {
+                    "langs": list(key[0]),
+                    "options": dict(key[1]),
+                    "size_mb": round(e.size_mb, 1),
+                    "load_seconds": round(e.load_seconds, 3),
+                    "hits": e.hits,
+                    "in_use": e.in_use,
+                }
+                for key, e in self._entries.items()
+            ]
+            return {
+                "readers": readers,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "load_seconds_total": round(self._load_seconds_total, 3),
+                "memory_mb": round(sum(e.size_mb for e in self._entries.values()), 1),
+                "memory_cap_mb": self.max_memory_mb,
+            }
+
+
+reader_registry = ReaderRegistry()
@@ -0,0 +1,131 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from app.config.settings import settings
+from app.infrastructure.lazy import optional_module
+from app.infrastructure.metrics import timed_stage
+from app.tools.reader_registry import reader_registry
+
+# (x, y, width, height) in pixels of the image the box refers to
+Box = Tuple[int, int, int, int]
+
+# Odometer windows are wide rows of digits; anything outside these bounds
+# (relative to the downscaled frame) is treated as noise.
+MIN_ASPECT = 1.8
+MAX_ASPECT = 12.0
+MIN_AREA_RATIO = 0.002
+MAX_AREA_RATIO = 0.6
+
+
+def _iou(a: Box, b: Box) -> float:
+    ax2, ay2 = a[0] + a[2], a[1] + a[3]
+    bx2, by2 = b[0] + b[2], b[1] + b[3]
+    iw = max(0, min(ax2, bx2) - max(a[0], b[0]))
+    ih = max(0, min(ay2, by2) - max(a[1], b[1]))
+    inter = iw * ih
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / union if union else 0.0
+
+
+def _plausible(box: Box, frame_area: int) -> bool:
+    _, _, w, h = box
+    if w <= 0 or h <= 0:
+        return False
+    aspect = w / h
+    area_ratio = (w * h) / frame_area
+    return MIN_ASPECT <= aspect <= MAX_ASPECT and MIN_AREA_RATIO <= area_ratio <= MAX_AREA_RATIO
+
+
+def _contour_candidates(gray: np.ndarray) -> List[Tuple[Box, float]]:
+    """Rows of digit-like strokes found with morphology + contours."""
+    cv2 = optional_module("cv2")
+    frame_area = gray.shape[0] * gray.shape[1]
+    blur = cv2.GaussianBlur(gray, (3, 3), 0)
+    rect_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (15, 5))
+    # Dark digits on light wheels (blackhat) and light digits on dark wheels (tophat)
+    strokes = cv2.max(
+        cv2.morphologyEx(blur, cv2.MORPH_BLACKHAT, rect_kernel),
+        cv2.morphologyEx(blur, cv2.MORPH_TOPHAT, rect_kernel),
+    )
+    grad = cv2.convertScaleAbs(cv2.Sobel(strokes, cv2.CV_16S, 1, 0, ksize=3))
+    grad = cv2.morphologyEx(grad, cv2.MORPH_CLOSE, rect_kernel)
+    _, mask = cv2.threshold(grad, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    square = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, square)
+    mask = cv2.erode(mask, None, iterations=1)
+    mask = cv2.dilate(mask, None, iterations=2)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    candidates = []
+    for contour in contours:
+        box = tuple(int(v) for v in cv2.boundingRect(contour))
+        if not _plausible(box, frame_area):
+            continue
+        fill = cv2.contourArea(contour) / float(box[2] * box[3])
+        candidates.append((box, box[2] * box[3] * fill))
+    return candidates
+
+
+def _detector_candidates(rgb: np.ndarray, lang: str) -> List[Tuple[Box, float]]:
+    """Text boxes from the EasyOCR detector (CRAFT) on the downscaled frame."""
+    frame_area = rgb.shape[0] * rgb.shape[1]
+    try:
+        with reader_registry.acquire([lang], gpu=settings.ocr_gpu) as reader:
+            horizontal, _ = reader.detect(rgb)
+    except Exception:
+        return []
+    boxes = horizontal[0] if horizontal else []
+    candidates = []
+    for x_min, x_max, y_min, y_max in boxes:
+        box = (int(x_min), int(y_min), int(x_max - x_min), int(y_max - y_min))
+        if _plausible(box, frame_area):
+            candidates.append((box, float(box[2] * box[3])))
+    return candidates
+
+
+def detect_dial_roi(img: Image.Image, lang: str = "pt", use_detector: Optional[bool] = None) -> Optional[Box]:
+    """Locate the odometer digit window; returns a padded box in ``img`` coordinates or None.
+
+    Works on a copy downscaled to ``ROI_MAX_SIDE``. Boxes found by both the
+    contour stage and the EasyOCR detector are preferred.
+    """
+    use_detector = settings.roi_use_detector if use_detector is None else use_detector
+    width, height = img.size
+    scale = min(1.0, settings.roi_max_side / float(max(width, height)))
+    small = img if scale == 1.0 else img.resize((max(int(width * scale), 1), max(int(height * scale), 1)))
+
+    candidates: List[Tuple[Box, float]] = []
+    if optional_module("cv2") is not None:
+        candidates.extend(_contour_candidates(np.asarray(small.convert("L"))))
+    detected = _detector_candidates(np.asarray(small.convert("RGB")), lang) if use_detector else []
+    if detected and candidates:
+        boosted = []
+        for box, score in candidates:
+            if any(_iou(box, d) > 0.3 for d, _ in detected):
+                score *= 2
+            boosted.append((box, score))
+        candidates = boosted
+    candidates.extend(detected)
+    if not candidates:
+        return None
+
+    (x, y, w, h), _ = max(candidates, key=lambda c: c[1])
+    pad_x, pad_y = int(w * settings.roi_padding), int(h * settings.roi_padding)
+    x0 = max(int((x - pad_x) / scale), 0)
+    y0 = max(int((y - pad_y) / scale), 0)
+    x1 = min(int((x + w + pad_x) / scale), width)
+    y1 = min(int((y + h + pad_y) / scale), height)
+    return x0, y0, x1 - x0, y1 - y0
+
+
+@timed_stage("roi")
+def crop_to_roi(img: Image.Image, lang: str = "pt") -> Tuple[Image.Image, Optional[Box]]:
+    """Crop ``img`` to the detected digit window, or return it untouched when none is found."""
+    if not settings.roi_enabled:
+        return img, None
+    box = detect_dial_roi(img, lang=lang)
+    if box is None:
+        return img, None
+    x, y, w, h = box
+    return img.crop((x, y, x + w, y + h)), box
@@ -0,0 +1 @@
+"""Benchmarks for the reading pipeline (``python -m benchmarks.run``)."""
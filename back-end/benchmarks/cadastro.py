@@ -0,0 +1,414 @@
+"""Load and query-plan harness for the cadastro APIs.
+
+    python -m benchmarks.cadastro seed --pessoas 2000000 --imoveis 3000000
+    python -m benchmarks.cadastro load -o out/cadastro_load.json [--base-url http://localhost:3000]
+    python -m benchmarks.cadastro explain -o out/cadastro_plans.json [--compare out/base_plans.json]
+
+``seed`` bulk-loads synthetic rows (COPY on PostgreSQL). ``load`` drives
+``/api/cadastro/pessoas`` and ``/api/cadastro/imoveis`` with the query
+shapes below, deep pages included, and records latency percentiles per
+shape. ``explain`` runs ``EXPLAIN (ANALYZE, BUFFERS)`` on the count and page
+queries that ``consulta_pessoas``/``consulta_imoveis`` build for each
+shape and flags sequential scans; with ``--compare`` it exits with 1 when a
+shape gains a sequential scan or gets slower than ``--threshold``.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from benchmarks.run import percentile
+
+
+class Shape(NamedTuple):
+    name: str
+    resource: str  # "pessoas" | "imoveis"
+    params: Dict[str, Any]
+    weight: int = 1
+
+
+# Filter/sort/page mixes seen on the cadastro screens; weights set the load mix
+SHAPES: Tuple[Shape, ...] = (
+    Shape("pessoas_padrao", "pessoas", {"page": "1", "page_size": 20}, 10),
+    Shape("pessoas_ativos_nome", "pessoas", {"ativo": "true", "sort_by": "nome", "order": "asc", "page": "1"}, 8),
+    Shape("pessoas_nome_parcial", "pessoas", {"nome": "mar", "page": "1"}, 6),
+    Shape("pessoas_sobrenome_parcial_desc", "pessoas", {"sobre_nome": "silva", "order": "desc", "page": "2"}, 4),
+    Shape("pessoas_documento_parcial", "pessoas", {"documento": "1234", "page": "1"}, 4),
+    Shape("pessoas_nascimento", "pessoas", {"nascimento": "1990-05-17", "sort_by": "sobre_nome"}, 2),
+    Shape("pessoas_sexo_cpf", "pessoas", {"sexo": "FEMININO", "tipo_doc": "CPF", "sort_by": "nascimento"}, 2),
+    Shape("pessoas_pagina_profunda", "pessoas", {"sort_by": "nome", "page": "5000", "page_size": 50}, 2),
+    Shape("pessoas_ultima_pagina", "pessoas", {"sort_by": "documento", "order": "desc", "page": "last"}, 1),
+    Shape("imoveis_padrao", "imoveis", {"page": "1", "page_size": 20}, 10),
+    Shape("imoveis_cidade_parcial", "imoveis", {"cidade": "são", "sort_by": "cidade", "order": "desc"}, 6),
+    Shape("imoveis_categoria_cep", "imoveis", {"categoria": "LIGAÇÕES MEDIDAS", "cep": "01000-000"}, 4),
+    Shape("imoveis_ativos", "imoveis", {"ativo": "true", "sort_by": "bairro", "page": "3"}, 4),
+    Shape("imoveis_pagina_profunda", "imoveis", {"sort_by": "cep", "page": "10000", "page_size": 50}, 2),
+    Shape("imoveis_ultima_pagina", "imoveis", {"sort_by": "uf", "order": "desc", "page": "ultima"}, 1),
+)
+
+_PESSOA_FILTERS = ("tipo_doc", "documento", "nome", "sobre_nome", "sexo", "ativo", "nascimento")
+_IMOVEL_FILTERS = ("cidade", "categoria", "ativo", "cep")
+
+_NOMES = ("Maria", "José", "Ana", "João", "Marcos", "Mariana", "Paulo", "Lucas", "Fernanda", "Carla",
+          "Pedro", "Juliana", "Rafael", "Beatriz", "Marta", "Gabriel", "Larissa", "Tiago", "Camila", "Bruno")
+_SOBRENOMES = ("Silva", "Santos", "Oliveira", "Souza", "Lima", "Pereira", "Costa", "Rodrigues", "Almeida",
+               "Nascimento", "Ferreira", "Carvalho", "Gomes", "Martins", "Araújo", "Ribeiro", "Barbosa")
+_CIDADES = (("São Paulo", "SP"), ("Campinas", "SP"), ("São José dos Campos", "SP"), ("Santos", "SP"),
+            ("Rio de Janeiro", "RJ"), ("Niterói", "RJ"), ("Belo Horizonte", "MG"), ("Curitiba", "PR"),
+            ("São Luís", "MA"), ("Salvador", "BA"), ("Recife", "PE"), ("Porto Alegre", "RS"))
+_BAIRROS = ("Centro", "Jardim América", "Vila Nova", "Boa Vista", "Santa Cruz", "Liberdade", "Industrial")
+
+
+def _values(enum_cls) -> List[str]:
+    return [member.name for member in enum_cls]
+
+
+# Seed ------------------------------------------------------------------------
+
+def pessoa_rows(count: int, seed: int = 0, start: int = 0) -> Iterator[Dict[str, Any]]:
+    from app.models.schemas import Sexo, TipoDocumento
+
+    rng = random.Random(seed + start)
+    tipos, sexos = _values(TipoDocumento), _values(Sexo)
+    for i in range(start, start + count):
+        yield {
+            "tipo_doc": rng.choice(tipos),
+            "documento": f"{i:011d}",  # unique
+            "nome": rng.choice(_NOMES),
+            "sobre_nome": f"{rng.choice(_SOBRENOMES)} {rng.choice(_SOBRENOMES)}",
+            "nascimento": f"{rng.randint(1940, 2006)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "sexo": rng.choice(sexos),
+            "ativo": rng.random() < 0.85,
+            "id_endereco_fatura": None,
+        }
+
+
+def imovel_rows(count: int, pessoas: int, first_pessoa: int, seed: int = 0,
+                start: int = 0) -> Iterator[Dict[str, Any]]:
+    from app.models.schemas import CategoriaLigacao, TipoImovel
+
+    rng = random.Random(seed + 7919 + start)
+    categorias, tipos = _values(CategoriaLigacao), _values(TipoImovel)
+    for _ in range(count):
+        cidade, uf = rng.choice(_CIDADES)
+        yield {
+            "id_pessoa": first_pessoa + rng.randrange(pessoas),
+            "categoria": rng.choice(categorias),
+            "tipo": rng.choice(tipos),
+            "endereco": f"Rua {rng.choice(_SOBRENOMES)}",
+            "numero": str(rng.randint(1, 9999)),
+            "bairro": rng.choice(_BAIRROS),
+            "cidade": cidade,
+            "uf": uf,
+            "cep": f"{rng.randint(1000, 99999):05d}-{rng.randint(0, 999):03d}",
+            "esgoto": rng.random() < 0.7,
+            "consumo_misto": rng.random() < 0.1,
+        }
+
+
+def _copy_rows(raw_conn, table: str, columns: Sequence[str], rows: Iterator[Dict[str, Any]]) -> None:
+    # psycopg 3 COPY: orders of magnitude faster than INSERTs for millions of rows
+    with raw_conn.cursor() as cur:
+        with cur.copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row([row[c] for c in columns])
+
+
+def _insert_rows(engine, table, rows: Iterator[Dict[str, Any]], batch: int) -> None:
+    buffer: List[Dict[str, Any]] = []
+    with engine.begin() as conn:
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) >= batch:
+                conn.execute(table.insert(), buffer)
+                buffer = []
+        if buffer:
+            conn.execute(table.insert(), buffer)
+
+
+def seed(engine, pessoas: int, imoveis: int, batch: int = 50_000, seed_value: int = 0,
+         log=sys.stderr) -> Dict[str, int]:
+    """Append ``pessoas``/``imoveis`` synthetic rows; imóveis point at the pessoas just added."""
+    import app.infrastructure.orm_models  # noqa: F401  (registra as tabelas)
+    from sqlalchemy import func, select
+    from app.infrastructure.db import Base
+    from app.infrastructure.orm_models import ImovelDB, PessoaDB
+
+    Base.metadata.create_all(engine)
+    with engine.connect() as conn:
+        existing = conn.execute(select(func.count()).select_from(PessoaDB)).scalar() or 0
+        first_id = (conn.execute(select(func.max(PessoaDB.matricula))).scalar() or 0) + 1
+    postgres = engine.dialect.name == "postgresql"
+    pessoa_cols = [c.name for c in PessoaDB.__table__.columns if c.name != "matricula"]
+    imovel_cols = [c.name for c in ImovelDB.__table__.columns if c.name != "matricula"]
+
+    start = time.perf_counter()
+    for offset in range(0, pessoas, batch):
+        rows = pessoa_rows(min(batch, pessoas - offset), seed_value, existing + offset)
+        if postgres:
+            with engine.begin() as conn:
+                _copy_rows(conn.connection.driver_connection, "pessoas", pessoa_cols, rows)
+        else:
+            _insert_rows(engine, PessoaDB.__table__, rows, batch)
+        print(f"[seed] pessoas {offset + min(batch, pessoas - offset)}/{pessoas}", file=log, flush=True)
+    for offset in range(0, imoveis, batch):
+        rows = imovel_rows(min(batch, imoveis - offset), pessoas, first_id, seed_value, offset)
+        if postgres:
+            with engine.begin() as conn:
+                _copy_rows(conn.connection.driver_connection, "imoveis", imovel_cols, rows)
+        else:
+            _insert_rows(engine, ImovelDB.__table__, rows, batch)
+        print(f"[seed] imoveis {offset + min(batch, imoveis - offset)}/{imoveis}", file=log, flush=True)
+    if postgres:
+        # Fresh statistics, otherwise the planner works from an empty table
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql("ANALYZE pessoas")
+            conn.exec_driver_sql("ANALYZE imoveis")
+    print(f"[seed] done in {time.perf_counter() - start:.1f}s", file=log, flush=True)
+    return {"pessoas": pessoas, "imoveis": imoveis}
+
+
+# Load ------------------------------------------------------------------------
+
+def _client(base_url: Optional[str]):
+    if base_url:
+        import httpx
+
+        return httpx.Client(base_url=base_url.rstrip("/"), timeout=60)
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    return TestClient(app)
+
+
+def run_load(base_url: Optional[str], requests: int, concurrency: int, seed_value: int = 0,
+             shapes: Sequence[Shape] = SHAPES) -> Dict[str, Any]:
+    """Send ``requests`` GETs drawn from ``shapes`` by weight, ``concurrency`` at a time."""
+    rng = random.Random(seed_value)
+    plan = rng.choices(shapes, weights=[s.weight for s in shapes], k=requests)
+    client = _client(base_url)
+    samples: Dict[str, List[float]] = {s.name: [] for s in shapes}
+    errors: Dict[str, int] = {s.name: 0 for s in shapes}
+
+    def one(shape: Shape) -> Tuple[str, float, bool]:
+        t0 = time.perf_counter()
+        r = client.get(f"/api/cadastro/{shape.resource}", params=shape.params)
+        return shape.name, (time.perf_counter() - t0) * 1000, r.status_code == 200
+
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as pool:
+            for name, ms, ok in pool.map(one, plan):
+                if ok:
+                    samples[name].append(ms)
+                else:
+                    errors[name] += 1
+    finally:
+        client.close()
+    wall = time.perf_counter() - start
+
+    def summary(values: List[float], errs: int) -> Dict[str, Any]:
+        ordered = sorted(values)
+        return {
+            "n": len(ordered),
+            "errors": errs,
+            "p50_ms": round(percentile(ordered, 0.50), 2),
+            "p95_ms": round(percentile(ordered, 0.95), 2),
+            "p99_ms": round(percentile(ordered, 0.99), 2),
+            "max_ms": round(ordered[-1], 2) if ordered else 0.0,
+        }
+
+    every = [ms for values in samples.values() for ms in values]
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "throughput_rps": round(len(every) / wall, 2) if wall else 0.0,
+        "overall": summary(every, sum(errors.values())),
+        "shapes": {name: summary(values, errors[name]) for name, values in samples.items() if values or errors[name]},
+    }
+
+
+# Explain ---------------------------------------------------------------------
+
+def _as_bool(value: Any) -> Optional[bool]:
+    if value is None:
+        return None
+    return str(value).lower() in ("true", "1", "yes")
+
+
+def shape_query(db, shape: Shape):
+    """The ORM query ``listar_*`` builds for ``shape``."""
+    from app.services.imoveis_service import consulta_imoveis
+    from app.services.pessoas_service import consulta_pessoas
+
+    params = dict(shape.params)
+    sort_order = {"sort_by": params.get("sort_by", "nome" if shape.resource == "pessoas" else "cidade"),
+                  "order": params.get("order", "asc")}
+    names = _PESSOA_FILTERS if shape.resource == "pessoas" else _IMOVEL_FILTERS
+    filters = {k: (_as_bool(params.get(k)) if k == "ativo" else params.get(k)) for k in names}
+    build = consulta_pessoas if shape.resource == "pessoas" else consulta_imoveis
+    return build(db, **filters, **sort_order)
+
+
+def shape_statements(db, shape: Shape) -> Dict[str, Any]:
+    """Count and page statements of ``shape``, as ``listar_*`` runs them."""
+    from sqlalchemy import func, select
+    from app.services.pagination import resolve_page
+
+    q = shape_query(db, shape)
+    page_size = int(shape.params.get("page_size", 20))
+    # Same statement as Query.count(): count(*) over the filtered subquery
+    count_stmt = select(func.count()).select_from(q.subquery())
+    total = db.execute(count_stmt).scalar() or 0
+    page_number = resolve_page(shape.params.get("page", "1"), total, page_size)
+    page_stmt = q.offset((page_number - 1) * page_size).limit(page_size).statement
+    return {"count": count_stmt, "page": page_stmt, "total": total, "page_number": page_number}
+
+
+def _walk(node: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield node
+    for child in node.get("Plans", ()):
+        yield from _walk(child)
+
+
+def summarize_plan(plan_json: Any) -> Dict[str, Any]:
+    """Timings, buffers and scan types of a ``FORMAT JSON`` plan."""
+    top = plan_json[0] if isinstance(plan_json, list) else plan_json
+    root = top["Plan"]
+    nodes = list(_walk(root))
+    return {
+        "execution_ms": top.get("Execution Time"),
+        "planning_ms": top.get("Planning Time"),
+        "rows": root.get("Actual Rows"),
+        "shared_hit": root.get("Shared Hit Blocks", 0),
+        "shared_read": root.get("Shared Read Blocks", 0),
+        "seq_scans": sorted({n.get("Relation Name", "?") for n in nodes if n.get("Node Type") == "Seq Scan"}),
+        "index_scans": sorted({n.get("Index Name", "?") for n in nodes
+                               if n.get("Node Type") in ("Index Scan", "Index Only Scan", "Bitmap Index Scan")}),
+        "sorts": [n.get("Sort Method") for n in nodes if n.get("Node Type") == "Sort"],
+    }
+
+
+def explain_shapes(engine, shapes: Sequence[Shape] = SHAPES) -> Dict[str, Any]:
+    """``EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)`` of every shape's count and page query (PostgreSQL)."""
+    from sqlalchemy.orm import Session
+
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("explain needs PostgreSQL (EXPLAIN ANALYZE/BUFFERS)")
+    report: Dict[str, Any] = {}
+    with Session(engine) as db:
+        for shape in shapes:
+            stmts = shape_statements(db, shape)
+            entry: Dict[str, Any] = {"params": shape.params, "total": stmts["total"], "page": stmts["page_number"]}
+            for kind in ("count", "page"):
+                sql = str(stmts[kind].compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+                plan = _explain(db, sql)
+                entry[kind] = {"sql": sql, **summarize_plan(plan), "plan": plan}
+            report[shape.name] = entry
+            db.rollback()
+    return report
+
+
+def _explain(db, sql: str) -> Any:
+    row = db.connection().exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}").scalar()
+    return json.loads(row) if isinstance(row, str) else row
+
+
+def compare_plans(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """New sequential scans, or execution time grown past ``threshold`` (0.5 = 50%)."""
+    regressions = []
+    for name, entry in current.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        for kind in ("count", "page"):
+            now, old = entry[kind], before.get(kind, {})
+            added = sorted(set(now["seq_scans"]) - set(old.get("seq_scans", [])))
+            if added:
+                regressions.append(f"{name}.{kind}: new Seq Scan on {', '.join(added)}")
+            old_ms, new_ms = old.get("execution_ms") or 0.0, now.get("execution_ms") or 0.0
+            if old_ms > 0 and new_ms > old_ms * (1 + threshold):
+                regressions.append(f"{name}.{kind}: {old_ms:.1f} -> {new_ms:.1f} ms")
+    return regressions
+
+
+# CLI -------------------------------------------------------------------------
+
+def _engine(url: Optional[str]):
+    from sqlalchemy import create_engine
+    from app.config.settings import settings
+
+    return create_engine(url or settings.db_url, future=True)
+
+
+def _write(report: Dict[str, Any], output: Optional[str]) -> None:
+    text = json.dumps(report, indent=2, ensure_ascii=False, default=str)
+    if not output:
+        print(text)
+        return
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with io.open(output, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Cadastro load test and query-plan harness")
+    parser.add_argument("--db-url", help="Database URL (default: DATABASE_URL)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_seed = sub.add_parser("seed", help="Bulk-load synthetic pessoas/imoveis")
+    p_seed.add_argument("--pessoas", type=int, default=1_000_000)
+    p_seed.add_argument("--imoveis", type=int, default=1_500_000)
+    p_seed.add_argument("--batch", type=int, default=50_000)
+    p_seed.add_argument("--seed", type=int, default=0)
+
+    p_load = sub.add_parser("load", help="Drive the list endpoints and record latency percentiles")
+    p_load.add_argument("--base-url", help="Running API (default: in-process TestClient)")
+    p_load.add_argument("--requests", type=int, default=2000)
+    p_load.add_argument("--concurrency", type=int, default=8)
+    p_load.add_argument("--seed", type=int, default=0)
+    p_load.add_argument("-o", "--output")
+
+    p_explain = sub.add_parser("explain", help="EXPLAIN (ANALYZE, BUFFERS) every query shape")
+    p_explain.add_argument("-o", "--output")
+    p_explain.add_argument("--compare", help="Previous explain report")
+    p_explain.add_argument("--threshold", type=float, default=0.5)
+    args = parser.parse_args(argv)
+
+    if args.command == "seed":
+        seed(_engine(args.db_url), args.pessoas, args.imoveis, args.batch, args.seed)
+        return 0
+    if args.command == "load":
+        if args.db_url:
+            os.environ["DATABASE_URL"] = args.db_url
+        report = run_load(args.base_url, args.requests, args.concurrency, args.seed)
+        _write(report, args.output)
+        for name, s in report["shapes"].items():
+            print(f"{name:<34}{s['n']:>6}{s['errors']:>4}{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}",
+                  file=sys.stderr)
+        return 0
+
+    report = explain_shapes(_engine(args.db_url))
+    _write(report, args.output)
+    for name, entry in report.items():
+        for kind in ("count", "page"):
+            e = entry[kind]
+            seq = f" SEQ SCAN {','.join(e['seq_scans'])}" if e["seq_scans"] else ""
+            print(f"{name}.{kind:<6}{e['execution_ms']:>10.1f} ms  hit={e['shared_hit']} read={e['shared_read']}{seq}",
+                  file=sys.stderr)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare_plans(report, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
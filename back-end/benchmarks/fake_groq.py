@@ -0,0 +1,141 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+
+
+class FakeGroqConfig:
+    """Latency (lognormal around ``latency_ms``) and error mix of the fake endpoint."""
+
+    def __init__(self, latency_ms: float = 400.0, jitter: float = 0.3, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, answer: str = "00123", seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.answer = answer
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def draw(self) -> Tuple[float, Optional[int]]:
+        """Seconds to wait and the error status to answer with (None for a 200)."""
+        with self.lock:
+            self.requests += 1
+            delay = self.latency_ms / 1000 * self.rng.lognormvariate(0, self.jitter) if self.latency_ms > 0 else 0.0
+            roll = self.rng.random()
+        if roll < self.rate_limit_rate:
+            return delay, 429
+        if roll < self.rate_limit_rate + self.error_rate:
+            return delay, 503
+        return delay, None
+
+
+def _handler(config: FakeGroqConfig):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):  # quiet
+            pass
+
+        def _send(self, status: int, body: dict, headers: Optional[dict] = None) -> None:
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            # Any base path works: the SDK and the raw client join it differently
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send(404, {"error": {"message": f"unknown path {self.path}"}})
+                return
+            delay, error = config.draw()
+            time.sleep(delay)
+            if error == 429:
+                self._send(429, {"error": {"message": "rate limited", "type": "tokens"}},
+                           {"retry-after": "0.05", "x-ratelimit-remaining-requests": "0"})
+                return
+            if error:
+                self._send(error, {"error": {"message": "service unavailable"}})
+                return
+            self._send(200, {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": payload.get("model", "fake"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": config.answer}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 1, "total_tokens": 1},
+            }, {
+                "x-ratelimit-limit-requests": "1000000",
+                "x-ratelimit-remaining-requests": "999999",
+                "x-ratelimit-limit-tokens": "100000000",
+                "x-ratelimit-remaining-tokens": "99999999",
+            })
+
+    return Handler
+
+
+class FakeGroqServer:
+    """Local stand-in for Groq's chat-completions endpoint, served from a thread.
+
+    Point ``GROQ_BASE_URL`` (or ``settings.groq_base_url``) at ``base_url``.
+    """
+
+    def __init__(self, config: Optional[FakeGroqConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or FakeGroqConfig()
+        self.httpd = ThreadingHTTPServer((host, port), _handler(self.config))
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/openai/v1"
+
+    def start(self) -> "FakeGroqServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "FakeGroqServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Groq chat-completions endpoint for benchmarks")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=400.0)
+    parser.add_argument("--jitter", type=float, default=0.3, help="Sigma of the lognormal latency factor")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of 503 answers")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of 429 answers")
+    args = parser.parse_args()
+    config = FakeGroqConfig(args.latency_ms, args.jitter, args.error_rate, args.rate_limit_rate)
+    server = FakeGroqServer(config, port=args.port)
+    print(f"GROQ_BASE_URL={server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""Reading-pipeline benchmark: ``python -m benchmarks.run -o results.json``.
+
+Times each stage of the path an upload takes (decode, rasterize,
+preprocess, ROI, OCR, encode, LLM round-trip and the whole agent) on
+synthetic meter photos and multi-page PDFs. The LLM stages talk to
+``benchmarks.fake_groq`` unless ``--real-groq`` is given. ``--compare``
+checks the p50/p95 of a previous run and exits with 1 on regressions.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from benchmarks.fake_groq import FakeGroqConfig, FakeGroqServer
+from benchmarks.synthetic import encode, meter_image, meter_pdf, sample_values
+
+STAGES = ("decode", "rasterize", "preprocess", "roi", "ocr", "encode", "llm", "agent")
+COMPARED = ("p50_ms", "p95_ms")
+
+
+def percentile(sorted_ms: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_ms:
+        return 0.0
+    rank = max(math.ceil(q * len(sorted_ms)), 1)
+    return sorted_ms[rank - 1]
+
+
+class StageResult:
+    def __init__(self, name: str):
+        self.name = name
+        self.samples_ms: List[float] = []
+        self.errors = 0
+        self.wall_s = 0.0
+        self.units = 0
+        self.skipped: Optional[str] = None
+        self.last_error: Optional[str] = None
+
+    def summary(self) -> Dict[str, Any]:
+        if self.skipped:
+            return {"skipped": self.skipped}
+        ordered = sorted(self.samples_ms)
+        return {
+            "n": len(ordered),
+            "errors": self.errors,
+            "mean_ms": round(sum(ordered) / len(ordered), 2) if ordered else 0.0,
+            "p50_ms": round(percentile(ordered, 0.50), 2),
+            "p95_ms": round(percentile(ordered, 0.95), 2),
+            "p99_ms": round(percentile(ordered, 0.99), 2),
+            "max_ms": round(ordered[-1], 2) if ordered else 0.0,
+            # Pages for rasterize, otherwise calls completed per second of wall time
+            "throughput_per_s": round(self.units / self.wall_s, 2) if self.wall_s else 0.0,
+            **({"last_error": self.last_error} if self.last_error else {}),
+        }
+
+
+def _time_sync(result: StageResult, fn: Callable[[Any], Any], items: Sequence[Any],
+               units: Callable[[Any], int] = lambda _: 1) -> List[Any]:
+    outputs = []
+    start = time.perf_counter()
+    for item in items:
+        t0 = time.perf_counter()
+        try:
+            out = fn(item)
+        except Exception as e:
+            result.errors += 1
+            result.last_error = f"{e.__class__.__name__}: {e}"
+            continue
+        result.samples_ms.append((time.perf_counter() - t0) * 1000)
+        result.units += units(out)
+        outputs.append(out)
+    result.wall_s = time.perf_counter() - start
+    return outputs
+
+
+async def _time_async(result: StageResult, fn: Callable[[Any], Awaitable[Any]], items: Sequence[Any],
+                      concurrency: int) -> None:
+    slots = asyncio.Semaphore(max(concurrency, 1))
+
+    async def one(item: Any) -> None:
+        async with slots:
+            t0 = time.perf_counter()
+            try:
+                await fn(item)
+            except Exception as e:
+                result.errors += 1
+                result.last_error = f"{e.__class__.__name__}: {e}"
+                return
+            result.samples_ms.append((time.perf_counter() - t0) * 1000)
+            result.units += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(item) for item in items))
+    result.wall_s = time.perf_counter() - start
+
+
+def _skip_if_unavailable(result: StageResult, probe: Callable[[], Any]) -> bool:
+    try:
+        probe()
+    except Exception as e:
+        result.skipped = f"{e.__class__.__name__}: {e}"
+        return True
+    return False
+
+
+def run_benchmarks(args: argparse.Namespace) -> Dict[str, Any]:
+    if not args.real_groq:
+        # Measure the pipeline, not local quota waits; set before app is
+        # imported since the Groq scheduler reads them once
+        os.environ.setdefault("GROQ_RPM", "0")
+        os.environ.setdefault("GROQ_TPM", "0")
+        os.environ.setdefault("GROQ_API_KEY", "benchmark")
+    from app.config.settings import settings
+
+    settings.roi_use_detector = args.roi_detector
+
+    from app.tools.image_encoding import encode_for_vision
+    from app.tools.ocr import VISION, decode_image, dpi_for, render_pdf, run_ocr_image
+    from app.tools.preprocess import default_pipeline
+    from app.tools.roi import crop_to_roi
+
+    values = sample_values(args.images, seed=args.seed)
+    photos = [meter_image(v, seed=args.seed + i) for i, v in enumerate(values)]
+    uploads = [encode(img) for img in photos]
+    pdfs = [meter_pdf(sample_values(args.pdf_pages, seed=args.seed + i), seed=args.seed + i)
+            for i in range(args.pdfs)]
+    results = {name: StageResult(name) for name in STAGES}
+    selected = set(args.stages or STAGES)
+
+    if "decode" in selected:
+        _time_sync(results["decode"], decode_image, uploads)
+    if "rasterize" in selected and not _skip_if_unavailable(results["rasterize"], lambda: render_pdf(pdfs[0], 1, 1)):
+        _time_sync(results["rasterize"], lambda pdf: render_pdf(pdf, 1, args.pdf_pages, dpi_for(VISION)), pdfs, len)
+    if "preprocess" in selected:
+        _time_sync(results["preprocess"], lambda img: default_pipeline().run(img), photos)
+    if "roi" in selected:
+        _time_sync(results["roi"], crop_to_roi, photos)
+    if "ocr" in selected and not _skip_if_unavailable(results["ocr"], lambda: run_ocr_image(photos[0])):
+        _time_sync(results["ocr"], run_ocr_image, photos)
+    if "encode" in selected:
+        _time_sync(results["encode"], encode_for_vision, photos)
+    if selected & {"llm", "agent"}:
+        asyncio.run(_run_llm_stages(args, settings, photos, results, selected))
+
+    return {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "images": args.images,
+            "image_size": list(photos[0].size) if photos else None,
+            "pdfs": args.pdfs,
+            "pdf_pages": args.pdf_pages,
+            "concurrency": args.concurrency,
+            "groq": "real" if args.real_groq else {
+                "latency_ms": args.latency_ms, "jitter": args.jitter,
+                "error_rate": args.error_rate, "rate_limit_rate": args.rate_limit_rate,
+            },
+        },
+        "stages": {name: r.summary() for name, r in results.items() if name in selected},
+    }
+
+
+async def _run_llm_stages(args, settings, photos, results: Dict[str, StageResult], selected) -> None:
+    from app.agents.reading_agent import HydrometerReadingAgent
+    from app.services.groq_client import AsyncGroqService, close_http_clients
+    from app.tools.image_encoding import encode_for_vision
+
+    server = None
+    if not args.real_groq:
+        server = FakeGroqServer(FakeGroqConfig(args.latency_ms, args.jitter, args.error_rate,
+                                               args.rate_limit_rate, seed=args.seed)).start()
+        settings.groq_base_url = server.base_url
+    try:
+        if "llm" in selected:
+            service = AsyncGroqService()
+            encoded = [encode_for_vision(img) for img in photos]
+            await _time_async(results["llm"],
+                              lambda e: service.extract_digits_from_image_base64(e.b64, e.mime),
+                              encoded, args.concurrency)
+        if "agent" in selected:
+            agent = HydrometerReadingAgent()
+            # The uncached path: every photo goes through ROI, encoding, vision and hedging
+            await _time_async(results["agent"], agent._aread_uncached, photos, args.concurrency)
+    finally:
+        await close_http_clients()
+        if server is not None:
+            server.stop()
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Stages whose p50/p95 grew more than ``threshold`` (0.2 = 20%) over the baseline."""
+    regressions = []
+    for name, stage in current.get("stages", {}).items():
+        before = baseline.get("stages", {}).get(name)
+        if not before or "skipped" in stage or "skipped" in before:
+            continue
+        for metric in COMPARED:
+            old, new = before.get(metric) or 0.0, stage.get(metric) or 0.0
+            if old > 0 and new > old * (1 + threshold):
+                regressions.append(f"{name}.{metric}: {old:.2f} -> {new:.2f} ms (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def _print_table(report: Dict[str, Any]) -> None:
+    print(f"{'stage':<11}{'n':>5}{'err':>5}{'p50':>10}{'p95':>10}{'p99':>10}{'per_s':>10}", file=sys.stderr)
+    for name, s in report["stages"].items():
+        if "skipped" in s:
+            print(f"{name:<11} skipped ({s['skipped']})", file=sys.stderr)
+            continue
+        print(f"{name:<11}{s['n']:>5}{s['errors']:>5}{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}"
+              f"{s['p99_ms']:>10.1f}{s['throughput_per_s']:>10.2f}", file=sys.stderr)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the hydrometer reading pipeline")
+    parser.add_argument("-o", "--output", help="Write the JSON report here (default: stdout)")
+    parser.add_argument("--compare", help="Baseline JSON report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed p50/p95 growth (default: 0.2)")
+    parser.add_argument("--stages", nargs="*", choices=STAGES, help="Only these stages (default: all)")
+    parser.add_argument("--images", type=int, default=20, help="Synthetic meter photos (default: 20)")
+    parser.add_argument("--pdfs", type=int, default=3, help="Synthetic PDFs (default: 3)")
+    parser.add_argument("--pdf-pages", type=int, default=5, help="Pages per PDF (default: 5)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent LLM/agent calls (default: 4)")
+    parser.add_argument("--latency-ms", type=float, default=400.0, help="Fake Groq median latency")
+    parser.add_argument("--jitter", type=float, default=0.3, help="Fake Groq latency spread (lognormal sigma)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fake Groq share of 503 answers")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fake Groq share of 429 answers")
+    parser.add_argument("--real-groq", action="store_true", help="Call the configured Groq API instead of the fake")
+    parser.add_argument("--roi-detector", action="store_true", help="Use the EasyOCR detector in the ROI stage")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args)
+    _print_table(report)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
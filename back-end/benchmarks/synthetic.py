@@ -0,0 +1,71 @@
+import io
+import random
+from typing import List, Tuple
+
+from PIL import Image, ImageDraw, ImageFilter
+
+
+def meter_image(value: str, size: Tuple[int, int] = (1280, 960), seed: int = 0) -> Image.Image:
+    """A photo-like water meter: noisy background, round dial and a boxed digit window."""
+    rng = random.Random(seed)
+    width, height = size
+    img = Image.new("RGB", size, tuple(rng.randint(90, 160) for _ in range(3)))
+    draw = ImageDraw.Draw(img)
+    for _ in range(200):
+        x, y = rng.randrange(width), rng.randrange(height)
+        r = rng.randint(2, 12)
+        shade = rng.randint(60, 200)
+        draw.ellipse((x - r, y - r, x + r, y + r), fill=(shade, shade, shade))
+    cx, cy, radius = width // 2, height // 2, min(width, height) // 3
+    draw.ellipse((cx - radius, cy - radius, cx + radius, cy + radius), fill=(235, 235, 230), outline=(20, 20, 20), width=6)
+
+    # Digit window: black cells with white digits, as on the odometer row
+    cell_w, cell_h = radius // 4, radius // 3
+    left = cx - cell_w * len(value) // 2
+    top = cy - cell_h // 2
+    for i, digit in enumerate(value):
+        x0 = left + i * cell_w
+        draw.rectangle((x0, top, x0 + cell_w - 4, top + cell_h), fill=(15, 15, 15))
+        _draw_digit(draw, digit, (x0 + 6, top + 6, x0 + cell_w - 10, top + cell_h - 6))
+    return img.filter(ImageFilter.GaussianBlur(0.8)).rotate(rng.uniform(-4, 4), expand=False, fillcolor=(120, 120, 120))
+
+
+# Seven-segment layout: the default PIL font is too small to stand in for dial digits
+_SEGMENTS = {
+    "0": "abcdef", "1": "bc", "2": "abdeg", "3": "abcdg", "4": "bcfg",
+    "5": "acdfg", "6": "acdefg", "7": "abc", "8": "abcdefg", "9": "abcdfg",
+}
+
+
+def _draw_digit(draw: ImageDraw.ImageDraw, digit: str, box: Tuple[int, int, int, int]) -> None:
+    x0, y0, x1, y1 = box
+    ym = (y0 + y1) // 2
+    t = max((x1 - x0) // 6, 2)
+    lines = {
+        "a": (x0, y0, x1, y0), "b": (x1, y0, x1, ym), "c": (x1, ym, x1, y1), "d": (x0, y1, x1, y1),
+        "e": (x0, ym, x0, y1), "f": (x0, y0, x0, ym), "g": (x0, ym, x1, ym),
+    }
+    for segment in _SEGMENTS.get(digit, ""):
+        draw.line(lines[segment], fill=(245, 245, 245), width=t)
+
+
+def encode(img: Image.Image, fmt: str = "JPEG", quality: int = 90) -> bytes:
+    buf = io.BytesIO()
+    if fmt.upper() == "PNG":
+        img.save(buf, format="PNG")
+    else:
+        img.save(buf, format=fmt, quality=quality)
+    return buf.getvalue()
+
+
+def meter_pdf(values: List[str], size: Tuple[int, int] = (1280, 960), seed: int = 0) -> bytes:
+    """A multi-page PDF (one meter photo per page), as scanned reading reports."""
+    pages = [meter_image(v, size, seed + i) for i, v in enumerate(values)]
+    buf = io.BytesIO()
+    pages[0].save(buf, format="PDF", save_all=True, append_images=pages[1:], resolution=150)
+    return buf.getvalue()
+
+
+def sample_values(count: int, digits: int = 5, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    return ["".join(str(rng.randint(0, 9)) for _ in range(digits)) for _ in range(count)]
@@ -0,0 +1,132 @@
+import io
+import json
+import tarfile
+import zipfile
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.config.settings import settings
+from app.main import app
+from app.routers import ocr as ocr_router
+from app.services.archives import iter_archive
+
+from tests.test_hydrometer_read import FakeAgent
+
+client = TestClient(app)
+
+
+def _png(color):
+    buf = io.BytesIO()
+    Image.new("RGB", (8, 8), color).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _zip(members):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members:
+            zf.writestr(name, data)
+    return buf.getvalue()
+
+
+def _tar(members, mode="w:gz"):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode=mode) as tf:
+        for name, data in members:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+def test_zip_ignora_outros_tipos_e_valida_conteudo():
+    data = _zip([
+        ("a/1.png", _png((0, 1, 0))),
+        ("a/notas.txt", b"ignorar"),
+        ("__MACOSX/a/._1.png", b"meta"),
+        ("a/2.jpg", b"nao e jpeg"),
+    ])
+    members = list(iter_archive(io.BytesIO(data)))
+    assert [(m.index, m.path) for m in members] == [(0, "a/1.png"), (1, "a/2.jpg")]
+    assert members[0].content.startswith(b"\x89PNG") and members[0].erro is None
+    assert members[1].content is None and "jpg" in members[1].erro
+
+
+def test_tar_gz_lido_em_modo_stream():
+    data = _tar([("x.png", _png((0, 5, 0))), ("y.png", _png((0, 6, 0)))])
+    assert [m.path for m in iter_archive(io.BytesIO(data))] == ["x.png", "y.png"]
+
+
+def test_limites_de_membros_e_total_descompactado(monkeypatch):
+    data = _zip([(f"{i}.png", _png((0, i, 0))) for i in range(3)])
+    monkeypatch.setattr(settings, "archive_max_members", 2)
+    with pytest.raises(HTTPException) as exc:
+        list(iter_archive(io.BytesIO(data)))
+    assert exc.value.status_code == 413
+
+    monkeypatch.setattr(settings, "archive_max_members", 10)
+    monkeypatch.setattr(settings, "archive_max_total_mb", 0)
+    with pytest.raises(HTTPException) as exc:
+        list(iter_archive(io.BytesIO(data)))
+    assert exc.value.status_code == 413
+
+
+def test_membro_acima_do_limite_vira_erro_sem_interromper(monkeypatch):
+    monkeypatch.setattr(settings, "max_file_size_mb", 0)
+    members = list(iter_archive(io.BytesIO(_zip([("a.png", _png((0, 1, 0)))]))))
+    assert members[0].content is None and "excede" in members[0].erro
+
+
+def test_formato_invalido():
+    with pytest.raises(HTTPException) as exc:
+        list(iter_archive(io.BytesIO(b"nada de zip ou tar aqui")))
+    assert exc.value.status_code == 400
+
+
+def test_rota_archive_resultados_por_membro(monkeypatch):
+    monkeypatch.setattr(ocr_router, "HydrometerReadingAgent", FakeAgent)
+    monkeypatch.setattr(ocr_router, "warmup_reader", lambda lang: None)
+    data = _zip([("a.png", _png((0, 1, 0))), ("b.png", _png((255, 2, 0))), ("c.png", _png((0, 3, 0)))])
+    r = client.post("/api/hydrometer/archive", files={"archive": ("lote.zip", data, "application/zip")})
+    assert r.status_code == 200
+    body = r.json()
+    assert body["total"] == 3 and body["erros"] == 1
+    assert [(x["path"], x["valor_da_leitura"]) for x in body["results"]] == [
+        ("a.png", "1"), ("b.png", None), ("c.png", "3")]
+    assert all(x["tempo_ms"] > 0 for x in body["results"])
+
+
+def test_rota_archive_em_stream(monkeypatch):
+    monkeypatch.setattr(ocr_router, "HydrometerReadingAgent", FakeAgent)
+    monkeypatch.setattr(ocr_router, "warmup_reader", lambda lang: None)
+    data = _tar([("a.png", _png((0, 1, 0))), ("b.png", _png((0, 2, 0)))])
+    r = client.post("/api/hydrometer/archive?stream=ndjson",
+                    files={"archive": ("lote.tar.gz", data, "application/gzip")})
+    assert r.status_code == 200
+    events = [json.loads(line) for line in r.text.splitlines()]
+    assert sorted(e["valor_da_leitura"] for e in events[:-1]) == ["1", "2"]
+    assert events[-1] == {"event": "end", "events": 2}
+
+
+def test_membro_criptografado_ou_corrompido_vira_erro_sem_interromper():
+    png = _png((0, 1, 0))
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_STORED) as zf:
+        for name in ("senha.png", "crc.png", "ok.png"):
+            zf.writestr(name, png)
+    data = bytearray(buf.getvalue())
+    # senha.png: bit de criptografia no diretório central
+    central = data.index(b"PK\x01\x02")
+    data[central + 8] |= 0x01
+    # crc.png: um byte do conteúdo trocado, o CRC-32 não confere
+    second = data.index(b"crc.png") + len("crc.png")
+    data[second + len(png) // 2] ^= 0xFF
+
+    members = list(iter_archive(io.BytesIO(bytes(data))))
+    assert [m.path for m in members] == ["senha.png", "crc.png", "ok.png"]
+    assert members[0].content is None and "senha" in members[0].erro
+    assert members[1].content is None and "corrompido" in members[1].erro
+    assert members[2].erro is None and members[2].content == png
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from app.config.settings import settings
+from app.services.groq_client import AsyncGroqService, close_http_clients
+from benchmarks.fake_groq import FakeGroqConfig, FakeGroqServer
+from benchmarks.run import compare, percentile
+from benchmarks.synthetic import meter_pdf, sample_values
+
+
+def test_percentil_por_posicao():
+    samples = [float(i) for i in range(1, 101)]
+    assert (percentile(samples, 0.5), percentile(samples, 0.95), percentile(samples, 0.99)) == (50.0, 95.0, 99.0)
+    assert percentile([], 0.5) == 0.0
+
+
+def test_comparacao_aponta_regressoes():
+    base = {"stages": {"decode": {"p50_ms": 10.0, "p95_ms": 20.0}, "ocr": {"skipped": "sem easyocr"}}}
+    now = {"stages": {"decode": {"p50_ms": 11.0, "p95_ms": 30.0}, "ocr": {"p50_ms": 1.0}}}
+    assert compare(now, base, 0.2) == ["decode.p95_ms: 20.00 -> 30.00 ms (+50%)"]
+
+
+def test_pdf_sintetico_com_varias_paginas():
+    pdf = meter_pdf(sample_values(3), size=(320, 240))
+    assert pdf.startswith(b"%PDF-") and pdf.count(b"/Type /Page\n") + pdf.count(b"/Type /Page ") >= 1
+
+
+def test_servidor_groq_falso_responde_e_falha(monkeypatch):
+    monkeypatch.setattr(settings, "groq_max_retries", 0)
+
+    async def scenario(server):
+        monkeypatch.setattr(settings, "groq_base_url", server.base_url)
+        service = AsyncGroqService(api_key="x")
+        try:
+            return await service.extract_digits("leitura 00123")
+        finally:
+            await close_http_clients()
+
+    with FakeGroqServer(FakeGroqConfig(latency_ms=0, answer="00123")) as server:
+        assert asyncio.run(scenario(server)) == "00123"
+        # Uma requisição só: a resposta do SDK é lida sem cair no HTTP direto
+        assert server.config.requests == 1
+
+    with FakeGroqServer(FakeGroqConfig(latency_ms=0, error_rate=1.0)) as server:
+        with pytest.raises(Exception) as exc:
+            asyncio.run(scenario(server))
+        assert getattr(exc.value, "status_code", None) == 503
@@ -0,0 +1,60 @@
+import io
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+import app.infrastructure.orm_models  # noqa: F401  (registra as tabelas)
+from app.infrastructure.db import Base
+from app.services import imoveis_service, pessoas_service
+from benchmarks.cadastro import SHAPES, compare_plans, run_load, seed, shape_statements, summarize_plan
+
+
+@pytest.fixture
+def engine(monkeypatch, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'cadastro.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine, future=True)
+    monkeypatch.setattr(pessoas_service, "SessionLocal", factory)
+    monkeypatch.setattr(imoveis_service, "SessionLocal", factory)
+    seed(engine, pessoas=300, imoveis=500, batch=120, log=io.StringIO())
+    return engine
+
+
+def test_formatos_de_consulta_iguais_aos_da_listagem(engine):
+    with Session(engine) as db:
+        for shape in SHAPES:
+            stmts = shape_statements(db, shape)
+            rows = db.execute(stmts["page"]).all()
+            assert stmts["total"] >= len(rows)
+        # Página profunda é ajustada para a última, como em listar_*
+        deep = next(s for s in SHAPES if s.name == "pessoas_pagina_profunda")
+        assert shape_statements(db, deep)["page_number"] == 6
+
+    total, page, items = pessoas_service.listar_pessoas(None, None, None, None, None, True, None, "1", 20, "nome", "asc")
+    with Session(engine) as db:
+        assert total == pessoas_service.consulta_pessoas(db, ativo=True).count()
+    assert page == 1 and len(items) == 20 and [p.nome for p in items] == sorted(p.nome for p in items)
+
+
+def test_carga_registra_percentis_por_formato(engine):
+    report = run_load(None, requests=60, concurrency=4)
+    assert report["overall"]["n"] + report["overall"]["errors"] == 60
+    assert report["overall"]["errors"] == 0
+    assert report["shapes"]["pessoas_padrao"]["p95_ms"] >= report["shapes"]["pessoas_padrao"]["p50_ms"] > 0
+
+
+def test_resumo_do_plano_e_regressao_de_seq_scan():
+    plan = [{
+        "Plan": {"Node Type": "Limit", "Actual Rows": 20, "Shared Hit Blocks": 10, "Shared Read Blocks": 2, "Plans": [
+            {"Node Type": "Sort", "Sort Method": "top-N heapsort", "Plans": [
+                {"Node Type": "Seq Scan", "Relation Name": "pessoas"}]}]},
+        "Planning Time": 0.2, "Execution Time": 15.0,
+    }]
+    summary = summarize_plan(plan)
+    assert summary["seq_scans"] == ["pessoas"] and summary["sorts"] == ["top-N heapsort"]
+    assert (summary["shared_hit"], summary["shared_read"], summary["execution_ms"]) == (10, 2, 15.0)
+
+    before = {"x": {"count": {"seq_scans": [], "execution_ms": 10.0}, "page": {"seq_scans": [], "execution_ms": 1.0}}}
+    now = {"x": {"count": {"seq_scans": [], "execution_ms": 11.0}, "page": summary}}
+    assert compare_plans(now, before, 0.5) == ["x.page: new Seq Scan on pessoas", "x.page: 1.0 -> 15.0 ms"]
@@ -0,0 +1,35 @@
+import asyncio
+
+from app.services.concurrency import merge_limited
+
+
+def test_merge_limited_fecha_cedo_sem_travar():
+    async def events(index, item):
+        for n in range(100):
+            await asyncio.sleep(0)
+            yield (index, n)
+
+    async def main():
+        merged = merge_limited(list(range(4)), events, 2)
+        first = [await merged.__anext__() for _ in range(3)]
+        # Fila cheia (limit * 4) e consumidor parado: aclose precisa retornar
+        await asyncio.sleep(0.05)
+        await asyncio.wait_for(merged.aclose(), timeout=1)
+        # Nenhuma tarefa produtora sobrevive ao fechamento
+        return first, len(asyncio.all_tasks()) - 1
+
+    first, leftover = asyncio.run(main())
+    assert len(first) == 3 and leftover == 0
+
+
+def test_merge_limited_entrega_todos_os_eventos():
+    async def events(index, item):
+        for n in range(item):
+            await asyncio.sleep(0)
+            yield (index, n)
+
+    async def main():
+        return [e async for e in merge_limited([3, 0, 5, 2], events, 2)]
+
+    out = asyncio.run(main())
+    assert sorted(out) == sorted((i, n) for i, k in enumerate([3, 0, 5, 2]) for n in range(k))
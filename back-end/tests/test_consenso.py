@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from app.agents.reading_agent import HydrometerReadingAgent
+from app.models.schemas import ReadingOutcome
+
+
+class FakeAgent(HydrometerReadingAgent):
+    def __init__(self, delays):
+        # Página (valor, atraso); não cria clientes Groq/OCR
+        self.delays = delays
+        self.cancelled = []
+
+    async def aread(self, img, source=None):
+        valor, delay = self.delays[img]
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(img)
+            raise
+        if valor is None:
+            raise RuntimeError("falha")
+        return ReadingOutcome(valor=valor)
+
+
+def test_encerra_quando_duas_paginas_concordam():
+    agent = FakeAgent({0: ("123", 0.05), 1: ("999", 0.2), 2: ("123", 0.1), 3: ("555", 1.0)})
+    outcome, votes = asyncio.run(agent.aread_consensus([0, 1, 2, 3]))
+    assert (outcome.valor, votes) == ("123", 2)
+    assert sorted(agent.cancelled) == [1, 3]
+
+
+def test_sem_acordo_vence_a_primeira_pagina():
+    agent = FakeAgent({0: ("111", 0.1), 1: ("222", 0.05), 2: (None, 0.01)})
+    outcome, votes = asyncio.run(agent.aread_consensus([0, 1, 2]))
+    assert (outcome.valor, votes) == ("111", 1)
+
+
+def test_paginas_de_gerador_assincrono_e_falha_total():
+    agent = FakeAgent({0: (None, 0.01), 1: (None, 0.01)})
+
+    async def pages():
+        for i in (0, 1):
+            yield i
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(agent.aread_consensus(pages()))
@@ -0,0 +1,197 @@
+import asyncio
+
+import httpx
+
+from app.services import groq_client
+from app.services.groq_client import AsyncGroqService, GroqService
+
+
+def _mock_client(handler):
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def _use_mock_client(handler):
+    # Cliente do loop em execução; close_http_clients o descarta no fim
+    groq_client._async_http_clients[asyncio.get_running_loop()] = _mock_client(handler)
+
+
+class _FailingSDK:
+    class chat:
+        class completions:
+            @staticmethod
+            async def create(**kwargs):
+                raise RuntimeError("sdk indisponível")
+
+
+def test_async_service_usa_http_compartilhado_quando_sdk_falha(monkeypatch):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"choices": [{"message": {"content": "Leitura: 01234"}}]})
+
+    async def scenario():
+        _use_mock_client(handler)
+        svc = AsyncGroqService(api_key="k")
+        svc.client = _FailingSDK()
+        first = await svc.extract_digits_from_image_base64("AAAA")
+        second = await svc.extract_digits("texto 01234")
+        await groq_client.close_http_clients()
+        return first, second
+
+    assert asyncio.run(scenario()) == ("01234", "01234")
+    assert len(calls) == 2
+    assert calls[0].url.path.endswith("/chat/completions")
+    assert calls[0].headers["Authorization"] == "Bearer k"
+
+
+def test_async_service_erro_http_vira_runtime_error(monkeypatch):
+    async def scenario():
+        _use_mock_client(lambda r: httpx.Response(500, text="boom"))
+        svc = AsyncGroqService(api_key="k")
+        svc.client = None
+        try:
+            await svc.extract_digits("123")
+        finally:
+            await groq_client.close_http_clients()
+
+    try:
+        asyncio.run(scenario())
+    except RuntimeError as e:
+        assert "500" in str(e)
+    else:
+        raise AssertionError("esperava RuntimeError")
+
+
+def test_clientes_sdk_compartilham_pool():
+    a = GroqService(api_key="k")
+    b = GroqService(api_key="k")
+    assert groq_client.get_sync_http_client() is groq_client.get_sync_http_client()
+    if a.client is not None and b.client is not None:
+        assert a.client._client is b.client._client
+
+
+def test_retentativa_com_backoff_e_circuito_abre(monkeypatch):
+    from app.services import circuit_breaker
+    from app.services.circuit_breaker import CircuitOpenError, RetryBudget
+
+    monkeypatch.setattr(groq_client, "retry_budget", RetryBudget(ratio=0, max_tokens=3))
+    monkeypatch.setattr(circuit_breaker.settings, "groq_backoff_base_ms", 1)
+    monkeypatch.setattr(circuit_breaker.settings, "groq_breaker_failures", 2)
+    monkeypatch.setattr(circuit_breaker, "_breakers", {})
+    statuses = iter([503, 200, 503, 503, 503, 503])
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        status = next(statuses)
+        return httpx.Response(status, json={"choices": [{"message": {"content": "42"}}]})
+
+    async def scenario():
+        _use_mock_client(handler)
+        svc = AsyncGroqService(api_key="k", model="m")
+        svc.client = None
+        try:
+            first = await svc.extract_digits("x")  # 503 -> retentativa -> 200
+            errors = []
+            for _ in range(3):
+                try:
+                    await svc.extract_digits("x")
+                except Exception as e:
+                    errors.append(e)
+            return first, errors
+        finally:
+            await groq_client.close_http_clients()
+
+    first, errors = asyncio.run(scenario())
+    assert first == "42"
+    # orçamento: 3 retentativas no total; a 1ª chamada usou uma, a 2ª as outras
+    # duas e a 3ª falhou sem retentar, abrindo o circuito para a 4ª
+    assert [type(e).__name__ for e in errors] == ["GroqAPIError", "GroqAPIError", "CircuitOpenError"]
+    assert isinstance(errors[2], CircuitOpenError)
+    assert len(calls) == 2 + 3 + 1
+    stats = circuit_breaker.resilience_stats()
+    assert stats["breakers"]["m (chat)"]["state"] == "open"
+
+
+def test_circuito_meio_aberto_testa_uma_chamada(monkeypatch):
+    from app.services.circuit_breaker import CircuitBreaker
+
+    breaker = CircuitBreaker("x", failure_threshold=1, reset_timeout_s=0)
+    breaker.record_failure()
+    assert breaker.allow() is True  # sonda
+    assert breaker.allow() is False
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+
+def _completion(content):
+    return {
+        "id": "c1", "object": "chat.completion", "created": 0, "model": "m",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+    }
+
+
+def test_sdk_usa_o_mesmo_endpoint_que_o_http_direto(monkeypatch):
+    paths = []
+
+    def handler(request):
+        paths.append(request.url.path)
+        return httpx.Response(200, json=_completion("00123"))
+
+    monkeypatch.setattr(groq_client, "_sync_http_client", httpx.Client(transport=httpx.MockTransport(handler)))
+    svc = GroqService(api_key="k", model="m")
+    assert svc.client is not None, "SDK do Groq ausente"
+    assert svc.extract_digits("leitura 00123") == "00123"
+    # GROQ_BASE_URL já termina em /openai/v1; o SDK não pode repetir o prefixo
+    assert paths == ["/openai/v1/chat/completions"]
+    assert svc.url.endswith(paths[0])
+
+
+def test_async_sdk_faz_uma_unica_requisicao(monkeypatch):
+    calls = []
+    observed = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, headers={"x-ratelimit-remaining-requests": "10"}, json=_completion("00123"))
+
+    monkeypatch.setattr(groq_client.groq_scheduler, "observe", lambda headers, status_code=None: observed.append(headers))
+
+    async def scenario():
+        _use_mock_client(handler)
+        svc = AsyncGroqService(api_key="k", model="m")
+        assert svc.client is not None, "SDK do Groq ausente"
+        try:
+            return await svc.extract_digits("leitura 00123")
+        finally:
+            await groq_client.close_http_clients()
+
+    assert asyncio.run(scenario()) == "00123"
+    # A resposta do SDK é aguardada e lida: nada de repetir a chamada por HTTP direto
+    assert len(calls) == 1
+    # Cota contabilizada uma vez, a partir dos cabeçalhos da resposta do SDK
+    assert len(observed) == 1 and observed[0]["x-ratelimit-remaining-requests"] == "10"
+
+
+def test_cliente_http_por_event_loop(monkeypatch):
+    from benchmarks.fake_groq import FakeGroqConfig, FakeGroqServer
+
+    monkeypatch.setattr(groq_client.settings, "groq_max_retries", 0)
+
+    with FakeGroqServer(FakeGroqConfig(latency_ms=0, answer="00123")) as server:
+        monkeypatch.setattr(groq_client.settings, "groq_base_url", server.base_url)
+        # Criado fora de qualquer loop, como o agente de leitura
+        svc = AsyncGroqService(api_key="x")
+
+        async def read():
+            return await svc.extract_digits("leitura 00123")
+
+        try:
+            # Cada asyncio.run tem seu loop: o pool de conexões do primeiro não serve ao segundo
+            assert [asyncio.run(read()) for _ in range(3)] == ["00123"] * 3
+            assert server.config.requests == 3
+        finally:
+            asyncio.run(groq_client.close_http_clients())
+    assert len(groq_client._async_http_clients) == 0
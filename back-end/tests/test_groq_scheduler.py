@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+from app.services.groq_scheduler import (
+    BATCH,
+    INTERACTIVE,
+    GroqScheduler,
+    estimate_tokens,
+    groq_priority,
+    parse_duration,
+)
+
+
+def test_parse_duration_cabecalhos_groq():
+    assert parse_duration("7.66s") == 7.66
+    assert parse_duration("2m59.56s") == 179.56
+    assert parse_duration("120ms") == 0.12
+    assert parse_duration("3") == 3.0
+    assert parse_duration(None) is None
+
+
+def test_interativas_passam_na_frente_de_lote():
+    # 60 req/min = 1 por segundo; com o balde quase vazio só a primeira passa de imediato
+    scheduler = GroqScheduler(rpm=60, tpm=0)
+    for _ in range(59):
+        scheduler.acquire_sync(1)
+    order = []
+
+    async def call(name, priority, delay):
+        await asyncio.sleep(delay)
+        await scheduler.acquire(1, priority)
+        order.append(name)
+
+    async def scenario():
+        async def batch_jobs():
+            with groq_priority(BATCH):
+                await asyncio.gather(call("b1", None, 0), call("b2", None, 0.01))
+
+        await asyncio.gather(batch_jobs(), call("i1", INTERACTIVE, 0.05))
+
+    start = time.monotonic()
+    asyncio.run(scenario())
+    assert order == ["b1", "i1", "b2"]
+    assert time.monotonic() - start >= 1.9
+    stats = scheduler.stats()
+    assert stats["waits"]["batch"]["count"] == 2
+    assert stats["queue_depth"] == {"interactive": 0, "batch": 0}
+
+
+def test_retry_after_e_cabecalhos_de_cota():
+    scheduler = GroqScheduler(rpm=0, tpm=6000)
+    scheduler.observe({"retry-after": "0.3", "x-ratelimit-remaining-tokens": "100",
+                       "x-ratelimit-limit-tokens": "6000"}, 429)
+    stats = scheduler.stats()
+    assert stats["rate_limited"] == 1
+    assert 0 < stats["blocked_for_s"] <= 0.3
+    assert stats["tokens_available"] <= 101
+    waited = scheduler.acquire_sync(50)
+    assert waited >= 0.25
+
+
+def test_estimativa_de_tokens_conta_imagem():
+    text = [{"role": "user", "content": "x" * 400}]
+    image = [{"role": "user", "content": [{"type": "text", "text": "x" * 40},
+                                          {"type": "image_url", "image_url": {"url": "data:"}}]}]
+    assert estimate_tokens(image) > estimate_tokens(text) > 100
@@ -0,0 +1,92 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services import hedging
+from app.services.hedging import LatencyTracker, hedged, hedged_sync
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_visao_rapida_nao_inicia_fallback():
+    started = []
+
+    async def vision():
+        await asyncio.sleep(0.01)
+        return "123"
+
+    async def ocr():
+        started.append(True)
+        return "999"
+
+    assert _run(hedged(vision, ocr, delay=0.2)) == ("123", "vision")
+    assert started == []
+
+
+def test_visao_lenta_perde_para_fallback_e_e_cancelada():
+    cancelled = []
+
+    async def vision():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return "123"
+
+    async def ocr():
+        await asyncio.sleep(0.01)
+        return "456"
+
+    start = time.perf_counter()
+    assert _run(hedged(vision, ocr, delay=0.05)) == ("456", "ocr")
+    assert time.perf_counter() - start < 1
+    assert cancelled == [True]
+
+
+def test_falha_da_visao_inicia_fallback_imediatamente():
+    async def vision():
+        raise RuntimeError("vision")
+
+    async def ocr():
+        return "789"
+
+    start = time.perf_counter()
+    assert _run(hedged(vision, ocr, delay=10)) == ("789", "ocr")
+    assert time.perf_counter() - start < 1
+
+
+def test_ambos_falham_propaga_erro_da_visao():
+    async def vision():
+        raise RuntimeError("vision")
+
+    async def ocr():
+        raise ValueError("ocr")
+
+    with pytest.raises(RuntimeError, match="vision"):
+        _run(hedged(vision, ocr, delay=0.01))
+
+
+def test_hedged_sync():
+    def vision():
+        time.sleep(1)
+        return "1"
+
+    assert hedged_sync(vision, lambda: "2", delay=0.02) == ("2", "ocr")
+
+
+def test_atraso_usa_percentil_apos_amostras(monkeypatch):
+    monkeypatch.setattr(hedging.settings, "hedge_min_samples", 5)
+    monkeypatch.setattr(hedging.settings, "hedge_delay_ms", 3000)
+    monkeypatch.setattr(hedging.settings, "hedge_min_delay_ms", 100)
+    monkeypatch.setattr(hedging.settings, "hedge_percentile", 0.95)
+    tracker = LatencyTracker(window=100)
+    assert tracker.hedge_delay() == 3.0
+    for ms in range(1, 101):
+        tracker.record(ms / 100)
+    assert tracker.hedge_delay() == pytest.approx(0.96)
+    monkeypatch.setattr(hedging.settings, "hedge_enabled", False)
+    assert tracker.hedge_delay() == float("inf")
@@ -0,0 +1,127 @@
+import asyncio
+import io
+import time
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.main import app
+from app.models.schemas import ReadingOutcome
+from app.routers import ocr as ocr_router
+
+client = TestClient(app)
+
+
+def _png(color):
+    buf = io.BytesIO()
+    Image.new("RGB", (8, 8), color).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+class FakeAgent:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def aread(self, img, source=None):
+        await asyncio.sleep(0.2)
+        r, g, b = img.getpixel((0, 0))
+        if r == 255:
+            raise RuntimeError("falha de leitura")
+        return ReadingOutcome(valor=str(g), roi=[0, 0, 8, 8])
+
+    async def aread_from_image(self, img):
+        return (await self.aread(img)).valor
+
+
+def test_arquivos_processados_em_paralelo_na_ordem_original(monkeypatch):
+    monkeypatch.setattr(ocr_router, "HydrometerReadingAgent", FakeAgent)
+    monkeypatch.setattr(ocr_router, "warmup_reader", lambda lang: None)
+    files = [
+        ("files", ("a.png", _png((0, 1, 0)), "image/png")),
+        ("files", ("b.png", _png((255, 2, 0)), "image/png")),
+        ("files", ("c.png", _png((0, 3, 0)), "image/png")),
+        ("files", ("d.png", _png((0, 4, 0)), "image/png")),
+    ]
+    start = time.perf_counter()
+    r = client.post("/api/hydrometer/read", files=files, data={"lang": "pt"})
+    elapsed = time.perf_counter() - start
+    assert r.status_code == 200
+    results = r.json()["results"]
+    assert [x["filename"] for x in results] == ["a.png", "b.png", "c.png", "d.png"]
+    assert [x["valor_da_leitura"] for x in results] == ["1", None, "3", "4"]
+    assert "falha de leitura" in results[1]["erro"]
+    assert results[0]["roi"] == [0, 0, 8, 8]
+    # 4 arquivos x 0.2 s em sequência levariam 0.8 s
+    assert elapsed < 0.6
+
+
+class SlowFirstAgent(FakeAgent):
+    async def aread(self, img, source=None):
+        r, g, b = img.getpixel((0, 0))
+        await asyncio.sleep(0.3 if g == 1 else 0.05)
+        return ReadingOutcome(valor=str(g))
+
+
+def test_stream_ndjson_em_ordem_de_conclusao(monkeypatch):
+    import json
+
+    monkeypatch.setattr(ocr_router, "HydrometerReadingAgent", SlowFirstAgent)
+    monkeypatch.setattr(ocr_router, "warmup_reader", lambda lang: None)
+    files = [
+        ("files", ("a.png", _png((0, 1, 0)), "image/png")),
+        ("files", ("b.png", _png((0, 2, 0)), "image/png")),
+    ]
+    r = client.post("/api/hydrometer/read?stream=ndjson", files=files)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in r.text.splitlines()]
+    assert [(e["index"], e["valor_da_leitura"]) for e in events[:2]] == [(1, "2"), (0, "1")]
+    assert events[-1] == {"event": "end", "events": 2}
+
+
+def test_extract_sse_por_accept(monkeypatch):
+    monkeypatch.setattr(ocr_router, "HydrometerReadingAgent", SlowFirstAgent)
+    monkeypatch.setattr(ocr_router, "warmup_reader", lambda lang: None)
+    files = [("files", ("a.png", _png((0, 2, 0)), "image/png"))]
+    r = client.post("/api/extract", files=files, headers={"Accept": "text/event-stream"})
+    assert r.headers["content-type"].startswith("text/event-stream")
+    blocks = [b for b in r.text.split("\n\n") if b]
+    assert [b.split("\n")[1] for b in blocks[:2]] == ["event: page", "event: file"]
+    assert '"pages": ["2"]' in blocks[1]
+    assert blocks[-1].startswith("event: end")
+
+
+def test_pdf_corrompido_e_erro_do_cliente(monkeypatch):
+    import pytest
+    from fastapi import HTTPException
+
+    from app.agents.reading_agent import HydrometerReadingAgent
+    from app.services import hydrometer_service
+    from app.tools import ocr
+
+    corrompido = b"%PDF-1.4\nisto nao e um pdf"
+
+    async def read(content, consensus):
+        # O PDF falha antes de qualquer leitura
+        return await hydrometer_service.read_upload(HydrometerReadingAgent(), "pdf", content, consensus)
+
+    for consensus in (False, True):
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(read(corrompido, consensus))
+        assert exc.value.status_code == 400 and exc.value.detail.startswith("PDF inválido")
+
+    # Sem nenhum renderizador instalado a falha é do servidor
+    real = ocr.optional_module
+    monkeypatch.setattr(ocr, "optional_module",
+                        lambda name: None if name in ("pypdfium2", "pdf2image") else real(name))
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(read(corrompido, False))
+    assert exc.value.status_code == 500
+
+
+def test_extract_pdf_corrompido(monkeypatch):
+    monkeypatch.setattr(ocr_router, "HydrometerReadingAgent", FakeAgent)
+    monkeypatch.setattr(ocr_router, "warmup_reader", lambda lang: None)
+    files = [("files", ("a.pdf", b"%PDF-1.4\nisto nao e um pdf", "application/pdf"))]
+    result = client.post("/api/extract", files=files, data={"lang": "pt"}).json()[0]
+    assert result["pages"] == [] and result["erro"].startswith("PDF inválido")
@@ -0,0 +1,41 @@
+import base64
+import io
+
+from PIL import Image
+
+from app.tools import image_encoding
+from app.tools.image_encoding import encode_for_vision
+
+
+def _jpeg(size):
+    buf = io.BytesIO()
+    Image.new("RGB", size, (90, 120, 150)).save(buf, format="JPEG", quality=80)
+    return buf.getvalue()
+
+
+def test_reduz_para_resolucao_do_modelo(monkeypatch):
+    monkeypatch.setattr(image_encoding.settings, "vision_max_side", 512)
+    monkeypatch.setattr(image_encoding.settings, "vision_format", "jpeg")
+    img = Image.new("RGB", (2480, 3508), (255, 255, 255))
+    encoded = encode_for_vision(img)
+    assert encoded.mime == "image/jpeg"
+    assert max(encoded.width, encoded.height) == 512
+    decoded = Image.open(io.BytesIO(base64.b64decode(encoded.b64)))
+    assert decoded.size == (encoded.width, encoded.height)
+    assert encoded.nbytes == len(base64.b64decode(encoded.b64))
+    assert encoded.reencoded
+
+
+def test_jpeg_compacto_enviado_sem_recodificar(monkeypatch):
+    monkeypatch.setattr(image_encoding.settings, "vision_max_side", 1024)
+    source = _jpeg((640, 480))
+    img = Image.open(io.BytesIO(source)).convert("RGB")
+    encoded = encode_for_vision(img, source)
+    assert not encoded.reencoded
+    assert base64.b64decode(encoded.b64) == source
+
+
+def test_webp_configuravel(monkeypatch):
+    monkeypatch.setattr(image_encoding.settings, "vision_format", "webp")
+    encoded = encode_for_vision(Image.new("RGB", (300, 200), (0, 0, 0)))
+    assert encoded.mime == "image/webp"
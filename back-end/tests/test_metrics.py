@@ -0,0 +1,50 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.infrastructure import metrics
+from app.main import app
+from app.routers import ocr as ocr_router
+from tests.test_hydrometer_read import FakeAgent, _png
+
+pytestmark = pytest.mark.skipif(metrics.prometheus_client is None, reason="prometheus_client não instalado")
+
+client = TestClient(app)
+
+
+def test_metrics_expoe_histogramas_por_etapa_e_rota(monkeypatch):
+    monkeypatch.setattr(ocr_router, "HydrometerReadingAgent", FakeAgent)
+    monkeypatch.setattr(ocr_router, "warmup_reader", lambda lang: None)
+    files = [("files", ("a.png", _png((0, 1, 0)), "image/png"))]
+    assert client.post("/api/hydrometer/read", files=files, data={"lang": "pt"}).status_code == 200
+
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    body = r.text
+    for stage in ("upload", "decode", "read"):
+        assert f'hidrometro_stage_seconds_count{{stage="{stage}"}}' in body
+    assert 'hidrometro_ocr_pool_task_seconds_count{task="decode_image"}' in body
+    # Rótulo pelo template da rota, não pelo caminho concreto
+    assert 'http_request_seconds_count{method="POST",route="/api/hydrometer/read",status="200"}' in body
+    assert 'hidrometro_in_flight{kind="http"}' in body
+
+
+def test_rotas_nao_encontradas_agrupadas():
+    client.get("/nao-existe/123")
+    assert 'route="unmatched",status="404"' in client.get("/metrics").text
+
+
+def test_groq_status_rotula_erros():
+    class RateLimited(Exception):
+        status_code = 429
+
+    assert metrics.groq_status(None) == "200"
+    assert metrics.groq_status(RateLimited()) == "429"
+    assert metrics.groq_status(TimeoutError()) == "TimeoutError"
+
+
+def test_metrics_indisponivel_retorna_503(monkeypatch):
+    monkeypatch.setattr(metrics, "render", lambda: None)
+    r = client.get("/metrics")
+    assert r.status_code == 503
+    assert "detail" in r.json()
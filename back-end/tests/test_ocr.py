@@ -1,7 +1,7 @@
 import os
 import unittest
 
-from src.ocr import run_ocr
+from app.tools.ocr import run_ocr
 
 class TestOCR(unittest.TestCase):
     def test_missing_file(self):
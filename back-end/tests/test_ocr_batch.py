@@ -0,0 +1,73 @@
+import asyncio
+
+from PIL import Image
+
+from app.tools import ocr, ocr_batcher, preprocess
+from app.tools.reader_registry import ReaderRegistry
+
+
+class FakeReader:
+    def __init__(self):
+        self.calls = []
+
+    def readtext_batched(self, batch, batch_size=1):
+        shapes = {a.shape for a in batch}
+        assert len(shapes) == 1, "lote precisa de imagens do mesmo tamanho"
+        self.calls.append(len(batch))
+        return [[(None, f"{int(a[0, 0])}", 0.5)] for a in batch]
+
+
+def _use_fake_reader(monkeypatch):
+    reader = FakeReader()
+    monkeypatch.setattr(ocr, "reader_registry", ReaderRegistry(factory=lambda langs, **o: reader, max_memory_mb=0))
+    monkeypatch.setattr(ocr.settings, "ocr_preprocess_steps", "grayscale")
+    monkeypatch.setattr(preprocess, "_default_pipeline", None)
+    return reader
+
+
+def test_lote_com_tamanhos_diferentes_mantem_ordem(monkeypatch):
+    reader = _use_fake_reader(monkeypatch)
+    images = [Image.new("L", size, color) for size, color in [((40, 20), 1), ((42, 21), 2), ((400, 200), 3), ((41, 20), 4)]]
+    pages = ocr.run_ocr_batch(images, batch_size=8)
+    assert pages == [["1"], ["2"], ["3"], ["4"]]
+    # a imagem muito maior vai para outro lote em vez de forçar padding em todas
+    assert sorted(reader.calls) == [1, 3]
+
+
+def test_batcher_agrupa_chamadas_concorrentes(monkeypatch):
+    reader = _use_fake_reader(monkeypatch)
+    batcher = ocr_batcher.OCRBatcher("pt", False, max_batch=8, window_ms=30)
+
+    async def scenario():
+        imgs = [Image.new("L", (30, 10), i) for i in range(5)]
+        return await asyncio.gather(*(batcher.submit(img) for img in imgs))
+
+    assert asyncio.run(scenario()) == [[str(i)] for i in range(5)]
+    assert reader.calls == [5]
+    assert batcher.stats()["batches"] == 1
+
+
+def test_lote_agrupa_por_altura_e_largura(monkeypatch):
+    reader = _use_fake_reader(monkeypatch)
+    # Mesma área, formatos opostos: não dividem lote (o padding iria a 200x200)
+    images = [Image.new("L", size, color) for size, color in [((200, 20), 1), ((20, 200), 2), ((205, 22), 3)]]
+    assert ocr.run_ocr_batch(images, batch_size=8) == [["1"], ["2"], ["3"]]
+    assert sorted(reader.calls) == [1, 2]
+
+
+def test_batcher_por_event_loop(monkeypatch):
+    _use_fake_reader(monkeypatch)
+    monkeypatch.setattr(ocr_batcher, "_batchers", ocr_batcher.weakref.WeakKeyDictionary())
+    monkeypatch.setattr(ocr_batcher, "_counts", {})
+
+    async def scenario():
+        batcher = ocr_batcher.get_batcher("pt")
+        imgs = [Image.new("L", (30, 10), i) for i in range(3)]
+        return batcher, await asyncio.gather(*(batcher.submit(img) for img in imgs))
+
+    first, lines = asyncio.run(scenario())
+    second, again = asyncio.run(scenario())
+    assert first is not second
+    assert lines == again == [[str(i)] for i in range(3)]
+    # As contagens somam os dois loops
+    assert ocr_batcher.batcher_stats()["pt"] == {"batches": 2, "items": 6, "avg_batch": 3.0}
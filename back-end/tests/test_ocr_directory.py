@@ -0,0 +1,64 @@
+import json
+
+from app.tools import ocr_directory
+from app.tools.ocr_directory import expand_inputs, is_batch_input, load_checkpoint, run_directory
+
+
+def _tree(tmp_path):
+    (tmp_path / "a").mkdir(parents=True)
+    (tmp_path / "a" / "1.png").write_bytes(b"x")
+    (tmp_path / "a" / "2.pdf").write_bytes(b"x")
+    (tmp_path / "a" / "notas.txt").write_bytes(b"x")
+    (tmp_path / "b.jpg").write_bytes(b"x")
+    (tmp_path / ".oculto.png").write_bytes(b"x")
+    return tmp_path
+
+
+def _fake_run_ocr(calls):
+    def run_ocr(path, lang="pt", detail=False, batch_size=1):
+        calls.append(path)
+        if path.endswith(".pdf"):
+            return [["p1"], ["p2"]]
+        if path.endswith(".jpg"):
+            raise RuntimeError("ilegível")
+        return [["123"]]
+    return run_ocr
+
+
+def test_expande_diretorio_e_glob(tmp_path):
+    root = _tree(tmp_path)
+    assert is_batch_input(str(root)) and is_batch_input(str(root / "*.png"))
+    assert not is_batch_input(str(root / "b.jpg"))
+    names = [p.replace(str(root), "") for p in expand_inputs(str(root))]
+    assert [n.replace("\\", "/") for n in names] == ["/a/1.png", "/a/2.pdf", "/b.jpg"]
+    assert len(expand_inputs(str(root / "**" / "*.p*"))) == 2
+
+
+def test_jsonl_incremental_com_erros_e_vazao(tmp_path, monkeypatch):
+    root = _tree(tmp_path / "in")
+    calls = []
+    monkeypatch.setattr(ocr_directory, "run_ocr", _fake_run_ocr(calls))
+    out = tmp_path / "out" / "res.jsonl"
+    progress = run_directory(str(root), str(out), workers=0)
+    records = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    assert len(records) == 3
+    by_suffix = {r["path"][-3:]: r for r in records}
+    assert by_suffix["pdf"]["n_pages"] == 2 and by_suffix["png"]["pages"] == [["123"]]
+    assert by_suffix["jpg"]["erro"] == "ilegível"
+    assert (progress.files, progress.pages, progress.errors) == (3, 3, 1)
+
+
+def test_resume_pula_concluidos_e_descarta_linha_incompleta(tmp_path, monkeypatch):
+    root = _tree(tmp_path / "in")
+    paths = expand_inputs(str(root))
+    out = tmp_path / "res.jsonl"
+    out.write_text(json.dumps({"path": paths[0], "pages": [["1"]], "n_pages": 1}) + "\n"
+                   + '{"path": "' + paths[1], encoding="utf-8")
+    assert load_checkpoint(str(out)) == {paths[0]}
+
+    calls = []
+    monkeypatch.setattr(ocr_directory, "run_ocr", _fake_run_ocr(calls))
+    run_directory(str(root), str(out), workers=0, resume=True)
+    assert calls == paths[1:]
+    records = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    assert [r["path"] for r in records] == paths
@@ -0,0 +1,79 @@
+import asyncio
+import io
+import threading
+import time
+
+from PIL import Image
+
+from app.tools.ocr import decode_image
+from app.tools.ocr_pool import OCRPool
+
+
+def _png_bytes(size=(32, 16)):
+    buf = io.BytesIO()
+    Image.new("RGB", size, (255, 255, 255)).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_pool_em_threads_nao_bloqueia_event_loop():
+    pool = OCRPool(workers=0, queue_size=4, preload_langs=[])
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        t = asyncio.create_task(ticker())
+        await pool.run(time.sleep, 0.2)
+        t.cancel()
+        return ticks
+
+    assert asyncio.run(scenario()) >= 5
+
+
+def test_fila_de_submissao_limitada():
+    pool = OCRPool(workers=0, queue_size=1, preload_langs=[])
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def work():
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.pop()
+
+    async def scenario():
+        await asyncio.gather(*(pool.run(work) for _ in range(6)))
+
+    asyncio.run(scenario())
+    assert max(peak) <= 2
+    assert pool.stats()["completed"] == 6
+
+
+def test_pool_usado_por_varios_event_loops():
+    # Cada asyncio.run cria um loop novo; com fila cheia o semáforo espera no loop atual
+    pool = OCRPool(workers=0, queue_size=0, preload_langs=[])
+
+    async def scenario():
+        return await asyncio.gather(*(pool.run(time.sleep, 0.01) for _ in range(3)))
+
+    for _ in range(2):
+        assert asyncio.run(scenario()) == [None] * 3
+    assert pool.stats()["completed"] == 6
+
+
+def test_pool_de_processos_decodifica_imagem():
+    pool = OCRPool(workers=1, queue_size=2, preload_langs=[])
+    try:
+        img = asyncio.run(pool.run(decode_image, _png_bytes()))
+    finally:
+        pool.shutdown()
+    assert img.size == (32, 16)
+    assert img.mode == "RGB"
@@ -1,6 +1,9 @@
 from fastapi.testclient import TestClient
+from app.infrastructure.db import init_db
 from app.main import app
 
+# O schema é criado no lifespan, que este cliente não executa
+init_db()
 client = TestClient(app)
 
 
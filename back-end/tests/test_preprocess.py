@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from app.tools import preprocess
+from app.tools.preprocess import PreprocessPipeline
+
+
+def _page():
+    img = Image.new("RGB", (400, 200), (230, 230, 230))
+    ImageDraw.Draw(img).rectangle((50, 80, 350, 120), fill=(20, 20, 20))
+    return img
+
+
+def test_saida_em_um_canal_com_tempo_por_etapa():
+    gray, timings = PreprocessPipeline("grayscale,clahe,threshold").run(_page())
+    assert gray.ndim == 2 and gray.dtype == np.uint8
+    assert set(np.unique(gray)) <= {0, 255}
+    assert list(timings) == ["grayscale", "clahe", "threshold"]
+    assert preprocess.step_timings.stats()["threshold"]["count"] >= 1
+
+
+def test_threshold_trabalha_no_proprio_buffer():
+    gray = np.array(_page().convert("L"))
+    out, _ = PreprocessPipeline("threshold").run(gray)
+    assert out is gray
+
+
+def test_resize_e_etapa_desconhecida(monkeypatch):
+    monkeypatch.setattr(preprocess.settings, "ocr_preprocess_max_side", 100)
+    gray, _ = PreprocessPipeline("grayscale,resize").run(_page())
+    assert gray.shape == (50, 100)
+    with pytest.raises(ValueError):
+        PreprocessPipeline("grayscale,sharpen")
+
+
+def test_etapa_registrada(monkeypatch):
+    # setitem: a etapa não fica registrada para os outros testes
+    monkeypatch.setitem(preprocess.STEPS, "invert", lambda g: np.subtract(255, g, out=g))
+    gray, _ = PreprocessPipeline("grayscale,invert").run(Image.new("L", (4, 4), 10))
+    assert (gray == 245).all()
+
+
+def _angulo_da_tinta(gray):
+    import cv2
+
+    coords = cv2.findNonZero((gray < 128).astype(np.uint8))
+    return (cv2.minAreaRect(coords)[-1] + 45) % 90 - 45
+
+
+@pytest.mark.parametrize("degrees", [8, -8])
+def test_deskew_sem_threshold_antes(degrees):
+    pytest.importorskip("cv2")
+    page = _page().rotate(degrees, fillcolor=(230, 230, 230))
+    assert abs(_angulo_da_tinta(np.array(page.convert("L")))) > 5
+    # Página em tons de cinza (sem threshold): o fundo não pode contar como tinta
+    gray, _ = PreprocessPipeline("grayscale,deskew").run(page)
+    assert abs(_angulo_da_tinta(gray)) < 1
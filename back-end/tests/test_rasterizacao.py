@@ -0,0 +1,126 @@
+import io
+
+from PIL import Image
+
+from app.tools import ocr
+
+
+def _pdf(n_pages):
+    pages = [Image.new("RGB", (100, 50), (i * 40, 0, 0)) for i in range(n_pages)]
+    buf = io.BytesIO()
+    pages[0].save(buf, format="PDF", save_all=True, append_images=pages[1:], resolution=72)
+    return buf.getvalue()
+
+
+def test_renderiza_somente_intervalo_pedido():
+    content = _pdf(4)
+    assert ocr.pdf_page_count(content) == 4
+    pages = ocr.render_pdf(content, first_page=2, last_page=3, dpi=144)
+    assert len(pages) == 2
+    assert pages[0].size == (200, 100)
+    assert pages[0].mode == "RGB"
+    assert pages[1].getpixel((10, 10))[0] > pages[0].getpixel((10, 10))[0]
+
+
+def test_dpi_por_uso(monkeypatch):
+    monkeypatch.setattr(ocr.settings, "pdf_vision_dpi", 100)
+    monkeypatch.setattr(ocr.settings, "pdf_ocr_dpi", 250)
+    assert ocr.dpi_for(ocr.VISION) == 100
+    assert ocr.dpi_for(ocr.OCR) == 250
+
+
+def test_prefetch_mantem_ordem_e_limita_itens_a_frente():
+    produced = []
+
+    def source():
+        for i in range(6):
+            produced.append(i)
+            yield i
+
+    seen = []
+    for item in ocr.prefetch(source(), lookahead=1):
+        # produtor no máximo lookahead (+1 em trânsito) à frente do consumidor
+        assert len(produced) - len(seen) <= 3
+        seen.append(item)
+    assert seen == list(range(6))
+
+
+def test_run_ocr_processa_pdf_pagina_a_pagina(tmp_path, monkeypatch):
+    from app.tools.reader_registry import ReaderRegistry
+
+    class FakeReader:
+        def readtext(self, arr):
+            return [(None, f"{arr.shape[1]}px", 0.9)]
+
+    monkeypatch.setattr(ocr, "reader_registry", ReaderRegistry(factory=lambda langs, **o: FakeReader(), max_memory_mb=0))
+    monkeypatch.setattr(ocr.settings, "pdf_ocr_dpi", 72)
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(_pdf(3))
+    pages = ocr.run_ocr(str(path), detail=True)
+    assert pages == [["100px (conf=0.900)"]] * 3
+
+
+def test_pool_itera_paginas_do_pdf():
+    import asyncio
+
+    from app.tools.ocr_pool import OCRPool
+
+    pool = OCRPool(workers=0, queue_size=4, preload_langs=[])
+
+    async def scenario():
+        return [p.size async for p in pool.iter_pdf_pages(_pdf(3), dpi=72, lookahead=1)]
+
+    assert asyncio.run(scenario()) == [(100, 50)] * 3
+
+
+def test_pdfium_serializado_entre_threads(monkeypatch):
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    lock = threading.Lock()
+    active = []
+    peak = []
+
+    def call(result=None):
+        # Registra quantas chamadas ao pdfium estão em andamento ao mesmo tempo
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        time.sleep(0.005)
+        with lock:
+            active.pop()
+        return result
+
+    class FakePage:
+        def render(self, scale):
+            return call(self)
+
+        def to_pil(self):
+            return Image.new("RGB", (10, 10))
+
+        def close(self):
+            call()
+
+    class FakeDocument:
+        def __init__(self, source):
+            call()
+
+        def __len__(self):
+            return call(3)
+
+        def __getitem__(self, index):
+            return call(FakePage())
+
+        def close(self):
+            call()
+
+    class FakePdfium:
+        PdfDocument = FakeDocument
+
+    real = ocr.optional_module
+    monkeypatch.setattr(ocr, "optional_module", lambda name: FakePdfium if name == "pypdfium2" else real(name))
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda _: len(ocr.render_pdf(b"%PDF-", dpi=72)), range(8)))
+    assert results == [3] * 8
+    assert max(peak) == 1
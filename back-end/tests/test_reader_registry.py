@@ -0,0 +1,60 @@
+import threading
+import time
+
+from app.tools.reader_registry import ReaderRegistry
+
+
+class FakeReader:
+    def __init__(self, langs, **options):
+        self.langs = langs
+        self.options = options
+
+
+def make_registry(max_memory_mb=0, size_mb=100.0, delay=0.0):
+    loads = []
+
+    def factory(langs, **options):
+        time.sleep(delay)
+        loads.append((tuple(langs), options))
+        return FakeReader(langs, **options)
+
+    registry = ReaderRegistry(factory=factory, max_memory_mb=max_memory_mb, size_estimator=lambda r: size_mb)
+    return registry, loads
+
+
+def test_reader_carregado_uma_vez_por_chave():
+    registry, loads = make_registry()
+    r1 = registry.get(["pt"], gpu=False)
+    r2 = registry.get(["pt"], gpu=False)
+    r3 = registry.get(["pt"], gpu=True)
+    assert r1 is r2
+    assert r1 is not r3
+    assert len(loads) == 2
+    stats = registry.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+
+def test_chamadas_concorrentes_compartilham_a_mesma_carga():
+    registry, loads = make_registry(delay=0.05)
+    readers = []
+    threads = [threading.Thread(target=lambda: readers.append(registry.get(["pt", "en"]))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(loads) == 1
+    assert all(r is readers[0] for r in readers)
+
+
+def test_eviction_respeita_limite_e_readers_em_uso():
+    registry, loads = make_registry(max_memory_mb=250, size_mb=100)
+    with registry.acquire(["pt"]) as leased:
+        registry.get(["en"])
+        registry.get(["es"])
+        # "pt" está em uso; o menos recente ocioso ("en") é descartado
+        langs = [r["langs"] for r in registry.stats()["readers"]]
+        assert ["pt"] in langs
+        assert ["en"] not in langs
+    assert registry.get(["pt"]) is leased
+    assert registry.stats()["evictions"] >= 1
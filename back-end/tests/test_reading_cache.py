@@ -0,0 +1,111 @@
+import asyncio
+import time
+
+from PIL import Image
+
+from app.models.schemas import ReadingOutcome
+from app.services.reading_cache import ReadingCache, image_digest, make_key
+
+
+def test_chave_depende_da_imagem_modelo_e_prompt():
+    a = image_digest(Image.new("RGB", (4, 4), (0, 0, 0)))
+    b = image_digest(Image.new("RGB", (4, 4), (0, 0, 1)))
+    assert a != b
+    assert make_key(a, "m1", "1") != make_key(a, "m2", "1")
+    assert make_key(a, "m1", "1") != make_key(a, "m1", "2")
+
+
+def test_lru_com_ttl():
+    cache = ReadingCache(max_entries=2, ttl_s=0.05, persist=False)
+    cache.put("a", ReadingOutcome(valor="1"))
+    cache.put("b", ReadingOutcome(valor="2"))
+    cache.put("c", ReadingOutcome(valor="3", roi=[1, 2, 3, 4]))
+    assert cache.get("a") is None
+    assert cache.get("c").roi == [1, 2, 3, 4]
+    time.sleep(0.06)
+    assert cache.get("c") is None
+
+
+def test_single_flight_compartilha_chamada_em_andamento():
+    cache = ReadingCache(max_entries=10, ttl_s=60, persist=False)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return ReadingOutcome(valor="123")
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(5)))
+
+    assert [o.valor for o in asyncio.run(scenario())] == ["123"] * 5
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert stats["coalesced"] == 4
+    assert stats["misses"] == 1
+    assert asyncio.run(cache.get_or_compute("k", compute)).valor == "123"
+    assert cache.stats()["memory_hits"] == 1
+
+
+def test_falha_nao_e_cacheada():
+    cache = ReadingCache(max_entries=10, ttl_s=60, persist=False)
+
+    async def boom():
+        raise RuntimeError("vision indisponível")
+
+    async def ok():
+        return ReadingOutcome(valor="42")
+
+    async def scenario():
+        try:
+            await cache.get_or_compute("k", boom)
+        except RuntimeError:
+            pass
+        return await cache.get_or_compute("k", ok)
+
+    assert asyncio.run(scenario()).valor == "42"
+
+
+def test_leitura_local_nao_e_cacheada():
+    cache = ReadingCache(max_entries=10, ttl_s=60, persist=False)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return ReadingOutcome(valor="123", caminho="local" if len(calls) == 1 else "vision")
+
+    async def scenario():
+        # Quem chega durante o cálculo ainda recebe a leitura local
+        first = await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(3)))
+        return first, await cache.get_or_compute("k", compute), await cache.get_or_compute("k", compute)
+
+    first, second, third = asyncio.run(scenario())
+    assert [o.caminho for o in first] == ["local"] * 3
+    assert second.caminho == "vision" and third.caminho == "vision"
+    assert len(calls) == 2
+    cache.put("j", ReadingOutcome(valor="9", caminho="local"))
+    assert cache.get("j") is None
+
+
+def test_hash_da_imagem_fora_do_pool_de_ocr(monkeypatch):
+    from app.agents import reading_agent
+
+    submitted = []
+
+    async def run(fn, *args):
+        submitted.append(fn.__name__)
+        return fn(*args)
+
+    monkeypatch.setattr(reading_agent.ocr_pool, "run", run)
+    reading_agent.reading_cache.clear()
+    agent = reading_agent.HydrometerReadingAgent()
+
+    async def uncached(img, source=None):
+        return ReadingOutcome(valor="7", caminho="vision")
+
+    monkeypatch.setattr(agent, "_aread_uncached", uncached)
+    img = Image.new("RGB", (8, 8), (9, 8, 7))
+    assert asyncio.run(agent.aread(img)).valor == "7"
+    assert "image_digest" not in submitted
+    reading_agent.reading_cache.clear()
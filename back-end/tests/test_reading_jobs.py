@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.infrastructure.orm_models  # noqa: F401  (registra as tabelas)
+from app.infrastructure.db import Base
+from app.models.schemas import ReadingOutcome
+from app.services import reading_jobs
+
+
+@pytest.fixture
+def db(monkeypatch, tmp_path):
+    # Arquivo (não :memory:) para cada thread ter sua conexão, como no Postgres
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(reading_jobs, "SessionLocal", sessionmaker(bind=engine, future=True))
+    return engine
+
+
+def test_worker_que_caiu_tem_o_item_retomado(db, monkeypatch):
+    job = reading_jobs.criar_job([("a.png", b"1"), ("b.png", b"2")], "pt", False, False)
+    assert reading_jobs.obter_job(job.job_id).status == "pendente"
+
+    # w1 pega o item e "morre" com o lease já vencido
+    monkeypatch.setattr(reading_jobs.settings, "jobs_lease_s", -1)
+    first = reading_jobs.claim_next_item("w1")
+    monkeypatch.setattr(reading_jobs.settings, "jobs_lease_s", 300)
+    second = reading_jobs.claim_next_item("w2")
+    assert second.id == first.id and second.content == b"1"
+    reading_jobs.complete_item(second.id, "w2", ReadingOutcome(valor="123", roi=[1, 2, 3, 4]), None)
+    # w1 voltando não sobrescreve o resultado de w2
+    reading_jobs.fail_item(first.id, "w1", "tarde demais")
+
+    third = reading_jobs.claim_next_item("w2")
+    assert third.filename == "b.png"
+    assert reading_jobs.claim_next_item("w3") is None
+    reading_jobs.fail_item(third.id, "w2", "falha de leitura")
+
+    status = reading_jobs.obter_job(job.job_id)
+    assert (status.status, status.concluidos, status.erros) == ("concluido", 1, 1)
+    assert status.finalizado_em is not None
+    total, page, items = reading_jobs.listar_itens(job.job_id, None, "1", 50)
+    assert total == 2
+    assert [(i.valor_da_leitura, i.roi, i.tentativas) for i in items] == [("123", [1, 2, 3, 4], 2), (None, None, 1)]
+    assert items[1].erro == "falha de leitura"
+
+
+def test_item_abandonado_muitas_vezes_vira_erro(db, monkeypatch):
+    job = reading_jobs.criar_job([("a.png", b"1")], "pt", False, False)
+    monkeypatch.setattr(reading_jobs.settings, "jobs_lease_s", -1)
+    monkeypatch.setattr(reading_jobs.settings, "jobs_max_attempts", 2)
+    assert reading_jobs.claim_next_item("w1") is not None
+    assert reading_jobs.claim_next_item("w2") is not None
+    assert reading_jobs.claim_next_item("w3") is None
+    assert reading_jobs.obter_job(job.job_id).erros == 1
+
+
+
+def test_job_finalizado_quando_o_ultimo_item_e_abandonado(db, monkeypatch):
+    abandonado = reading_jobs.criar_job([("a.png", b"1")], "pt", False, False)
+    outro = reading_jobs.criar_job([("b.png", b"2")], "pt", False, False)
+    monkeypatch.setattr(reading_jobs.settings, "jobs_max_attempts", 1)
+    monkeypatch.setattr(reading_jobs.settings, "jobs_lease_s", -1)
+    assert reading_jobs.claim_next_item("w1").job_id == abandonado.job_id  # w1 "morre"
+    monkeypatch.setattr(reading_jobs.settings, "jobs_lease_s", 300)
+    # A próxima busca marca o item como erro e, sem itens abertos, fecha o job
+    assert reading_jobs.claim_next_item("w2").job_id == outro.job_id
+
+    status = reading_jobs.obter_job(abandonado.job_id)
+    assert (status.status, status.erros) == ("concluido", 1)
+    assert status.finalizado_em is not None
+    assert reading_jobs.obter_job(outro.job_id).finalizado_em is None
+
+def test_pool_processa_job(db, monkeypatch):
+    async def fake_read_upload(agent, suffix, content, consensus=False):
+        return ReadingOutcome(valor=content.decode()), None
+
+    async def fake_agent(self, lang, detail):
+        return None
+
+    monkeypatch.setattr(reading_jobs, "read_upload", fake_read_upload)
+    monkeypatch.setattr(reading_jobs.JobWorkerPool, "_agent", fake_agent)
+
+    async def scenario():
+        pool = reading_jobs.JobWorkerPool(workers=2, poll_s=0.05)
+        await pool.start()
+        job = reading_jobs.criar_job([(f"{i}.png", str(i).encode()) for i in range(5)], "pt", False, False)
+        pool.notify()
+        for _ in range(100):
+            if reading_jobs.obter_job(job.job_id).status == "concluido":
+                break
+            await asyncio.sleep(0.02)
+        await pool.stop()
+        return job.job_id, pool.stats()
+
+    job_id, stats = asyncio.run(scenario())
+    _, _, items = reading_jobs.listar_itens(job_id, "concluido", "1", 50)
+    assert [i.valor_da_leitura for i in items] == ["0", "1", "2", "3", "4"]
+    assert stats["completed"] == 5
+
+
+def test_lease_renovado_enquanto_o_item_e_lido(db, monkeypatch):
+    calls = []
+
+    async def slow_read_upload(agent, suffix, content, consensus=False):
+        # Mais que o lease: como um item em lote esperando na fila do Groq
+        calls.append(content)
+        await asyncio.sleep(0.6)
+        return ReadingOutcome(valor=content.decode()), None
+
+    async def fake_agent(self, lang, detail):
+        return None
+
+    monkeypatch.setattr(reading_jobs, "read_upload", slow_read_upload)
+    monkeypatch.setattr(reading_jobs.JobWorkerPool, "_agent", fake_agent)
+    monkeypatch.setattr(reading_jobs.settings, "jobs_lease_s", 0.15)
+
+    async def scenario():
+        pool = reading_jobs.JobWorkerPool(workers=2, poll_s=0.02)
+        await pool.start()
+        job = reading_jobs.criar_job([("a.png", b"7")], "pt", False, False)
+        pool.notify()
+        for _ in range(100):
+            if reading_jobs.obter_job(job.job_id).status == "concluido":
+                break
+            await asyncio.sleep(0.02)
+        await pool.stop()
+        return job.job_id
+
+    job_id = asyncio.run(scenario())
+    _, _, items = reading_jobs.listar_itens(job_id, None, "1", 50)
+    assert calls == [b"7"]
+    assert [(i.valor_da_leitura, i.tentativas) for i in items] == [("7", 1)]
@@ -0,0 +1,154 @@
+import asyncio
+import os
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.infrastructure.orm_models  # noqa: F401  (registra as tabelas)
+from app.agents.reading_agent import HydrometerReadingAgent
+from app.config.settings import settings
+from app.infrastructure.db import Base
+from app.infrastructure.request_timing import record, server_timing, timing_scope
+from app.main import app
+from app.models.schemas import ReadingOutcome
+from app.routers import ocr as ocr_router
+from app.services import pessoas_service
+from app.services.reading_cache import reading_cache
+from tests.test_hydrometer_read import FakeAgent, _png
+
+client = TestClient(app)
+
+
+def _server_timing(response):
+    entries = {}
+    for item in response.headers["server-timing"].split(","):
+        name, dur = item.strip().split(";dur=")
+        entries[name] = float(dur)
+    return entries
+
+
+class VisionAgent(FakeAgent):
+    async def aread(self, img, source=None):
+        outcome = await super().aread(img, source)
+        return outcome.model_copy(update={"caminho": "vision"})
+
+
+def test_server_timing_e_tempos_por_arquivo(monkeypatch):
+    monkeypatch.setattr(ocr_router, "HydrometerReadingAgent", VisionAgent)
+    monkeypatch.setattr(ocr_router, "warmup_reader", lambda lang: None)
+    files = [
+        ("files", ("a.png", _png((0, 1, 0)), "image/png")),
+        ("files", ("b.png", _png((0, 2, 0)), "image/png")),
+    ]
+    r = client.post("/api/hydrometer/read", files=files, data={"lang": "pt", "tempos": "true"})
+    assert r.status_code == 200
+    timing = _server_timing(r)
+    assert {"upload", "decode", "read", "total"} <= set(timing)
+    # Os dois arquivos (0.2 s cada) rodam em paralelo: a soma de "read" passa do total
+    assert timing["read"] > timing["total"] * 1.2
+
+    results = r.json()["results"]
+    assert [x["caminho"] for x in results] == ["vision", "vision"]
+    for result in results:
+        assert {"decode", "read"} <= set(result["tempos_ms"])
+        assert result["tempos_ms"]["read"] >= 200
+    # A soma por arquivo fecha com o cabeçalho da requisição
+    assert abs(sum(x["tempos_ms"]["read"] for x in results) - timing["read"]) < 1
+
+
+def test_tempos_por_arquivo_sao_opcionais(monkeypatch):
+    monkeypatch.setattr(ocr_router, "HydrometerReadingAgent", VisionAgent)
+    monkeypatch.setattr(ocr_router, "warmup_reader", lambda lang: None)
+    files = [("files", ("a.png", _png((0, 1, 0)), "image/png"))]
+    result = client.post("/api/hydrometer/read", files=files, data={"lang": "pt"}).json()["results"][0]
+    assert result["tempos_ms"] is None and result["caminho"] == "vision"
+
+
+def test_crud_informa_tempo_de_banco(monkeypatch, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'cadastro.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(pessoas_service, "SessionLocal", sessionmaker(bind=engine, future=True))
+    r = client.get("/api/cadastro/pessoas")
+    assert r.status_code == 200
+    assert _server_timing(r)["db"] > 0
+
+
+def test_escopos_aninhados_e_formato():
+    record("fora", 1.0)  # sem requisição: ignorado
+    with timing_scope() as outer:
+        record("ocr", 0.5)
+        with timing_scope() as inner:
+            record("ocr", 0.25)
+    assert outer == {"ocr": 0.75} and inner == {"ocr": 0.25}
+    assert server_timing({"decode": 0.0012}, 0.01) == "decode;dur=1.2, total;dur=10.0"
+
+
+def test_caminho_cache_na_segunda_leitura(monkeypatch):
+    from PIL import Image
+
+    reading_cache.clear()
+    agent = HydrometerReadingAgent()
+
+    async def uncached(img, source=None):
+        return ReadingOutcome(valor="123", caminho="ocr")
+
+    monkeypatch.setattr(agent, "_aread_uncached", uncached)
+    img = Image.new("RGB", (8, 8), (1, 2, 3))
+
+    async def main():
+        return await agent.aread(img), await agent.aread(img)
+
+    first, second = asyncio.run(main())
+    assert (first.caminho, second.caminho) == ("ocr", "cache")
+    assert second.valor == "123"
+    reading_cache.clear()
+
+
+def test_profiling_por_cabecalho(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "profile_token", "segredo")
+    monkeypatch.setattr(settings, "profile_dir", str(tmp_path))
+
+    assert "x-profile-file" not in client.get("/health", headers={"X-Profile": "errado"}).headers
+    r = client.get("/health", headers={"X-Profile": "segredo"})
+    assert r.status_code == 200
+    assert os.path.exists(tmp_path / r.headers["x-profile-file"])
+
+
+def test_profiling_por_amostragem(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "profile_sample_rate", 1.0)
+    monkeypatch.setattr(settings, "profile_dir", str(tmp_path))
+    r = client.get("/health")
+    assert os.listdir(tmp_path) == [r.headers["x-profile-file"]]
+
+
+def test_circuito_aberto_leitura_local_sem_cache(monkeypatch):
+    from PIL import Image
+
+    from app.services.circuit_breaker import CircuitOpenError
+
+    reading_cache.clear()
+    agent = HydrometerReadingAgent()
+
+    async def no_vision(b64, mime):
+        raise CircuitOpenError("groq")
+
+    async def lines(img):
+        return ["HIDRO", "01234"]
+
+    async def circuit_open(text):
+        raise CircuitOpenError("groq")
+
+    monkeypatch.setattr(agent.agroq, "extract_digits_from_image_base64", no_vision)
+    monkeypatch.setattr(agent.agroq, "extract_digits", circuit_open)
+    monkeypatch.setattr(agent.ocr, "aextract_lines_from_image", lines)
+    img = Image.new("RGB", (8, 8), (3, 2, 1))
+
+    async def main():
+        return await agent.aread(img), await agent.aread(img)
+
+    first, second = asyncio.run(main())
+    assert (first.valor, first.caminho) == ("01234", "local")
+    # Não veio do cache: a imagem é lida de novo
+    assert second.caminho == "local"
+    reading_cache.clear()
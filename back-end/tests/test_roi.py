@@ -0,0 +1,72 @@
+from PIL import Image, ImageDraw
+
+from app.tools import roi
+
+
+def _meter_photo():
+    img = Image.new("RGB", (2000, 1500), (200, 200, 190))
+    d = ImageDraw.Draw(img)
+    d.ellipse((400, 200, 1600, 1300), outline=(60, 60, 60), width=12)
+    # janela do odômetro com 6 "dígitos"
+    d.rectangle((700, 600, 1300, 760), fill=(250, 250, 250), outline=(20, 20, 20), width=6)
+    for i in range(6):
+        x = 730 + i * 95
+        d.rectangle((x, 630, x + 18, 730), fill=(10, 10, 10))
+        d.rectangle((x + 40, 630, x + 58, 730), fill=(10, 10, 10))
+        d.rectangle((x, 630, x + 58, 645), fill=(10, 10, 10))
+    return img
+
+
+def test_recorta_janela_de_digitos(monkeypatch):
+    monkeypatch.setattr(roi.settings, "roi_use_detector", False)
+    img = _meter_photo()
+    crop, box = roi.crop_to_roi(img)
+    assert box is not None
+    x, y, w, h = box
+    assert x <= 730 and y <= 630 and x + w >= 1260 and y + h >= 730
+    assert w * h < 0.2 * img.size[0] * img.size[1]
+    assert crop.size == (w, h)
+
+
+def test_sem_candidato_devolve_imagem_original(monkeypatch):
+    monkeypatch.setattr(roi.settings, "roi_use_detector", False)
+    img = Image.new("RGB", (400, 300), (128, 128, 128))
+    crop, box = roi.crop_to_roi(img)
+    assert box is None
+    assert crop is img
+
+
+def test_recorte_sem_digitos_volta_para_imagem_inteira(monkeypatch):
+    import asyncio
+
+    from app.agents import reading_agent
+    from app.services.reading_cache import reading_cache
+
+    reading_cache.clear()
+    img = Image.new("RGB", (64, 48), (10, 20, 30))
+    window = Image.new("RGB", (16, 8), (200, 200, 200))
+    monkeypatch.setattr(reading_agent, "crop_to_roi", lambda image, lang="pt": (window, (4, 4, 16, 8)))
+    agent = reading_agent.HydrometerReadingAgent()
+    sizes = []
+    encode_for_vision = reading_agent.encode_for_vision
+
+    def encode(image, source=None):
+        sizes.append(image.size)
+        return encode_for_vision(image, source)
+
+    async def vision(b64, mime):
+        # Só a imagem inteira tem dígitos
+        if sizes[-1] == window.size:
+            raise RuntimeError("Nenhum dígito encontrado pela IA (vision).")
+        return "04567"
+
+    async def no_ocr(image):
+        raise RuntimeError("Nenhum dígito encontrado pelo OCR.")
+
+    monkeypatch.setattr(agent.agroq, "extract_digits_from_image_base64", vision)
+    monkeypatch.setattr(agent.ocr, "aextract_lines_from_image", no_ocr)
+    monkeypatch.setattr(reading_agent, "encode_for_vision", encode)
+    outcome = asyncio.run(agent.aread(img))
+    assert outcome.valor == "04567" and outcome.roi is None
+    assert sizes[0] == window.size and sizes[-1] == img.size
+    reading_cache.clear()
@@ -0,0 +1,80 @@
+import os
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, inspect
+
+from app.infrastructure.startup import StartupReport
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _python(code, **env):
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND, capture_output=True, text=True, timeout=60,
+        env={**os.environ, "PYTHONPATH": BACKEND, **env},
+    )
+    assert result.returncode == 0, result.stderr
+    return result.stdout.strip().splitlines()[-1]
+
+
+def test_import_nao_carrega_dependencias_pesadas(tmp_path):
+    db = f"sqlite:///{tmp_path / 'app.db'}"
+    out = _python(
+        "import sys, app.main\n"
+        "from app.infrastructure.lazy import loaded_heavy_modules\n"
+        "print(loaded_heavy_modules())",
+        DATABASE_URL=db,
+    )
+    assert out == "[]"
+    # Nada de create_all no import
+    assert not inspect(create_engine(db)).get_table_names()
+
+
+def test_worker_so_de_cadastro_nao_importa_o_pipeline_de_ocr():
+    out = _python(
+        "import sys, app.main\n"
+        "routes = {r.path for r in app.main.app.routes}\n"
+        "print([m for m in ('numpy', 'PIL', 'groq', 'httpx', 'app.routers.ocr') if m in sys.modules],"
+        " '/api/cadastro/pessoas' in routes, '/api/hydrometer/read' in routes)",
+        API_MODULES="cadastro",
+    )
+    assert out == "[] True False"
+
+
+def test_schema_criado_no_lifespan(tmp_path):
+    db = f"sqlite:///{tmp_path / 'app.db'}"
+    out = _python(
+        "from fastapi.testclient import TestClient\n"
+        "import app.main\n"
+        "with TestClient(app.main.app) as client:\n"
+        "    report = client.get('/health/startup').json()\n"
+        "print(sorted(report['phases_ms']))",
+        DATABASE_URL=db, DB_INIT="startup", API_MODULES="cadastro",
+    )
+    assert out == "['import', 'init_db']"
+    assert "pessoas" in inspect(create_engine(db)).get_table_names()
+
+
+def test_passo_explicito_de_schema(tmp_path):
+    db = f"sqlite:///{tmp_path / 'app.db'}"
+    subprocess.run([sys.executable, "-m", "app.infrastructure.db"], cwd=BACKEND, check=True, capture_output=True,
+                   timeout=60, env={**os.environ, "PYTHONPATH": BACKEND, "DATABASE_URL": db})
+    assert "pessoas" in inspect(create_engine(db)).get_table_names()
+
+
+def test_relatorio_de_inicio():
+    report = StartupReport()
+    report.record("import", 0.25)
+    with report.phase("job_workers"):
+        pass
+    data = report.as_dict()
+    assert data["phases_ms"]["import"] == 250.0 and "job_workers" in data["phases_ms"]
+    assert data["total_ms"] >= 250.0
+
+
+def test_endpoint_de_inicio():
+    from app.main import app
+
+    assert "import" in TestClient(app).get("/health/startup").json()["phases_ms"]
@@ -0,0 +1,103 @@
+import asyncio
+import hashlib
+import io
+
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+from starlette.datastructures import Headers
+
+from app.services import uploads
+from app.services.uploads import BodySizeLimitMiddleware, ingest, matches_magic, request_limit
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"0" * 100
+
+
+def _upload(name, data):
+    return UploadFile(io.BytesIO(data), size=len(data), filename=name, headers=Headers({}))
+
+
+def test_magic_bytes_por_extensao():
+    assert matches_magic("png", PNG)
+    assert matches_magic("jpg", b"\xff\xd8\xff\xe0")
+    assert matches_magic("pdf", b"\n\n%PDF-1.7")
+    assert not matches_magic("pdf", PNG)
+
+
+def test_ingest_le_em_blocos_e_calcula_sha256(monkeypatch):
+    monkeypatch.setattr(uploads.settings, "upload_chunk_kb", 1)
+    data = PNG + b"1" * 5000
+    result = asyncio.run(ingest(_upload("a.png", data)))
+    assert result.content == data and result.size == len(data)
+    assert result.sha256 == hashlib.sha256(data).hexdigest()
+
+
+def test_ingest_rejeita_tipo_falso_e_tamanho(monkeypatch):
+    try:
+        asyncio.run(ingest(_upload("a.pdf", PNG)))
+    except Exception as e:
+        assert e.status_code == 400
+    else:
+        raise AssertionError("esperava 400")
+
+    monkeypatch.setattr(uploads.settings, "max_file_size_mb", 1)
+    monkeypatch.setattr(uploads.settings, "upload_chunk_kb", 64)
+    big = PNG + b"1" * (2 * 1024 * 1024)
+    upload = _upload("a.png", big)
+    upload.size = None  # tamanho desconhecido: a leitura para ao passar do limite
+    try:
+        asyncio.run(ingest(upload))
+    except Exception as e:
+        assert e.status_code == 413
+        assert upload.file.tell() < len(big)
+    else:
+        raise AssertionError("esperava 413")
+
+
+def test_middleware_recusa_corpo_grande():
+    app = FastAPI()
+    app.add_middleware(BodySizeLimitMiddleware, max_bytes=1000)
+
+    @app.post("/up")
+    async def up(files: list[UploadFile] = File(...)):
+        return {"n": len(files)}
+
+    client = TestClient(app)
+    assert client.post("/up", files=[("files", ("a.png", PNG, "image/png"))]).status_code == 200
+    r = client.post("/up", files=[("files", ("a.png", PNG * 20, "image/png"))])
+    assert r.status_code == 413
+
+    def chunked():
+        # sem Content-Length: a contagem acontece enquanto o corpo chega
+        yield b"x" * 800
+        yield b"x" * 800
+
+    r = client.post("/up", content=chunked(), headers={"content-type": "multipart/form-data; boundary=b"})
+    assert r.status_code == 413
+
+
+def test_limite_do_corpo_por_rota(monkeypatch):
+    monkeypatch.setattr(uploads.settings, "max_request_mb", 512)
+    monkeypatch.setattr(uploads.settings, "max_file_size_mb", 1)
+    monkeypatch.setattr(uploads.settings, "max_files_per_request", 2)
+    mb = 1024 * 1024
+    assert request_limit("/api/hydrometer/archive") == 512 * mb
+    assert request_limit("/api/hydrometer/jobs") == 512 * mb
+    # Demais rotas: arquivos por requisição x tamanho por arquivo, mais o envelope do multipart
+    assert request_limit("/api/hydrometer/read") == 3 * mb
+
+    app = FastAPI()
+    app.add_middleware(BodySizeLimitMiddleware)
+
+    @app.post("/api/hydrometer/read")
+    async def read(files: list[UploadFile] = File(...)):
+        return {"n": len(files)}
+
+    @app.post("/api/hydrometer/archive")
+    async def archive(archive: UploadFile = File(...)):
+        return {"ok": True}
+
+    body = PNG + b"1" * (4 * mb)
+    client = TestClient(app)
+    r = client.post("/api/hydrometer/read", files=[("files", ("a.png", body, "image/png"))])
+    assert r.status_code == 413 and r.json()["detail"] == "Requisição excede 3 MB"
+    assert client.post("/api/hydrometer/archive", files=[("archive", ("a.zip", body, "application/zip"))]).status_code == 200